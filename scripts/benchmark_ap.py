@@ -0,0 +1,95 @@
+"""
+Micro-benchmark for APDataObject.get_ap, comparing it to the loop based implementation it replaced.
+
+Usage: python scripts/benchmark_ap.py
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Use the tidecv of this checkout, even if it isn't installed
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tidecv.ap import APDataObject  # noqa: E402
+
+
+def loop_ap(obj: APDataObject) -> float:
+    """The previous implementation of APDataObject.get_ap."""
+    data_points = list(obj.data_points.values())
+    data_points.sort(key=lambda x: -x[0])
+
+    precisions = []
+    recalls = []
+    num_true = 0
+    num_false = 0
+
+    for datum in data_points:
+        if datum[1]:
+            num_true += 1
+        else:
+            num_false += 1
+
+        precisions.append(num_true / (num_true + num_false))
+        recalls.append(num_true / obj.num_gt_positives)
+
+    for i in range(len(precisions) - 1, 0, -1):
+        if precisions[i] > precisions[i - 1]:
+            precisions[i - 1] = precisions[i]
+
+    y_range = [0] * 101
+    x_range = np.array([x / 100 for x in range(101)])
+    recalls = np.array(recalls)
+
+    indices = np.searchsorted(recalls, x_range, side="left")
+    for bar_idx, precision_idx in enumerate(indices):
+        if precision_idx < len(precisions):
+            y_range[bar_idx] = precisions[precision_idx]
+
+    return sum(y_range) / len(y_range) * 100
+
+
+def best_time(func, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    rng = random.Random(42)
+
+    print(
+        "{:>10s}  {:>10s}  {:>10s}  {:>8s}".format("dets", "loop", "numpy", "speedup")
+    )
+    for num_dets in [1000, 100000, 1000000]:
+        obj = APDataObject()
+        obj.add_gt_positives(num_dets // 2)
+        for _id in range(num_dets):
+            obj.push(_id, rng.random(), rng.random() < 0.5)
+
+        assert obj.get_ap() == loop_ap(obj)
+
+        def numpy_ap() -> float:
+            # get_ap caches its result, so make it compute the AP every time
+            obj._invalidate()
+            return obj.get_ap()
+
+        repeats = 5 if num_dets < 1000000 else 2
+        loop_time = best_time(lambda: loop_ap(obj), repeats)
+        numpy_time = best_time(numpy_ap, repeats)
+
+        print(
+            "{:>10d}  {:>9.4f}s  {:>9.4f}s  {:>7.1f}x".format(
+                num_dets, loop_time, numpy_time, loop_time / numpy_time
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import random
+from unittest import TestCase
+
+import numpy as np
+
+from tests.constants import RANDOM_SEED
+from tidecv.ap import APDataObject, ClassedAPDataArrays, ClassedAPDataObject
+
+
+def reference_ap(obj: APDataObject) -> tuple:
+    """The original, loop based AP computation, to check the vectorized one against."""
+    data_points = sorted(obj.data_points.values(), key=lambda x: -x[0])
+
+    precisions = []
+    recalls = []
+    num_true = 0
+    num_false = 0
+
+    for datum in data_points:
+        if datum[1]:
+            num_true += 1
+        else:
+            num_false += 1
+
+        precisions.append(num_true / (num_true + num_false))
+        recalls.append(num_true / obj.num_gt_positives)
+
+    for i in range(len(precisions) - 1, 0, -1):
+        if precisions[i] > precisions[i - 1]:
+            precisions[i - 1] = precisions[i]
+
+    y_range = [0] * 101
+    x_range = np.array([x / 100 for x in range(101)])
+
+    indices = np.searchsorted(np.array(recalls), x_range, side="left")
+    for bar_idx, precision_idx in enumerate(indices):
+        if precision_idx < len(precisions):
+            y_range[bar_idx] = precisions[precision_idx]
+
+    return sum(y_range) / len(y_range) * 100, y_range
+
+
+def random_ap_data(rng: random.Random, num_points: int, num_gt: int) -> APDataObject:
+    obj = APDataObject()
+    obj.add_gt_positives(num_gt)
+
+    for _id in range(num_points):
+        # Round the scores so there are plenty of ties
+        obj.push(_id, round(rng.random(), 2), rng.random() < 0.4)
+
+    return obj
+
+
+def random_classed_ap_data(rng: random.Random) -> ClassedAPDataObject:
+    classed = ClassedAPDataObject()
+
+    for _id in range(400):
+        _cls = rng.randrange(3)
+        is_true = rng.random() < 0.4
+        info = {"matched_with": rng.randrange(1000, 1400)} if is_true else {}
+        classed.push(_cls, _id, round(rng.random(), 2), is_true, info)
+
+    for _cls in range(4):
+        classed.add_gt_positives(_cls, rng.randint(100, 200))
+        for _id in rng.sample(range(1000, 1400), 20):
+            classed.push_false_negative(_cls, _id)
+
+    return classed
+
+
+class TestAP(TestCase):
+    def test_get_ap_matches_reference(self):
+        rng = random.Random(RANDOM_SEED)
+
+        for num_points, num_gt in [(0, 5), (1, 1), (10, 3), (500, 300), (3000, 40)]:
+            obj = random_ap_data(rng, num_points, num_gt)
+            ap, y_range = reference_ap(obj)
+
+            assert obj.get_ap() == ap
+            assert obj.get_pr_curve()[1] == y_range
+
+    def test_get_ap_no_gt(self):
+        obj = random_ap_data(random.Random(RANDOM_SEED), 10, 0)
+
+        assert obj.get_ap() == 0
+        assert obj.get_pr_curve() is None
+
+    def test_as_arrays(self):
+        rng = random.Random(RANDOM_SEED)
+        classed = random_classed_ap_data(rng)
+        arrays = classed.as_arrays()
+
+        assert arrays.get_mAP() == classed.get_mAP()
+        assert arrays.get_APs() == classed.get_APs()
+        assert arrays.get_gt_positives() == classed.get_gt_positives()
+        assert arrays.get_pr_curve()[1] == classed.get_pr_curve()[1]
+        assert arrays.get_pr_curve(2)[1] == classed.get_pr_curve(2)[1]
+
+    def test_arrays_apply_qualifier(self):
+        rng = random.Random(RANDOM_SEED)
+        classed = random_classed_ap_data(rng)
+        arrays = classed.as_arrays()
+
+        pred_dict = {_cls: set(rng.sample(range(400), 250)) for _cls in range(3)}
+        gt_dict = {_cls: set(rng.sample(range(1000, 1400), 300)) for _cls in range(4)}
+
+        for check in [False, True]:
+            expected = classed.apply_qualifier(pred_dict, gt_dict, check)
+            result = arrays.apply_qualifier(pred_dict, gt_dict, check)
+
+            assert result.get_APs() == expected.get_APs()
+            assert result.get_gt_positives() == expected.get_gt_positives()
+
+    def test_arrays_merge(self):
+        rng = random.Random(RANDOM_SEED)
+        full = ClassedAPDataObject()
+        parts = [ClassedAPDataObject() for _ in range(3)]
+
+        # Split the data points into contiguous parts, like splitting up the images would
+        for _id in range(600):
+            _cls = rng.randrange(4)
+            score, is_true = round(rng.random(), 2), rng.random() < 0.4
+            for obj in [full, parts[_id // 200]]:
+                obj.push(_cls, _id, score, is_true, {"matched_with": 1000 + _id})
+        for _cls in range(4):
+            for part in parts:
+                num_gt = rng.randint(0, 60)
+                full.add_gt_positives(_cls, num_gt)
+                part.add_gt_positives(_cls, num_gt)
+
+        merged = ClassedAPDataArrays.concatenate([x.as_arrays() for x in parts])
+        pairwise = (
+            parts[0].as_arrays().merge(parts[1].as_arrays()).merge(parts[2].as_arrays())
+        )
+
+        for result in [merged, pairwise]:
+            assert sorted(result.get_APs().items()) == sorted(full.get_APs().items())
+            assert result.get_gt_positives() == full.get_gt_positives()
+
+    def test_cached_ap(self):
+        rng = random.Random(RANDOM_SEED)
+        classed = random_classed_ap_data(rng)
+        obj = classed.objs[0]
+
+        ap, mAP = obj.get_ap(), classed.get_mAP()
+        assert obj.ap == ap and classed.mAP == mAP
+
+        # Adding data through any of the push functions invalidates the cached results
+        classed.push(0, 1000, 1.0, True, {"matched_with": 1000})
+        assert obj.ap is None and obj.curve is None and classed.mAP is None
+        assert obj.get_ap() != ap and classed.get_mAP() != mAP
+        assert obj.get_ap() == reference_ap(obj)[0]
+
+        classed.add_gt_positives(0, 10)
+        assert obj.ap is None and classed.mAP is None
+        assert obj.get_ap() == reference_ap(obj)[0]
+
+        classed.push_false_negative(0, 1001)
+        assert obj.ap is None and classed.mAP is None
+
+    def test_arrays_round_trip(self):
+        rng = random.Random(RANDOM_SEED)
+        classed = random_classed_ap_data(rng)
+        infos = {
+            _id: info
+            for obj in classed.objs.values()
+            for _id, (score, is_true, info) in obj.data_points.items()
+        }
+
+        result = ClassedAPDataObject.from_arrays(classed.as_arrays(), infos)
+        assert result.get_APs() == classed.get_APs()
+        for _cls, obj in classed.objs.items():
+            assert result.objs[_cls].data_points == obj.data_points
+            assert result.objs[_cls].false_negatives == obj.false_negatives
+
+        shifted = classed.as_arrays().shift_ids(1000, 10)
+        for _cls, obj in classed.as_arrays().objs.items():
+            assert shifted.objs[_cls].ids.tolist() == (obj.ids + 1000).tolist()
+            assert (
+                shifted.objs[_cls].false_negatives.tolist()
+                == (obj.false_negatives + 10).tolist()
+            )
+        assert shifted.get_APs() == classed.get_APs()
@@ -0,0 +1,148 @@
+import copy
+import json
+import pickle
+from unittest import TestCase
+
+import numpy as np
+
+from tests.constants import TEST_ASSETS_DIR
+from tidecv.data import NO_CLASS, Data
+from tidecv.helpers import json_to_Data
+
+
+class TestData(TestCase):
+    def setUp(self):
+        self.data = Data("test_data")
+        self.data.add_ground_truth(0, 1, [0, 0, 10, 10])
+        self.data.add_ground_truth(1, 2, [5, 5, 10, 20])
+        self.data.add_ignore_region(0, 3)
+        self.data.add_ground_truth(0, 2, [1, 2, 3, 4], mask={"size": [1, 1]})
+        self.data.add_ignore_region(1, -1, [0, 0, 50, 50])
+
+    def test_get(self):
+        anns = self.data.get(0)
+
+        assert [ann["_id"] for ann in anns] == [0, 2, 3]
+        assert anns[0] == {
+            "_id": 0,
+            "score": 1,
+            "image": 0,
+            "class": 1,
+            "bbox": [0, 0, 10, 10],
+            "mask": None,
+            "ignore": False,
+        }
+        assert anns[1]["class"] == 3 and anns[1]["bbox"] is None
+        assert self.data.get(5) == []
+
+        # The same dicts are handed out every time, so state stored in them sticks around
+        assert self.data.get(0)[0] is anns[0]
+        assert self.data.annotations[0] is anns[0]
+        assert len(self.data.annotations) == 5
+
+    def test_as_arrays(self):
+        arrays = self.data.as_arrays()
+
+        assert arrays.image_ids == [0, 1]
+        assert arrays.offsets.tolist() == [0, 3, 5]
+        assert arrays.anns(1).tolist() == [1, 4]
+        assert arrays.anns(7).tolist() == []
+        assert arrays.cls.tolist() == [1, 2, 3, 2, -1]
+        assert arrays.ignore.tolist() == [False, False, True, False, True]
+        assert arrays.has_mask.tolist() == [False, False, False, True, False]
+        assert np.isnan(arrays.bbox[2]).all()
+        np.testing.assert_array_equal(arrays.bbox[3], [1, 2, 3, 4])
+
+        # Adding more annotations invalidates the cached arrays
+        self.data.add_ignore_region(1)
+        assert self.data.as_arrays() is not arrays
+        assert self.data.as_arrays().cls[-1] == NO_CLASS
+
+    def test_edit_annotations(self):
+        arrays = self.data.as_arrays()
+        ann = self.data.get(1)[0]
+
+        # Changes to the dicts go through to the columns, which are what evaluation reads
+        ann["class"] = 5
+        ann["bbox"] = None
+        ann.update(score=0.5)
+        ann["note"] = "kept"
+        assert self.data.as_arrays() is not arrays
+        assert self.data.as_arrays().cls[1] == 5
+        assert np.isnan(self.data.as_arrays().bbox[1]).all()
+        assert self.data.as_arrays().score[1] == 0.5
+        assert self.data.get(1)[0]["note"] == "kept"
+
+        with self.assertRaises(TypeError):
+            del ann["class"]
+
+        # They pickle and copy as plain dicts
+        assert type(pickle.loads(pickle.dumps(ann))) is dict
+        assert type(copy.copy(ann)) is dict
+        assert pickle.loads(pickle.dumps(self.data)).get(1)[0] == ann
+
+    def test_annotations_list(self):
+        anns = self.data.annotations
+        first = anns[0]
+        assert anns == [self.data._annotation(idx) for idx in range(5)]
+        assert json.loads(json.dumps(list(anns)))[0] == first
+
+        # Changing the sequence turns the annotations into a list of the same dicts
+        anns.append(dict(first, _id=5))
+        self.data.annotations += [dict(first, _id=6)]
+        assert self.data._columns is None
+        assert self.data.annotations[0] is first and len(anns) == 7
+        del anns[6]
+        assert len(self.data.annotations) == 6
+
+        del first["bbox"]
+        first["bbox"] = [0, 0, 5, 5]
+        np.testing.assert_array_equal(self.data.as_arrays().bbox[0], [0, 0, 5, 5])
+
+    def test_class_ids(self):
+        data = Data("classes")
+        data.add_ground_truth(0, "cat", [0, 0, 10, 10])
+        data.add_ground_truth(0, 2.0, [0, 0, 10, 10])
+        data.add_ignore_region(0, ("a", 1))
+        data.get(0)[1]["class"] = "dog"
+
+        # Any hashable class id is kept as is, and the arrays hold the same code for it in every Data
+        assert [ann["class"] for ann in data.get(0)] == ["cat", "dog", ("a", 1)]
+        other = Data("other")
+        for class_id in ["dog", 2, ("a", 1), "cat"]:
+            other.add_detection(0, class_id, 0.5, [0, 0, 10, 10])
+        assert (
+            data.as_arrays().cls.tolist() == other.as_arrays().cls[[3, 0, 2]].tolist()
+        )
+        assert other.as_arrays().cls[1] == 2
+
+        data.annotations = [dict(ann) for ann in data.annotations]
+        assert (
+            data.as_arrays().cls.tolist() == other.as_arrays().cls[[3, 0, 2]].tolist()
+        )
+
+    def test_ignored_classes(self):
+        assert self.data._get_ignored_classes(0) == {3}
+        assert self.data._get_ignored_classes(1) == set()
+
+        # A class that's annotated in the image can't be ignored for the whole image
+        self.data.add_ignore_region(1, 2)
+        assert self.data._get_ignored_classes(1) == set()
+
+        self.data.add_ignored_classes(1, [12, 2])
+        self.data.add_ignored_classes(1, [4])
+        assert self.data._image_ignored_classes(1).tolist() == [2, 4, 12]
+        assert self.data._get_ignored_classes(1) == {4, 12}
+        assert self.data._image_ignored_classes(0).tolist() == []
+
+    def test_dict_annotations(self):
+        gts, _ = json_to_Data(f"{TEST_ASSETS_DIR}/soda_df_box_20_images.json")
+        arrays = gts.as_arrays()
+
+        assert len(arrays) == len(gts.annotations)
+        for image_id in gts.images:
+            anns = gts.get(image_id)
+            assert arrays.anns(image_id).tolist() == [ann["_id"] for ann in anns]
+            assert arrays.cls[arrays.anns(image_id)].tolist() == [
+                ann["class"] for ann in anns
+            ]
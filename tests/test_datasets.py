@@ -0,0 +1,197 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from tests.constants import TEST_ASSETS_DIR
+from tidecv import TIDE, datasets
+from tidecv import functions as f
+from tidecv.data import Data
+
+
+def write_coco_gt(path: str):
+    """Writes a small COCO / LVIS style annotation file with polygons and both kinds of crowd RLEs."""
+    images = [
+        {
+            "id": image_id,
+            "file_name": f"{image_id}.jpg",
+            "coco_url": f"http://images/{image_id}.jpg",
+            "width": 40,
+            "height": 30,
+            "neg_category_ids": [3] if image_id % 2 else [],
+            "not_exhaustive_category_ids": [2] if image_id % 3 == 0 else [],
+        }
+        for image_id in range(6)
+    ]
+    categories = [
+        {"id": _id, "name": f"c{_id}", "synset": f"s{_id}"} for _id in range(1, 5)
+    ]
+
+    segmentations = [
+        [[2, 2, 20, 2, 20, 12, 2, 12]],
+        [[5, 5, 15, 5, 10, 20], [25, 2, 35, 2, 30, 9]],
+        {"size": [30, 40], "counts": [100, 20, 10, 20, 1050]},
+        {"size": [30, 40], "counts": "h5:d00000000000000000000000000db0"},
+    ]
+    annotations = [
+        {
+            "id": _id,
+            "image_id": _id % 5,
+            "category_id": _id % 4 + 1,
+            "bbox": [_id % 7, 2, 10 + _id % 3, 9],
+            "iscrowd": int(isinstance(segmentations[_id % 4], dict)),
+            "segmentation": segmentations[_id % 4],
+        }
+        for _id in range(24)
+    ]
+
+    with open(path, "w") as json_file:
+        json.dump(
+            {"images": images, "annotations": annotations, "categories": categories},
+            json_file,
+        )
+
+
+class TestDatasets(TestCase):
+    def setUp(self):
+        with open(f"{TEST_ASSETS_DIR}/soda_df_box_20_images.json") as json_file:
+            records = json.load(json_file)
+
+        self.dets = [
+            {
+                "image_id": x["image_id"],
+                "category_id": x["pred"],
+                "score": x["confidence"],
+                "bbox": x["bbox_xywh"],
+            }
+            for x in records
+            if x["is_pred"]
+        ]
+
+    def test_iter_json_array(self):
+        for text in [
+            "[]",
+            " [ ] ",
+            "[1, 22, 333]",
+            '[{"a": [1, 2]},\n  "b" , null, 4.5e3 ]\n',
+            json.dumps(self.dets),
+        ]:
+            for chunk_size in [1, 7, 1 << 20]:
+                elements = datasets._iter_json_array(io.StringIO(text), chunk_size)
+                assert list(elements) == json.loads(text)
+
+        for text in ['{"a": 1}', "[1, 2", "[1 2]", '[{"a": 1]']:
+            with self.assertRaises(json.JSONDecodeError):
+                list(datasets._iter_json_array(io.StringIO(text), 4))
+
+    def test_coco_result(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "results.json")
+            with open(path, "w") as json_file:
+                json.dump(self.dets, json_file)
+
+            gz_path = os.path.join(tmp_dir, "results.json.gz")
+            with gzip.open(gz_path, "wt") as json_file:
+                json.dump(self.dets, json_file)
+
+            for data in [datasets.COCOResult(path), datasets.COCOResult(gz_path)]:
+                assert len(data.annotations) == len(self.dets)
+                for ann, det in zip(data.annotations, self.dets):
+                    assert ann["image"] == det["image_id"]
+                    assert ann["class"] == det["category_id"]
+                    assert ann["score"] == det["score"]
+                    assert ann["bbox"] == det["bbox"]
+                    assert ann["mask"] is None
+
+    def test_gt_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "gt.json")
+            write_coco_gt(path)
+
+            with mock.patch.dict(os.environ, {"TIDE_PATH": tmp_dir}):
+                for loader in [datasets.COCO, datasets.LVIS]:
+                    expected = loader(path)
+                    uncached = loader(path, use_cache=True)
+                    cached = loader(path, name="cached", use_cache=True)
+
+                    assert cached.name == "cached"
+                    for data in [uncached, cached]:
+                        assert data.max_dets == expected.max_dets
+                        assert data.classes == expected.classes
+                        assert list(data.images.items()) == list(
+                            expected.images.items()
+                        )
+                        for image_id in expected.images:
+                            assert data.get(image_id) == expected.get(image_id)
+
+                    # The cached data can still be added to
+                    cached.add_ground_truth(7, 1, [1, 2, 3, 4])
+                    assert cached.get(7)[0]["bbox"] == [1, 2, 3, 4]
+                    assert len(cached.annotations) == len(expected.annotations) + 1
+
+                # One for each loader, and the hashes of the files they loaded
+                assert len(os.listdir(datasets.get_cache_path())) == 3
+
+                # The file is only hashed again once it changes
+                with mock.patch("hashlib.sha256", wraps=hashlib.sha256) as sha256:
+                    datasets.COCO(path, use_cache=True)
+                    assert sha256.call_count == 0
+                    os.utime(path, ns=(0, 0))
+                    datasets.COCO(path, use_cache=True)
+                    assert sha256.call_count == 1
+
+                datasets.clear_cache()
+                assert not os.path.exists(datasets.get_cache_path())
+
+    def test_lazy_masks(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "gt.json")
+            write_coco_gt(path)
+            with open(path) as json_file:
+                anns = json.load(json_file)["annotations"]
+
+            gt = datasets.COCO(path, use_cache=False)
+            gt.rle_cache_size = 3
+
+        # Masks are kept the way they were in the file until they're evaluated
+        eager = Data("eager")
+        preds = Data("preds")
+        for idx, ann in enumerate(anns):
+            assert gt.annotations[idx]["mask"] == ann["segmentation"]
+
+            rle = f.toRLE(ann["segmentation"], 40, 30)
+            assert gt._rle(idx) == rle
+            assert len(gt._rles) <= 3
+
+            eager._add(
+                ann["image_id"],
+                ann["category_id"],
+                ann["bbox"],
+                rle,
+                ignore=bool(ann["iscrowd"]),
+            )
+            preds.add_detection(
+                ann["image_id"], ann["category_id"] % 4 + 1, 0.5, ann["bbox"], rle
+            )
+
+        tide = TIDE(mode=TIDE.MASK)
+        assert tide.evaluate(gt, preds).ap == tide.evaluate(eager, preds).ap
+
+    def test_convert_masks(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "gt.json")
+            write_coco_gt(path)
+
+            for loader in [datasets.COCO, datasets.LVIS]:
+                lazy = loader(path, use_cache=False)
+
+                for num_workers in [1, 2]:
+                    data = loader(path, use_cache=False, mask_workers=num_workers)
+                    assert len(data.annotations) == len(lazy.annotations)
+
+                    for ann, expected in zip(data.annotations, lazy.annotations):
+                        assert ann["mask"] == lazy._rle(expected["_id"])
+                        assert {**ann, "mask": None} == {**expected, "mask": None}
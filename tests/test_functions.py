@@ -0,0 +1,134 @@
+from unittest import TestCase
+
+import numpy as np
+from pycocotools import mask as mask_utils
+
+from tests.constants import RANDOM_SEED
+from tidecv import functions as f
+
+
+class TestFunctions(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(RANDOM_SEED)
+
+        # Integer boxes so that plenty of them touch, overlap exactly or not at all
+        self.boxes = rng.randint(0, 20, size=(50, 4)).astype(np.float64)
+        self.gt = rng.randint(0, 20, size=(30, 4)).astype(np.float64)
+        self.gt[:3, 2:] = 0  # Degenerate boxes
+        self.iscrowd = rng.rand(30) < 0.3
+
+    def test_box_iou_matches_pycocotools(self):
+        for iscrowd in [[False] * 30, self.iscrowd.tolist()]:
+            expected = mask_utils.iou(self.boxes.tolist(), self.gt.tolist(), iscrowd)
+            actual = f.box_iou(self.boxes, self.gt, iscrowd)
+
+            assert actual.shape == (50, 30)
+            assert (actual == expected).all()
+
+    def test_box_iou_empty(self):
+        assert f.box_iou(self.boxes, []).shape == (50, 0)
+        assert f.box_iou([], self.gt).shape == (0, 30)
+
+    def test_grouped_box_iou(self):
+        box_counts = [3, 0, 20, 27]
+        gt_counts = [5, 4, 0, 21]
+
+        ious = f.grouped_box_iou(
+            self.boxes, self.gt, box_counts, gt_counts, self.iscrowd
+        )
+        assert len(ious) == 4
+
+        box_start = gt_start = 0
+        for iou, n, m in zip(ious, box_counts, gt_counts):
+            expected = f.box_iou(
+                self.boxes[box_start : box_start + n],
+                self.gt[gt_start : gt_start + m],
+                self.iscrowd[gt_start : gt_start + m],
+            )
+            assert iou.shape == (n, m)
+            assert (iou == expected).all()
+
+            box_start += n
+            gt_start += m
+
+    def test_grouped_box_iou_sparse(self):
+        rng = np.random.RandomState(RANDOM_SEED)
+
+        # Big groups so that only the overlapping pairs get computed
+        box_counts = [200, 0, 150, 1]
+        gt_counts = [40, 10, 60, 0]
+        boxes = rng.randint(0, 100, size=(351, 4)).astype(np.float64)
+        gt = rng.randint(0, 100, size=(110, 4)).astype(np.float64)
+        boxes[:5] = np.nan  # Missing boxes
+        gt[:5] = np.nan
+        gt[5:8, 2:] = 0
+        iscrowd = rng.rand(110) < 0.3
+
+        ious = f.grouped_box_iou(boxes, gt, box_counts, gt_counts, iscrowd)
+
+        box_start = gt_start = 0
+        for iou, n, m in zip(ious, box_counts, gt_counts):
+            expected = f.box_iou(
+                boxes[box_start : box_start + n],
+                gt[gt_start : gt_start + m],
+                iscrowd[gt_start : gt_start + m],
+            )
+            assert iou.shape == (n, m)
+            assert (iou == expected).all()
+
+            box_start += n
+            gt_start += m
+
+    def test_greedy_match(self):
+        rng = np.random.RandomState(RANDOM_SEED)
+
+        for _ in range(100):
+            # Coarse IoUs so that there are plenty of ties
+            iou = rng.randint(0, 5, size=(rng.randint(0, 30), rng.randint(0, 10))) / 4
+            thresh = rng.choice([0, 0.5, 0.75, 1])
+
+            # The original greedy loop
+            expected_rows = np.full(iou.shape[0], -1)
+            expected_cols = np.full(iou.shape[1], -1)
+            buffer = iou.copy()
+            for row in range(iou.shape[0] if iou.shape[1] > 0 else 0):
+                col = np.argmax(buffer[row])
+                if buffer[row, col] >= thresh:
+                    expected_rows[row] = col
+                    expected_cols[col] = row
+                    buffer[:, col] = 0
+
+            rows, cols, row_max = f.greedy_match(iou, thresh)
+            assert rows.tolist() == expected_rows.tolist()
+            assert cols.tolist() == expected_cols.tolist()
+            if iou.shape[1] > 0:
+                assert (row_max == iou.max(axis=1)).all()
+            else:
+                assert (row_max == 0).all()
+
+    def test_greedy_match_thresholds(self):
+        rng = np.random.RandomState(RANDOM_SEED)
+        thresholds = [0, 0.25, 0.5, 0.75, 1]
+
+        for _ in range(100):
+            # Coarse IoUs so that there are plenty of ties
+            iou = rng.randint(0, 5, size=(rng.randint(0, 30), rng.randint(0, 10))) / 4
+
+            # Matching at every threshold at once should be the same as matching at each one
+            rows, cols, row_max = f.greedy_match_thresholds(iou, thresholds)
+            for idx, thresh in enumerate(thresholds):
+                expected_rows, expected_cols, expected_max = f.greedy_match(iou, thresh)
+                assert rows[idx].tolist() == expected_rows.tolist()
+                assert cols[idx].tolist() == expected_cols.tolist()
+                assert row_max.tolist() == expected_max.tolist()
+
+    def test_top_k(self):
+        rng = np.random.RandomState(RANDOM_SEED)
+
+        for _ in range(100):
+            # Coarse scores so that there are plenty of ties
+            scores = rng.randint(0, 5, size=rng.randint(0, 50)) / 4
+            k = rng.choice([None, 0, 1, 10, 100])
+
+            expected = sorted(range(len(scores)), key=lambda idx: -scores[idx])[:k]
+            assert f.top_k(scores, k).tolist() == expected
@@ -60,6 +60,32 @@ class TestHelpers(TestCase):
             preds_new_id_to_old_id[pred["_id"]] for pred in preds_enlarged.annotations
         } == {3, 11, 20, 24, 28}
 
+    def test_enlarge_dataset_to_respect_TIDE_run(self):
+        """
+        Assert that passing the run gives the same as passing its errors,
+        and that errors that don't come from a run are refused
+        """
+        gts_keep = [0, 5, 10]
+        preds_keep = [3, 11]
+
+        expected = enlarge_dataset_to_respect_TIDE(
+            self.SODA_gts, self.SODA_preds, gts_keep, preds_keep, self.run.errors
+        )
+        result = enlarge_dataset_to_respect_TIDE(
+            self.SODA_gts, self.SODA_preds, gts_keep, preds_keep, self.run
+        )
+        assert result[2] == expected[2]
+        assert result[3] == expected[3]
+
+        with self.assertRaises(TypeError):
+            enlarge_dataset_to_respect_TIDE(
+                self.SODA_gts,
+                self.SODA_preds,
+                gts_keep,
+                preds_keep,
+                list(self.run.errors),
+            )
+
     def test_enlarge_dataset_to_respect_TIDE_2(self):
         """
         Assert that if we re-run TIDE, we do have the same error types
@@ -0,0 +1,699 @@
+import os
+import random
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+import numpy as np
+from pycocotools import mask as mask_utils
+
+from tests.constants import RANDOM_SEED, TEST_ASSETS_DIR, mAP_threshold
+from tidecv import functions as f
+from tidecv.data import Data
+from tidecv.errors.qualifiers import AREA, Qualifier
+from tidecv.helpers import json_to_Data
+from tidecv.quantify import TIDE, ThresholdExample, TIDEExample, TIDERun
+
+
+def error_uids(run) -> list:
+    """Identifies every error in a run by its type and the ids involved."""
+    return [
+        (
+            error.short_name,
+            error.pred["_id"] if error.is_pred() else None,
+            error.gt["_id"] if error.is_gt() else None,
+        )
+        for error in run.errors
+    ]
+
+
+def reference_main_errors(
+    run, progressive=False, qual=None, pred_dict=None, gt_dict=None
+) -> dict:
+    """Computes the main errors of a run by rebuilding the AP data with fix_errors every time."""
+    ap_data = run.ap_data
+    if pred_dict or gt_dict:
+        ap_data = ap_data.apply_qualifier(pred_dict, gt_dict)
+    last_ap = ap_data.get_mAP()
+    qual = Qualifier("", None) if qual is None else qual
+
+    errors = {}
+    for error in TIDE._error_types:
+        _ap_data = run.fix_errors(
+            qual._make_error_func(error),
+            ap_data=ap_data,
+            disable_errors=progressive,
+            pred_dict=pred_dict,
+            gt_dict=gt_dict,
+        )
+        new_ap = _ap_data.get_mAP()
+        errors[error] = max(new_ap - last_ap, 0)
+
+        if progressive:
+            last_ap = new_ap
+            ap_data = _ap_data
+
+    for error in run.errors:
+        error.disabled = False
+
+    return errors
+
+
+class TestQuantify(TestCase):
+    def setUp(self):
+        json_path = f"{TEST_ASSETS_DIR}/soda_df_box_20_images.json"
+        self.SODA_gts, self.SODA_preds = json_to_Data(json_path)
+
+    def test_numpy_box_iou(self):
+        tides = [
+            TIDE(pos_threshold=mAP_threshold, numpy_box_iou=numpy_box_iou)
+            for numpy_box_iou in [False, True]
+        ]
+        runs = [
+            tide.evaluate(gt=self.SODA_gts, preds=self.SODA_preds, name="tide_run")
+            for tide in tides
+        ]
+
+        assert runs[0].ap == runs[1].ap
+        assert error_uids(runs[0]) == error_uids(runs[1])
+        assert tides[0].get_main_errors() == tides[1].get_main_errors()
+
+    def test_mask_iou(self):
+        rng = random.Random(RANDOM_SEED)
+        gt, preds = Data("gt"), Data("preds")
+
+        def random_mask():
+            x, y = rng.uniform(-5, 90), rng.uniform(-5, 70)
+            w, h = rng.uniform(1, 20), rng.uniform(1, 20)
+            poly = [[x, y, x + w, y + h / 2, x + w / 2, y + h]]
+            if rng.random() < 0.5:
+                return poly
+            return mask_utils.merge(mask_utils.frPyObjects(poly, 80, 100))
+
+        for image_id in range(10):
+            gt.add_image(image_id, str(image_id), 100, 80)
+            preds.add_image(image_id, str(image_id), 100, 80)
+            for _ in range(rng.randint(0, 10)):
+                gt.add_ground_truth(image_id, rng.randint(0, 3), mask=random_mask())
+            for _ in range(rng.randint(0, 3)):
+                gt.add_ignore_region(
+                    image_id, -1, mask=rng.choice([None, random_mask()])
+                )
+            for _ in range(rng.randint(0, 30)):
+                preds.add_detection(
+                    image_id, rng.randint(0, 3), rng.random(), mask=random_mask()
+                )
+
+        # Only computing the IoU of masks whose boxes overlap should give the same IoUs as all of them
+        run = TIDE(mode=TIDE.MASK).evaluate(gt=gt, preds=preds)
+        batch = list(run._image_batches(list(gt.images)))[0]
+        for (image, pred_ids, gt_ids), (gt_iou, ignore_iou, _) in zip(
+            batch, run._batch_matrices(batch)
+        ):
+            pred_rles = [preds._rle(idx) for idx in pred_ids]
+            for ids, iou, iscrowd in [
+                (gt_ids[~run.gt_arrays.ignore[gt_ids]], gt_iou, False),
+                (gt_ids[run.gt_arrays.ignore[gt_ids]], ignore_iou, True),
+            ]:
+                expected = np.zeros((len(pred_ids), len(ids)))
+                for col, idx in enumerate(ids):
+                    if gt._rle(idx) is not None and len(pred_rles) > 0:
+                        expected[:, col] = mask_utils.iou(
+                            pred_rles, [gt._rle(idx)], [iscrowd]
+                        )[:, 0]
+                assert (iou == expected).all()
+                assert iou.shape == expected.shape
+
+    def test_max_dets(self):
+        rng = random.Random(RANDOM_SEED)
+        gt, preds = Data("gt", max_dets=5), Data("preds")
+
+        def random_box():
+            return [rng.randint(0, 40), rng.randint(0, 40), 10, 10]
+
+        for image_id in range(30):
+            for _ in range(rng.randint(0, 5)):
+                gt.add_ground_truth(image_id, rng.randint(0, 2), random_box())
+            # Runs without errors drop the predictions of these before taking the top max_dets
+            gt.add_ignored_classes(image_id, [3, rng.randint(0, 2)])
+
+            for _ in range(rng.randint(0, 20)):
+                # Coarse scores so that there are ties at the cutoff
+                preds.add_detection(
+                    image_id, rng.randint(0, 3), rng.randint(0, 4) / 4, random_box()
+                )
+
+        # Only keeping the predictions that can make it into the top max_dets shouldn't change anything
+        runs = []
+        for prefilter in [True, False]:
+            tide = TIDE()
+            if not prefilter:
+                top_pred_ids = TIDERun._top_pred_ids
+                TIDERun._top_pred_ids = lambda run, image: run.preds_arrays.anns(image)
+            try:
+                tide.evaluate_range(gt=gt, preds=preds, name="tide_run")
+            finally:
+                if not prefilter:
+                    TIDERun._top_pred_ids = top_pred_ids
+            runs.append(tide.run_thresholds["tide_run"])
+
+        for filtered_run, full_run in zip(*runs):
+            assert filtered_run.ap == full_run.ap
+            assert filtered_run.ap_data.get_APs() == full_run.ap_data.get_APs()
+            assert error_uids(filtered_run) == error_uids(full_run)
+
+    def test_evaluate_range(self):
+        tide = TIDE(pos_threshold=mAP_threshold)
+        tide.evaluate_range(gt=self.SODA_gts, preds=self.SODA_preds, name="tide_run")
+        thresh_runs = tide.run_thresholds["tide_run"]
+
+        assert [run.pos_thresh for run in thresh_runs] == TIDE.COCO_THRESHOLDS
+        assert [run.run_errors for run in thresh_runs] == [True] + [False] * 9
+        assert tide.runs["tide_run"] is thresh_runs[0]
+
+        # Sharing IoUs between thresholds shouldn't change anything
+        for run in thresh_runs:
+            single = TIDE().evaluate(
+                gt=self.SODA_gts,
+                preds=self.SODA_preds,
+                pos_threshold=run.pos_thresh,
+                use_for_errors=run.run_errors,
+            )
+            assert run.ap == single.ap
+            assert run.ap_data.get_APs() == single.ap_data.get_APs()
+            assert error_uids(run) == error_uids(single)
+
+    def test_num_workers(self):
+        serial = TIDE(pos_threshold=mAP_threshold)
+        serial_run = serial.evaluate(
+            gt=self.SODA_gts, preds=self.SODA_preds, name="tide_run"
+        )
+
+        parallel = TIDE(pos_threshold=mAP_threshold)
+        parallel_run = parallel.evaluate(
+            gt=self.SODA_gts, preds=self.SODA_preds, name="tide_run", num_workers=2
+        )
+
+        assert parallel_run.ap == serial_run.ap
+        assert parallel_run.ap_data.get_APs() == serial_run.ap_data.get_APs()
+        assert error_uids(parallel_run) == error_uids(serial_run)
+        assert {
+            _cls: [truth["_id"] for truth in truths]
+            for _cls, truths in parallel_run.false_negatives.items()
+        } == {
+            _cls: [truth["_id"] for truth in truths]
+            for _cls, truths in serial_run.false_negatives.items()
+        }
+        assert parallel.get_main_errors() == serial.get_main_errors()
+        assert parallel.get_special_errors() == serial.get_special_errors()
+
+        # Errors point to our annotations, and the info the workers worked out comes back with the run
+        for error in parallel_run.errors:
+            if error.is_pred():
+                assert error.pred is self.SODA_preds.annotations[error.get_id()]
+                assert error.info is parallel_run.pred_info[error.get_id()]
+        assert parallel_run.pred_info == serial_run.pred_info
+
+    def test_shards(self):
+        rng = random.Random(RANDOM_SEED)
+        images = list(self.SODA_gts.images)
+        rng.shuffle(images)
+
+        # Split the images into shards that aren't in order, with their own gt and preds
+        shards = []
+        for shard_images in [images[0::3], images[1::3], images[2::3]]:
+            gt, preds = Data("gt"), Data("preds")
+            for image_id in shard_images:
+                for ann in self.SODA_gts.get(image_id):
+                    add = gt.add_ignore_region if ann["ignore"] else gt.add_ground_truth
+                    add(image_id, ann["class"], ann["bbox"], ann["mask"])
+                for ann in self.SODA_preds.get(image_id):
+                    # Coarse scores so that there are ties between the shards
+                    preds.add_detection(
+                        image_id,
+                        ann["class"],
+                        round(ann["score"], 1),
+                        ann["bbox"],
+                        ann["mask"],
+                    )
+            shards.append((gt, preds))
+
+        gt, preds = Data("gt"), Data("preds")
+        for image_id in sorted(images):
+            for shard_gt, shard_preds in shards:
+                for ann in shard_gt.get(image_id):
+                    add = gt.add_ignore_region if ann["ignore"] else gt.add_ground_truth
+                    add(image_id, ann["class"], ann["bbox"], ann["mask"])
+                for ann in shard_preds.get(image_id):
+                    preds.add_detection(
+                        image_id, ann["class"], ann["score"], ann["bbox"], ann["mask"]
+                    )
+
+        single = TIDE(pos_threshold=mAP_threshold)
+        single_run = single.evaluate(gt=gt, preds=preds, name="tide_run")
+
+        # Merging the shards (saved to files and loaded back) should give exactly the same run
+        merged = TIDE(pos_threshold=mAP_threshold)
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for idx, (shard_gt, shard_preds) in enumerate(shards):
+                paths.append(os.path.join(directory, f"shard_{idx}.pkl"))
+                merged.evaluate_shard(shard_gt, shard_preds, path=paths[-1])
+            merged_run = merged.merge_shards(paths[::-1], name="tide_run")
+
+        assert merged_run.ap == single_run.ap
+        assert merged_run.ap_data.get_APs() == single_run.ap_data.get_APs()
+        assert [error.short_name for error in merged_run.errors] == [
+            error.short_name for error in single_run.errors
+        ]
+        assert merged.get_main_errors() == single.get_main_errors()
+        assert merged.get_special_errors() == single.get_special_errors()
+
+    def test_incremental(self):
+        tide = TIDE(pos_threshold=mAP_threshold)
+        run = tide.evaluate(gt=self.SODA_gts, preds=self.SODA_preds, name="tide_run")
+
+        rng = random.Random(RANDOM_SEED)
+        images = list(set(self.SODA_gts.images).union(self.SODA_preds.images))
+        rng.shuffle(images)
+
+        # Evaluating the images one at a time, in any order, should give the same results
+        incremental = tide.evaluate_incremental(self.SODA_gts)
+        for image_id in images:
+            incremental.update(
+                image_id,
+                [
+                    {"class": x["class"], "score": x["score"], "bbox": x["bbox"]}
+                    for x in self.SODA_preds.get(image_id)
+                ],
+            )
+
+        assert incremental.compute() == {
+            "ap": run.ap,
+            "main": tide.get_main_errors()["tide_run"],
+            "special": tide.get_special_errors()["tide_run"],
+        }
+        with self.assertRaises(ValueError):
+            incremental.update(images[0], [])
+
+    def test_reevaluate(self):
+        rng = random.Random(RANDOM_SEED)
+        changed = set(rng.sample(sorted(self.SODA_preds.images), 3))
+
+        # Change the predictions of a few images, dropping one so that the ids after it change
+        preds = Data("preds")
+        for image_id in self.SODA_preds.images:
+            anns = self.SODA_preds.get(image_id)
+            if image_id in changed:
+                anns = anns[1:]
+            for ann in anns:
+                score = ann["score"] / 2 if image_id in changed else ann["score"]
+                preds.add_detection(image_id, ann["class"], score, ann["bbox"])
+
+        for num_workers in [1, 2]:
+            tide = TIDE(pos_threshold=mAP_threshold)
+            tide.evaluate(
+                gt=self.SODA_gts,
+                preds=self.SODA_preds,
+                name="tide_run",
+                num_workers=num_workers,
+                keep_images=True,
+            )
+
+            # Only the changed images should be evaluated again
+            with mock.patch.object(
+                TIDERun, "_eval_images", wraps=TIDERun._eval_images
+            ) as eval_images:
+                run = tide.reevaluate("tide_run", preds, name="tide_run")
+            assert set(eval_images.call_args[0][1]) == changed
+
+            single = TIDE(pos_threshold=mAP_threshold)
+            single_run = single.evaluate(gt=self.SODA_gts, preds=preds, name="tide_run")
+
+            assert run.ap == single_run.ap
+            assert run.ap_data.get_APs() == single_run.ap_data.get_APs()
+            assert error_uids(run) == error_uids(single_run)
+            assert run.pred_info == single_run.pred_info
+            assert tide.get_main_errors() == single.get_main_errors()
+            assert tide.get_special_errors() == single.get_special_errors()
+
+    def test_evaluate_many(self):
+        json_path = f"{TEST_ASSETS_DIR}/soda_df_box_20_images.json"
+        _, other_preds = json_to_Data(json_path)
+        for pred in other_preds.annotations:
+            pred["score"] = 1 - pred["score"]
+        preds_list = [self.SODA_preds, other_preds]
+
+        single = TIDE(pos_threshold=mAP_threshold)
+        single_runs = [
+            single.evaluate(gt=self.SODA_gts, preds=preds, name=name)
+            for preds, name in zip(preds_list, ["a", "b"])
+        ]
+
+        # Sharing the gt between the runs (in this process or not) shouldn't change any of them
+        for num_workers in [1, 2]:
+            tide = TIDE(pos_threshold=mAP_threshold)
+            runs = tide.evaluate_many(
+                self.SODA_gts, preds_list, names=["a", "b"], num_workers=num_workers
+            )
+
+            assert list(tide.runs) == ["a", "b"]
+            for run, single_run in zip(runs, single_runs):
+                assert run.ap == single_run.ap
+                assert run.ap_data.get_APs() == single_run.ap_data.get_APs()
+                assert error_uids(run) == error_uids(single_run)
+            assert tide.get_main_errors() == single.get_main_errors()
+            assert tide.get_special_errors() == single.get_special_errors()
+
+    def test_evaluate_many_masks(self):
+        rng = random.Random(RANDOM_SEED)
+        gt = Data("gt")
+        preds_list = [Data("a"), Data("b")]
+
+        def random_poly(offset=0):
+            x, y = rng.uniform(0, 80) + offset, rng.uniform(0, 60) + offset
+            w, h = rng.uniform(1, 20), rng.uniform(1, 20)
+            return [[x, y, x + w, y + h / 2, x + w / 2, y + h]]
+
+        for image_id in range(5):
+            for data in [gt] + preds_list:
+                data.add_image(image_id, str(image_id), 100, 80)
+            for _ in range(rng.randint(1, 8)):
+                gt.add_ground_truth(image_id, rng.randint(0, 2), mask=random_poly())
+            # Far away from all of the predictions
+            gt.add_ground_truth(image_id, 0, mask=random_poly(offset=200))
+            for preds in preds_list:
+                for _ in range(rng.randint(0, 15)):
+                    preds.add_detection(
+                        image_id, rng.randint(0, 2), rng.random(), mask=random_poly()
+                    )
+        far_ids = {ann["_id"] for ann in gt.annotations if ann["mask"][0][0] > 150}
+        masks = [ann["mask"] for ann in gt.annotations]
+
+        single_runs = [
+            TIDE(mode=TIDE.MASK).evaluate(gt=gt, preds=preds) for preds in preds_list
+        ]
+
+        # The runs share the RLEs of the gt masks, without converting any more of them or rewriting gt
+        with mock.patch.object(gt, "_rle", wraps=gt._rle) as rle:
+            runs = TIDE(mode=TIDE.MASK).evaluate_many(gt, preds_list)
+        converted = [call.args[0] for call in rle.call_args_list]
+        assert len(converted) == len(set(converted))
+        assert far_ids.isdisjoint(converted)
+        assert [ann["mask"] for ann in gt.annotations] == masks
+
+        for run, single_run in zip(runs, single_runs):
+            assert run.ap == single_run.ap
+            assert error_uids(run) == error_uids(single_run)
+
+    def test_class_ids(self):
+        def with_names(data: Data) -> Data:
+            named = Data(data.name)
+            for image_id in data.images:
+                for ann in data.get(image_id):
+                    assert not ann["ignore"]
+                    named._add(
+                        image_id,
+                        f"c{ann['class']}",
+                        ann["bbox"],
+                        score=ann.get("score", 1),
+                    )
+            return named
+
+        # Evaluating with string class ids should give the same results as with int ones
+        tide = TIDE(pos_threshold=mAP_threshold)
+        run = tide.evaluate(self.SODA_gts, self.SODA_preds, name="ints")
+        named_run = tide.evaluate(
+            with_names(self.SODA_gts), with_names(self.SODA_preds), name="names"
+        )
+
+        assert named_run.ap == run.ap
+        assert named_run.ap_data.get_APs() == {
+            f"c{_cls}": ap for _cls, ap in run.ap_data.get_APs().items()
+        }
+        errors = tide.get_main_errors()
+        assert errors["names"] == errors["ints"]
+
+    def test_threads(self):
+        json_path = f"{TEST_ASSETS_DIR}/soda_df_box_20_images.json"
+        _, other_preds = json_to_Data(json_path)
+        for pred in other_preds.annotations:
+            pred["score"] = 1 - pred["score"]
+
+        gt_anns = [dict(ann) for ann in self.SODA_gts.annotations]
+        pred_anns = [dict(ann) for ann in self.SODA_preds.annotations]
+
+        def evaluate(preds):
+            tide = TIDE(pos_threshold=mAP_threshold)
+            tide.evaluate_range(gt=self.SODA_gts, preds=preds, name="tide_run")
+            return tide
+
+        # Evaluating the same gt with several runs at once shouldn't change the results
+        jobs = [self.SODA_preds, other_preds] * 4
+        with ThreadPoolExecutor(4) as pool:
+            threaded = list(pool.map(evaluate, jobs))
+
+        for tide, preds in zip(threaded, jobs):
+            serial = evaluate(preds)
+            for run, serial_run in zip(
+                tide.run_thresholds["tide_run"], serial.run_thresholds["tide_run"]
+            ):
+                assert run.ap == serial_run.ap
+                assert error_uids(run) == error_uids(serial_run)
+                assert run.pred_info == serial_run.pred_info
+            assert tide.get_main_errors() == serial.get_main_errors()
+
+        # And nothing is stored in the annotations
+        assert [dict(ann) for ann in self.SODA_gts.annotations] == gt_anns
+        assert [dict(ann) for ann in self.SODA_preds.annotations] == pred_anns
+
+    def test_cached_errors(self):
+        tide = TIDE(pos_threshold=mAP_threshold)
+        tide.evaluate(gt=self.SODA_gts, preds=self.SODA_preds, name="tide_run")
+        main_errors = tide.get_main_errors()["tide_run"]
+        special_errors = tide.get_special_errors()["tide_run"]
+
+        assert tide.get_main_errors()["tide_run"] is main_errors
+        assert tide.get_special_errors()["tide_run"] is special_errors
+
+        # Evaluating again under the same name forgets the errors of the old run
+        tide.evaluate(
+            gt=self.SODA_gts, preds=self.SODA_preds, pos_threshold=0.75, name="tide_run"
+        )
+        assert tide.get_main_errors()["tide_run"] != main_errors
+        assert tide.get_special_errors()["tide_run"] != special_errors
+
+    def test_fix_main_errors(self):
+        run = TIDE(pos_threshold=mAP_threshold).evaluate(
+            gt=self.SODA_gts, preds=self.SODA_preds, name="tide_run"
+        )
+
+        rng = random.Random(RANDOM_SEED)
+        pred_dict = defaultdict(set)
+        for pred in rng.sample(list(self.SODA_preds.annotations), 100):
+            pred_dict[pred["class"]].add(pred["_id"])
+        gt_dict = defaultdict(set)
+        for gt in rng.sample(list(self.SODA_gts.annotations), 100):
+            gt_dict[gt["class"]].add(gt["_id"])
+
+        for progressive in [False, True]:
+            for qual in [None, AREA[0], AREA[2]]:
+                assert run.fix_main_errors(
+                    progressive=progressive, qual=qual
+                ) == reference_main_errors(run, progressive, qual)
+
+            assert run.fix_main_errors(
+                progressive=progressive, pred_dict=pred_dict, gt_dict=gt_dict
+            ) == reference_main_errors(run, progressive, None, pred_dict, gt_dict)
+
+    def test_ignored_classes(self):
+        json_path = f"{TEST_ASSETS_DIR}/soda_df_box_20_images.json"
+        gt_regions, _ = json_to_Data(json_path)
+        gt_classes, _ = json_to_Data(json_path)
+
+        rng = random.Random(RANDOM_SEED)
+        classes = sorted(gt_classes.classes)
+        for image_id in list(gt_classes.images):
+            ignored = rng.sample(classes, rng.randint(0, len(classes)))
+            for _cls in ignored:
+                gt_regions.add_ignore_region(image_id, _cls)
+            gt_classes.add_ignored_classes(image_id, ignored)
+
+        # Ignoring classes for the whole image should be the same as adding an ignore region for each
+        tides = [TIDE(pos_threshold=mAP_threshold) for _ in range(2)]
+        for tide, gt in zip(tides, [gt_regions, gt_classes]):
+            tide.evaluate_range(gt=gt, preds=self.SODA_preds, name="tide_run")
+
+        for regions_run, classes_run in zip(
+            *[tide.run_thresholds["tide_run"] for tide in tides]
+        ):
+            assert regions_run.ap == classes_run.ap
+            assert error_uids(regions_run) == error_uids(classes_run)
+        assert tides[0].get_main_errors() == tides[1].get_main_errors()
+        assert tides[0].get_special_errors() == tides[1].get_special_errors()
+
+    def test_ignore_regions(self):
+        rng = random.Random(RANDOM_SEED)
+
+        def random_box():
+            return [
+                rng.uniform(0, 50),
+                rng.uniform(0, 50),
+                rng.uniform(5, 50),
+                rng.uniform(5, 50),
+            ]
+
+        num_ignored = 0
+        for _ in range(50):
+            preds = [
+                {
+                    "_id": idx,
+                    "class": rng.randint(0, 3),
+                    "score": rng.random(),
+                    "bbox": random_box(),
+                    "mask": None,
+                }
+                for idx in range(rng.randint(1, 30))
+            ]
+            gt = [
+                {
+                    "_id": idx,
+                    "class": rng.randint(0, 3),
+                    "bbox": random_box(),
+                    "mask": None,
+                    "ignore": False,
+                }
+                for idx in range(rng.randint(0, 5))
+            ]
+            gt += [
+                {
+                    "_id": len(gt) + idx,
+                    "class": rng.choice([-1, None, 0, 1, 2, 3]),
+                    "bbox": rng.choice([None, random_box(), random_box()]),
+                    "mask": None,
+                    "ignore": True,
+                }
+                for idx in range(rng.randint(0, 6))
+            ]
+            ex = TIDEExample(preds, gt, 0.5, TIDE.BOX, 100, run_errors=False)
+
+            # Check every prediction against every region like the original implementation did
+            for pred, used in zip(ex.preds, ex.pred_used):
+                in_region = False
+                for region in ex.ignore_regions:
+                    if region["bbox"] is None:
+                        iou = 1
+                    else:
+                        iou = f.box_iou([pred["bbox"]], [region["bbox"]], [True])[0, 0]
+                    if iou > 0.5 and region["class"] in (pred["class"], -1):
+                        in_region = True
+
+                if used is not True:
+                    assert used is (None if in_region else False)
+                    num_ignored += in_region
+
+        assert num_ignored > 0
+
+    def test_threshold_example(self):
+        rng = random.Random(RANDOM_SEED)
+
+        def random_box():
+            return [
+                rng.uniform(0, 50),
+                rng.uniform(0, 50),
+                rng.uniform(5, 50),
+                rng.uniform(5, 50),
+            ]
+
+        for _ in range(50):
+            preds = [
+                {
+                    "_id": idx,
+                    "class": rng.randint(0, 3),
+                    "score": rng.randint(0, 4) / 4,
+                    "bbox": random_box(),
+                    "mask": None,
+                }
+                for idx in range(rng.randint(1, 30))
+            ]
+            gt = [
+                {
+                    "_id": idx,
+                    "class": rng.randint(0, 3),
+                    "bbox": random_box(),
+                    "mask": None,
+                    "ignore": False,
+                }
+                for idx in range(rng.randint(0, 8))
+            ]
+            gt += [
+                {
+                    "_id": len(gt) + idx,
+                    "class": rng.choice([-1, 0, 1, 2, 3]),
+                    "bbox": rng.choice([None, random_box()]),
+                    "mask": None,
+                    "ignore": True,
+                }
+                for idx in range(rng.randint(0, 3))
+            ]
+            ignored_classes = np.array(rng.sample(range(4), rng.randint(0, 1)))
+
+            # Matching at every threshold at once should be the same as matching at each one
+            ex = ThresholdExample(
+                preds,
+                gt,
+                TIDE.COCO_THRESHOLDS,
+                TIDE.BOX,
+                20,
+                ignored_classes=ignored_classes,
+            )
+            for idx, thresh in enumerate(TIDE.COCO_THRESHOLDS):
+                single = TIDEExample(
+                    preds,
+                    gt,
+                    thresh,
+                    TIDE.BOX,
+                    20,
+                    run_errors=False,
+                    ignored_classes=ignored_classes,
+                )
+                assert [pred["_id"] for pred in ex.preds] == [
+                    pred["_id"] for pred in single.preds
+                ]
+                assert [
+                    None if ignored else bool(tp)
+                    for tp, ignored in zip(ex.tp[idx], ex.ignored[idx])
+                ] == single.pred_used
+                assert ex.pred_match[idx].tolist() == single.pred_match.tolist()
+                assert ex.gt_match[idx].tolist() == single.gt_match.tolist()
+                assert ex.pred_iou.tolist() == single.pred_iou.tolist()
+
+    def test_edit_annotations(self):
+        for from_dicts in [False, True]:
+            gt, preds = Data("gt"), Data("preds")
+            gt.add_ground_truth(0, 1, [0, 0, 10, 10])
+            preds.add_detection(0, 0, 0.9, [50, 50, 10, 10])
+            if from_dicts:
+                gt.annotations = [dict(ann) for ann in gt.annotations]
+                preds.annotations = [dict(ann) for ann in preds.annotations]
+            assert TIDE().evaluate(gt=gt, preds=preds).ap == 0
+
+            # Evaluation should see changes to the annotations, and read them all from the same place
+            pred = preds.get(0)[0]
+            pred["bbox"] = [0, 0, 10, 10]
+            pred["class"] = 1
+            run = TIDE().evaluate(gt=gt, preds=preds)
+            assert run.ap == 100
+            assert run.errors == []
+
+        # And it doesn't keep the dicts it makes for the annotations
+        gt, preds = Data("gt"), Data("preds")
+        for ann in self.SODA_gts.annotations:
+            gt.add_ground_truth(ann["image_id"], ann["class"], ann["bbox"])
+        for ann in self.SODA_preds.annotations:
+            preds.add_detection(
+                ann["image_id"], ann["class"], ann["score"], ann["bbox"]
+            )
+        TIDE().evaluate(gt=gt, preds=preds)
+        assert len(gt._dicts) == 0 and len(preds._dicts) == 0
@@ -7,6 +7,49 @@ from pycocotools import mask as mask_utils
 from .data import Data
 
 
+def _compute_ap(
+    scores: np.ndarray, is_true: np.ndarray, num_gt_positives: int
+) -> tuple:
+    """
+    Computes the AP of the given data points (in the order they were added) and returns it along
+    with the PR curve used to compute it. num_gt_positives must be > 0.
+    """
+    num_points = len(scores)
+
+    # Sort descending by score (stable, so ties keep the order they were added in)
+    is_true = is_true[np.argsort(-scores, kind="stable")]
+
+    # Compute the precision-recall curve. The x axis is recalls and the y axis precisions.
+    num_true = np.cumsum(is_true)
+    precisions = num_true / np.arange(1, num_points + 1)
+    recalls = num_true / num_gt_positives
+
+    # Smooth the curve by computing [max(precisions[i:]) for i in range(len(precisions))]
+    # Basically, remove any temporary dips from the curve.
+    # At least that's what I think, idk. COCOEval did it so I do too.
+    precisions = np.maximum.accumulate(precisions[::-1])[::-1]
+
+    # Compute the integral of precision(recall) d_recall from recall=0->1 using fixed-length riemann summation with 101 bars.
+    resolution = 100  # Standard COCO Resoluton
+    x_range = np.array([x / resolution for x in range(resolution + 1)])
+    y_range = np.zeros(
+        resolution + 1
+    )  # idx 0 is recall == 0.0 and idx 100 is recall == 1.00
+
+    # I realize this is weird, but all it does is find the nearest precision(x) for a given x in x_range.
+    # Basically, if the closest recall we have to 0.01 is 0.009 this sets precision(0.01) = precision(0.009).
+    # I approximate the integral this way, because that's how COCOEval does it.
+    indices = np.searchsorted(recalls, x_range, side="left")
+    found = indices < num_points
+    y_range[found] = precisions[indices[found]]
+    y_range = y_range.tolist()
+
+    # Finally compute the riemann sum to get our integral.
+    # avg([precision(x) for x in 0:0.01:1])
+    # Note: this is a plain python sum on purpose, since np.sum adds things up in a different order.
+    return sum(y_range) / len(y_range) * 100, (x_range, y_range)
+
+
 class APDataObject:
     """
     Stores all the information necessary to calculate the AP for one IoU and one class.
@@ -18,6 +61,11 @@ class APDataObject:
         self.false_negatives = set()  # set of FN ids (i.e., not TPs, i.e., FN + Missed)
         self.num_gt_positives = 0  # total number of GTs
         self.curve = None
+        self.ap = None  # cached result of get_ap
+
+    def _invalidate(self):
+        self.curve = None
+        self.ap = None
 
     def apply_qualifier_no_check(self, kept_preds: set, kept_gts: set) -> object:
         """
@@ -81,13 +129,21 @@ class APDataObject:
 
     def push(self, id: int, score: float, is_true: bool, info: dict = {}):
         self.data_points[id] = (score, is_true, info)
+        self._invalidate()
+
+    def push_many(self, points: dict):
+        """Pushes several data points at once, given as a dict of id -> (score, is_true, info)."""
+        self.data_points.update(points)
+        self._invalidate()
 
     def push_false_negative(self, id: int):
         self.false_negatives.add(id)
+        self._invalidate()
 
     def add_gt_positives(self, num_positives: int):
         """Call this once per image."""
         self.num_gt_positives += num_positives
+        self._invalidate()
 
     def is_empty(self) -> bool:
         return len(self.data_points) == 0 and self.num_gt_positives == 0
@@ -98,69 +154,61 @@ class APDataObject:
         return self.curve
 
     def get_ap(self) -> float:
-        """Warning: result not cached."""
+        """
+        The result (and the PR curve) is cached until the data changes through push,
+        push_false_negative or add_gt_positives.
+        """
+        if self.ap is not None:
+            return self.ap
 
         if self.num_gt_positives == 0:
+            self.ap = 0
             return 0
 
-        # Sort descending by score
-        data_points = list(self.data_points.values())
-        data_points.sort(key=lambda x: -x[0])
-
-        precisions = []
-        recalls = []
-        num_true = 0
-        num_false = 0
-
-        # Compute the precision-recall curve. The x axis is recalls and the y axis precisions.
-        for datum in data_points:
-            # datum[1] is whether the detection a true or false positive
-            if datum[1]:
-                num_true += 1
-            else:
-                num_false += 1
-
-            precision = num_true / (num_true + num_false)
-            recall = num_true / self.num_gt_positives
-
-            precisions.append(precision)
-            recalls.append(recall)
-
-        # Smooth the curve by computing [max(precisions[i:]) for i in range(len(precisions))]
-        # Basically, remove any temporary dips from the curve.
-        # At least that's what I think, idk. COCOEval did it so I do too.
-        for i in range(len(precisions) - 1, 0, -1):
-            if precisions[i] > precisions[i - 1]:
-                precisions[i - 1] = precisions[i]
-
-        # Compute the integral of precision(recall) d_recall from recall=0->1 using fixed-length riemann summation with 101 bars.
-        resolution = 100  # Standard COCO Resoluton
-        y_range = [0] * (
-            resolution + 1
-        )  # idx 0 is recall == 0.0 and idx 100 is recall == 1.00
-        x_range = np.array([x / resolution for x in range(resolution + 1)])
-        recalls = np.array(recalls)
-
-        # I realize this is weird, but all it does is find the nearest precision(x) for a given x in x_range.
-        # Basically, if the closest recall we have to 0.01 is 0.009 this sets precision(0.01) = precision(0.009).
-        # I approximate the integral this way, because that's how COCOEval does it.
-        indices = np.searchsorted(recalls, x_range, side="left")
-        for bar_idx, precision_idx in enumerate(indices):
-            if precision_idx < len(precisions):
-                y_range[bar_idx] = precisions[precision_idx]
-
-        self.curve = (x_range, y_range)
+        num_points = len(self.data_points)
+        scores = np.fromiter(
+            (x[0] for x in self.data_points.values()),
+            dtype=np.float64,
+            count=num_points,
+        )
+        is_true = np.fromiter(
+            (bool(x[1]) for x in self.data_points.values()),
+            dtype=bool,
+            count=num_points,
+        )
 
-        # Finally compute the riemann sum to get our integral.
-        # avg([precision(x) for x in 0:0.01:1])
-        return sum(y_range) / len(y_range) * 100
+        self.ap, self.curve = _compute_ap(scores, is_true, self.num_gt_positives)
+        return self.ap
+
+    def as_arrays(self) -> "APDataArrays":
+        """Returns an APDataArrays copy of this object (without the info dicts)."""
+        num_points = len(self.data_points)
+        points = self.data_points.values()
+
+        return APDataArrays(
+            ids=np.fromiter(self.data_points.keys(), dtype=np.int64, count=num_points),
+            scores=np.fromiter(
+                (x[0] for x in points), dtype=np.float64, count=num_points
+            ),
+            is_true=np.fromiter(
+                (bool(x[1]) for x in points), dtype=bool, count=num_points
+            ),
+            matched_with=np.fromiter(
+                (x[2].get("matched_with", -1) if x[1] else -1 for x in points),
+                dtype=np.int64,
+                count=num_points,
+            ),
+            false_negatives=np.fromiter(self.false_negatives, dtype=np.int64),
+            num_gt_positives=self.num_gt_positives,
+        )
 
 
 class ClassedAPDataObject:
     """Stores an APDataObject for each class in the dataset."""
 
     def __init__(self):
-        self.objs = defaultdict(lambda: APDataObject())
+        self.objs = defaultdict(APDataObject)
+        self.mAP = None  # cached result of get_mAP
 
     def apply_qualifier(
         self, pred_dict: dict, gt_dict: dict, check: bool = False
@@ -179,19 +227,38 @@ class ClassedAPDataObject:
 
     def push(self, class_: int, id: int, score: float, is_true: bool, info: dict = {}):
         self.objs[class_].push(id, score, is_true, info)
+        self.mAP = None
+
+    def push_many(self, class_: int, points: dict):
+        self.objs[class_].push_many(points)
+        self.mAP = None
 
     def push_false_negative(self, class_: int, id: int):
         self.objs[class_].push_false_negative(id)
+        self.mAP = None
 
     def add_gt_positives(self, class_: int, num_positives: int):
         self.objs[class_].add_gt_positives(num_positives)
+        self.mAP = None
+
+    def extend(self, class_: int, other: APDataObject):
+        """Adds the data points, false negatives and gt positives of another object (for other ids) to a class."""
+        obj = self.objs[class_]
+        obj.data_points.update(other.data_points)
+        obj.false_negatives.update(other.false_negatives)
+        obj.add_gt_positives(other.num_gt_positives)
+        self.mAP = None
 
     def get_mAP(self) -> float:
-        aps = [x.get_ap() for x in self.objs.values() if not x.is_empty()]
-        # If there are no objects (no golds, no preds), then it's a perfect run
-        if not aps:
-            return 100.0
-        return sum(aps) / len(aps)
+        """
+        The result is cached until the data changes through this object's push, push_many,
+        push_false_negative, add_gt_positives or extend, so change the per-class objects through those.
+        """
+        if self.mAP is None:
+            aps = [x.get_ap() for x in self.objs.values() if not x.is_empty()]
+            # If there are no objects (no golds, no preds), then it's a perfect run
+            self.mAP = sum(aps) / len(aps) if aps else 100.0
+        return self.mAP
 
     def get_APs(self) -> Dict[int, float]:
         return {
@@ -204,20 +271,263 @@ class ClassedAPDataObject:
     def get_pr_curve(self, cat_id: int = None) -> tuple:
         if cat_id is None:
             # Average out the curves when using all categories
-            curves = [x.get_pr_curve() for x in list(self.objs.values())]
-            x_range = curves[0][0]
-            y_range = [0] * len(curves[0][1])
+            return _average_curves([x.get_pr_curve() for x in list(self.objs.values())])
+        return self.objs[cat_id].get_pr_curve()
+
+    def as_arrays(self) -> "ClassedAPDataArrays":
+        """Returns a ClassedAPDataArrays copy of this object (without the info dicts)."""
+        return ClassedAPDataArrays(
+            {_class: obj.as_arrays() for _class, obj in self.objs.items()}
+        )
+
+    @classmethod
+    def from_arrays(
+        cls, arrays: "ClassedAPDataArrays", infos: dict
+    ) -> "ClassedAPDataObject":
+        """The inverse of as_arrays, taking the info dict of each data point from infos (by id)."""
+        ret = cls()
+
+        for _class, obj in arrays.objs.items():
+            ret.add_gt_positives(_class, obj.num_gt_positives)
+            ret.push_many(
+                _class,
+                {
+                    _id: (score, is_true, infos[_id])
+                    for _id, score, is_true in zip(
+                        obj.ids.tolist(), obj.scores.tolist(), obj.is_true.tolist()
+                    )
+                },
+            )
+            for _id in obj.false_negatives.tolist():
+                ret.push_false_negative(_class, _id)
+
+        return ret
+
+
+def _average_curves(curves: list) -> tuple:
+    x_range = curves[0][0]
+    y_range = [0] * len(curves[0][1])
+
+    for x, y in curves:
+        for i in range(len(y)):
+            y_range[i] += y[i]
+
+    for i in range(len(y_range)):
+        y_range[i] /= len(curves)
+
+    return x_range, y_range
+
+
+def _id_array(ids) -> np.ndarray:
+    return np.fromiter(ids, dtype=np.int64, count=len(ids))
+
+
+class APDataArrays:
+    """
+    An array-backed version of APDataObject, for when there are a lot of data points.
+
+    The data points are stored as parallel arrays in the order they were pushed: ids, scores,
+    is_true and matched_with (the id of the GT a true positive was matched with, -1 otherwise).
+    The info dicts of APDataObject aren't kept. Instances are treated as immutable: restricting or
+    merging them makes a new object.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray = None,
+        scores: np.ndarray = None,
+        is_true: np.ndarray = None,
+        matched_with: np.ndarray = None,
+        false_negatives: np.ndarray = None,
+        num_gt_positives: int = 0,
+    ):
+        self.ids = np.zeros(0, dtype=np.int64) if ids is None else ids
+        self.scores = np.zeros(0, dtype=np.float64) if scores is None else scores
+        self.is_true = np.zeros(0, dtype=bool) if is_true is None else is_true
+        self.matched_with = (
+            np.full(len(self.ids), -1, dtype=np.int64)
+            if matched_with is None
+            else matched_with
+        )
+        self.false_negatives = (
+            np.zeros(0, dtype=np.int64) if false_negatives is None else false_negatives
+        )
+        self.num_gt_positives = num_gt_positives
+        self.curve = None
+        self.ap = None  # cached result of get_ap
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def concatenate(objs: list) -> "APDataArrays":
+        """
+        Merges the data of several objects into one. The objects should hold disjoint sets of ids
+        (e.g., because they come from evaluating different images). The data points of each object
+        are kept in order, one object after the other.
+        """
+        if len(objs) == 1:
+            return objs[0]
+
+        return APDataArrays(
+            ids=np.concatenate([x.ids for x in objs]),
+            scores=np.concatenate([x.scores for x in objs]),
+            is_true=np.concatenate([x.is_true for x in objs]),
+            matched_with=np.concatenate([x.matched_with for x in objs]),
+            false_negatives=np.concatenate([x.false_negatives for x in objs]),
+            num_gt_positives=sum(x.num_gt_positives for x in objs),
+        )
+
+    def merge(self, other: "APDataArrays") -> "APDataArrays":
+        return APDataArrays.concatenate([self, other])
+
+    def shift_ids(self, pred_offset: int, gt_offset: int) -> "APDataArrays":
+        """Returns a copy with pred_offset added to the prediction ids and gt_offset to the GT ids."""
+        return APDataArrays(
+            ids=self.ids + pred_offset,
+            scores=self.scores,
+            is_true=self.is_true,
+            matched_with=np.where(
+                self.matched_with >= 0, self.matched_with + gt_offset, -1
+            ),
+            false_negatives=self.false_negatives + gt_offset,
+            num_gt_positives=self.num_gt_positives,
+        )
+
+    def _restrict(
+        self, keep: np.ndarray, false_negatives: np.ndarray, num_gt_positives: int
+    ):
+        return APDataArrays(
+            ids=self.ids[keep],
+            scores=self.scores[keep],
+            is_true=self.is_true[keep],
+            matched_with=self.matched_with[keep],
+            false_negatives=false_negatives,
+            num_gt_positives=num_gt_positives,
+        )
+
+    def apply_qualifier_no_check(self, kept_preds: set, kept_gts: set) -> object:
+        """See APDataObject.apply_qualifier_no_check."""
+        kept_gts = _id_array(kept_gts)
+
+        return self._restrict(
+            np.isin(self.ids, _id_array(kept_preds)),
+            self.false_negatives[np.isin(self.false_negatives, kept_gts)],
+            len(kept_gts),
+        )
+
+    def apply_qualifier(self, kept_preds: set, kept_gts: set) -> object:
+        """See APDataObject.apply_qualifier."""
+        kept_gts = _id_array(kept_gts)
+
+        # True positives whose GT was removed are removed along with it
+        removed = self.is_true & ~np.isin(self.matched_with, kept_gts)
+        keep = ~removed & np.isin(self.ids, _id_array(kept_preds))
 
-            for x, y in curves:
-                for i in range(len(y)):
-                    y_range[i] += y[i]
+        false_negatives = self.false_negatives[np.isin(self.false_negatives, kept_gts)]
+        num_gt_removed = (
+            int(removed.sum()) + len(self.false_negatives) - len(false_negatives)
+        )
 
-            for i in range(len(y_range)):
-                y_range[i] /= len(curves)
-        else:
-            x_range, y_range = self.objs[cat_id].get_pr_curve()
+        return self._restrict(
+            keep, false_negatives, self.num_gt_positives - num_gt_removed
+        )
+
+    def is_empty(self) -> bool:
+        return len(self.ids) == 0 and self.num_gt_positives == 0
+
+    def get_pr_curve(self) -> tuple:
+        if self.curve is None:
+            self.get_ap()
+        return self.curve
 
-        return x_range, y_range
+    def get_ap(self) -> float:
+        if self.ap is None:
+            if self.num_gt_positives == 0:
+                self.ap = 0
+            else:
+                self.ap, self.curve = _compute_ap(
+                    self.scores, self.is_true, self.num_gt_positives
+                )
+        return self.ap
+
+
+class ClassedAPDataArrays:
+    """
+    Stores an APDataArrays for each class in the dataset. This has the same interface as
+    ClassedAPDataObject for computing APs, but is built all at once (e.g., with
+    ClassedAPDataObject.as_arrays) instead of a data point at a time.
+    """
+
+    def __init__(self, objs: dict = None):
+        self.objs = {} if objs is None else objs
+        self.mAP = None  # cached result of get_mAP
+
+    @staticmethod
+    def concatenate(states: list) -> "ClassedAPDataArrays":
+        """
+        Merges the per-class data of several objects, e.g., the partial results of evaluating
+        disjoint sets of images. Classes are kept in the order they first appear.
+        """
+        per_class = {}
+        for state in states:
+            for _class, obj in state.objs.items():
+                per_class.setdefault(_class, []).append(obj)
+
+        return ClassedAPDataArrays(
+            {
+                _class: APDataArrays.concatenate(objs)
+                for _class, objs in per_class.items()
+            }
+        )
+
+    def merge(self, other: "ClassedAPDataArrays") -> "ClassedAPDataArrays":
+        return ClassedAPDataArrays.concatenate([self, other])
+
+    def shift_ids(self, pred_offset: int, gt_offset: int) -> "ClassedAPDataArrays":
+        """See APDataArrays.shift_ids. Used to give the ids of different shards their own ranges."""
+        return ClassedAPDataArrays(
+            {
+                _class: obj.shift_ids(pred_offset, gt_offset)
+                for _class, obj in self.objs.items()
+            }
+        )
+
+    def apply_qualifier(
+        self, pred_dict: dict, gt_dict: dict, check: bool = False
+    ) -> object:
+        ret = ClassedAPDataArrays()
+
+        for _class, obj in self.objs.items():
+            pred_set = pred_dict.get(_class, set())
+            gt_set = gt_dict.get(_class, set())
+            if check:
+                ret.objs[_class] = obj.apply_qualifier(pred_set, gt_set)
+            else:
+                ret.objs[_class] = obj.apply_qualifier_no_check(pred_set, gt_set)
+
+        return ret
+
+    def get_mAP(self) -> float:
+        if self.mAP is None:
+            aps = [x.get_ap() for x in self.objs.values() if not x.is_empty()]
+            # If there are no objects (no golds, no preds), then it's a perfect run
+            self.mAP = sum(aps) / len(aps) if aps else 100.0
+        return self.mAP
+
+    def get_APs(self) -> Dict[int, float]:
+        return {
+            cls_id: x.get_ap() for cls_id, x in self.objs.items() if not x.is_empty()
+        }
+
+    def get_gt_positives(self) -> dict:
+        return {k: v.num_gt_positives for k, v in self.objs.items()}
+
+    def get_pr_curve(self, cat_id: int = None) -> tuple:
+        if cat_id is None:
+            # Average out the curves when using all categories
+            return _average_curves([x.get_pr_curve() for x in list(self.objs.values())])
+        return self.objs[cat_id].get_pr_curve()
 
 
 # Note: Unused.
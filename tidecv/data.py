@@ -1,4 +1,383 @@
-from collections import defaultdict
+import hashlib
+import json
+import marshal
+import os
+import threading
+from array import array
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable, MutableSequence, Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import functions as f
+
+# Stand-in for a class id of None (e.g., an ignore region without a class) in class arrays
+NO_CLASS = np.iinfo(np.int64).min
+
+
+def _class_code(class_id) -> int:
+    """
+    The int64 a class id is stored as in class arrays (see DataArrays). Integer ids are stored as is and
+    None as NO_CLASS. Any other id (e.g., a string) is stored as a hash of it, which is the same in every
+    Data object and process so that the classes of the ground truth and the predictions can be compared.
+    """
+    if class_id is None:
+        return NO_CLASS
+    if isinstance(class_id, (int, np.integer)) and NO_CLASS < class_id < 2**63:
+        return int(class_id)
+    if isinstance(class_id, (float, np.floating)) and float(class_id).is_integer():
+        return _class_code(int(class_id))
+
+    key = str(class_id) if isinstance(class_id, str) else repr(class_id)
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return NO_CLASS + 1 + int.from_bytes(digest, "little") % (1 << 62)
+
+
+def _is_rle(mask: object) -> bool:
+    return isinstance(mask, dict) and isinstance(mask.get("counts"), (bytes, str))
+
+
+def _masks_to_rles(chunk: list) -> list:
+    """Converts the masks of a chunk of (width, height, masks) images. Runs in worker processes."""
+    return [[f.toRLE(mask, w, h) for mask in masks] for w, h, masks in chunk]
+
+
+class DataArrays:
+    """
+    A struct-of-arrays snapshot of a Data object that the evaluation code can consume directly.
+
+    Every per-annotation array is indexed by annotation id. The annotation ids of the image
+    image_ids[i] are order[offsets[i]:offsets[i+1]], in the same order Data.get returns them.
+    Missing boxes are stored as rows of NaN and classes as their _class_code (so None is NO_CLASS).
+    """
+
+    def __init__(
+        self,
+        image_ids: list,
+        offsets: np.ndarray,
+        order: np.ndarray,
+        image: np.ndarray,
+        cls: np.ndarray,
+        score: np.ndarray,
+        bbox: np.ndarray,
+        ignore: np.ndarray,
+        has_mask: np.ndarray,
+    ):
+        self.image_ids = image_ids
+        self.offsets = offsets
+        self.order = order
+
+        self.image = image  # Index into image_ids
+        self.cls = cls
+        self.score = score
+        self.bbox = bbox  # [N, 4] in [x, y, w, h]
+        self.ignore = ignore
+        self.has_mask = has_mask
+
+        self.image_index = {_id: idx for idx, _id in enumerate(image_ids)}
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    def anns(self, image_id) -> np.ndarray:
+        """The annotation ids for the given image (empty if the image is unknown)."""
+        idx = self.image_index.get(image_id)
+        if idx is None:
+            return self.order[:0]
+        return self.order[self.offsets[idx] : self.offsets[idx + 1]]
+
+
+class _PackedMasks(Sequence):
+    """
+    Read-only storage for a lot of masks (or None) that keeps all of their data in one byte buffer.
+    RLEs keep their counts as is, while polygons and uncompressed RLE counts are stored with marshal,
+    which is by far the fastest way to get the lists back. The mask objects are made when they're accessed.
+    """
+
+    NONE, BYTES, STR, POLY, LIST = 0, 1, 2, 3, 4  # What kind of mask each one is
+
+    def __init__(
+        self,
+        kind: np.ndarray,
+        size: np.ndarray,
+        offsets: np.ndarray,
+        counts: np.ndarray,
+    ):
+        self.kind = kind
+        self.size = size  # [N, 2] in [h, w] (only used for RLEs)
+        self.offsets = offsets  # The data of mask i is counts[offsets[i]:offsets[i+1]]
+        self.counts = counts
+
+    @staticmethod
+    def pack(masks: Sequence) -> "_PackedMasks":
+        """Packs a list of RLEs and polygons. Raises a ValueError if something else is in there."""
+        kind = np.zeros(len(masks), dtype=np.int8)
+        size = np.zeros((len(masks), 2), dtype=np.int64)
+        counts = []
+
+        for idx, mask in enumerate(masks):
+            if mask is None:
+                counts.append(b"")
+            elif isinstance(mask, list):
+                kind[idx] = _PackedMasks.POLY
+                counts.append(marshal.dumps(mask))
+            elif isinstance(mask, dict) and isinstance(mask.get("counts"), list):
+                kind[idx] = _PackedMasks.LIST
+                size[idx] = mask["size"]
+                counts.append(marshal.dumps(mask["counts"]))
+            elif isinstance(mask, dict) and isinstance(
+                mask.get("counts"), (bytes, str)
+            ):
+                is_str = isinstance(mask["counts"], str)
+                kind[idx] = _PackedMasks.STR if is_str else _PackedMasks.BYTES
+                size[idx] = mask["size"]
+                counts.append(
+                    mask["counts"].encode("ascii") if is_str else mask["counts"]
+                )
+            else:
+                raise ValueError("Only RLEs and polygons can be packed")
+
+        offsets = np.zeros(len(masks) + 1, dtype=np.int64)
+        np.cumsum([len(x) for x in counts], out=offsets[1:])
+
+        return _PackedMasks(
+            kind, size, offsets, np.frombuffer(b"".join(counts), dtype=np.uint8)
+        )
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def __getitem__(self, idx: int):
+        kind = self.kind[idx]
+        if kind == _PackedMasks.NONE:
+            return None
+
+        counts = self.counts[self.offsets[idx] : self.offsets[idx + 1]].tobytes()
+
+        if kind == _PackedMasks.POLY:
+            return marshal.loads(counts)
+        if kind == _PackedMasks.LIST:
+            counts = marshal.loads(counts)
+        elif kind == _PackedMasks.STR:
+            counts = counts.decode("ascii")
+
+        return {"size": self.size[idx].tolist(), "counts": counts}
+
+
+class _AnnotationColumns:
+    """Growable array-backed storage for the fields every annotation has."""
+
+    # The keys of an annotation dict that come from the columns and can be changed (see set)
+    FIELDS = ("class", "score", "bbox", "mask", "ignore")
+
+    def __init__(self):
+        self.image = array("q")
+        self.cls = array("q")
+        self.score = array("d")
+        self.bbox = array("d")  # Flattened [x, y, w, h] rows
+        self.ignore = array("b")
+        self.mask = []
+
+        # Maps the indices stored in self.image back to image ids
+        self.image_ids = []
+        self.image_lookup = {}
+        # Same for the indices stored in self.cls and class ids, which can be anything hashable
+        self.class_ids = []
+        self.class_lookup = {}
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    def has_mask(self) -> np.ndarray:
+        if isinstance(self.mask, _PackedMasks):
+            return self.mask.kind != _PackedMasks.NONE
+        return np.array([x is not None for x in self.mask], dtype=bool)
+
+    def _make_growable(self):
+        # Columns loaded by Data._load are (possibly memory-mapped) NumPy arrays, so copy them first
+        self.image = array("q", np.asarray(self.image).tobytes())
+        self.cls = array("q", np.asarray(self.cls).tobytes())
+        self.score = array("d", np.asarray(self.score).tobytes())
+        self.bbox = array("d", np.asarray(self.bbox).tobytes())
+        self.ignore = array("b", np.asarray(self.ignore).tobytes())
+        self.mask = list(self.mask)
+
+    def class_index(self, class_id) -> int:
+        """The index of a class id in class_ids, which is added if it isn't there yet."""
+        idx = self.class_lookup.get(class_id)
+        if idx is None:
+            idx = self.class_lookup[class_id] = len(self.class_ids)
+            self.class_ids.append(class_id)
+        return idx
+
+    def append(self, image_id, class_id, box, mask, score, ignore):
+        if not isinstance(self.score, array):
+            self._make_growable()
+
+        if image_id not in self.image_lookup:
+            self.image_lookup[image_id] = len(self.image_ids)
+            self.image_ids.append(image_id)
+
+        self.image.append(self.image_lookup[image_id])
+        self.cls.append(self.class_index(class_id))
+        self.score.append(score)
+        self.bbox.extend([np.nan] * 4 if box is None else box)
+        self.ignore.append(ignore)
+        self.mask.append(mask)
+
+    def set(self, idx: int, key: str, value):
+        """Changes one of the FIELDS of an annotation."""
+        if not isinstance(self.score, array):
+            self._make_growable()
+
+        if key == "class":
+            self.cls[idx] = self.class_index(value)
+        elif key == "score":
+            self.score[idx] = value
+        elif key == "bbox":
+            self.bbox[4 * idx : 4 * idx + 4] = array(
+                "d", [np.nan] * 4 if value is None else value
+            )
+        elif key == "mask":
+            self.mask[idx] = value
+        elif key == "ignore":
+            self.ignore[idx] = value
+
+    def to_dict(self, idx: int) -> dict:
+        bbox = self.bbox[4 * idx : 4 * idx + 4]
+
+        return {
+            "_id": idx,
+            "score": float(self.score[idx]),
+            "image": self.image_ids[self.image[idx]],
+            "class": self.class_ids[self.cls[idx]],
+            "bbox": None if bbox[0] != bbox[0] else bbox.tolist(),  # NaN check
+            "mask": self.mask[idx],
+            "ignore": bool(self.ignore[idx]),
+        }
+
+
+class _AnnotationDict(dict):
+    """
+    The dict of an annotation of a column-backed Data object. Setting one of the keys that come from
+    the columns (see _AnnotationColumns.FIELDS) writes the new value through to them, since that's
+    what evaluation reads. Any other keys are only kept in the dict. It pickles and copies as a plain dict,
+    and acts like one once its Data is turned into a list of dicts (see _AnnotationView).
+    """
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: "Data", fields: dict):
+        super().__init__(fields)
+        self._data = data
+
+    def __setitem__(self, key, value):
+        if key in _AnnotationColumns.FIELDS:
+            self._data._set_field(self["_id"], key, value)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._check_removable(key)
+        super().__delitem__(key)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+    def _check_removable(self, key):
+        if self._data._columns is not None and (
+            key in _AnnotationColumns.FIELDS or key == "_id"
+        ):
+            raise TypeError("The {} of an annotation can't be removed.".format(key))
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            self._check_removable(key)
+        return super().pop(key, *default)
+
+    def popitem(self):
+        self._check_bulk_removable()
+        return super().popitem()
+
+    def clear(self):
+        self._check_bulk_removable()
+        super().clear()
+
+    def _check_bulk_removable(self):
+        if self._data._columns is not None:
+            raise TypeError("The keys of an annotation can't be removed in bulk.")
+
+
+class _AnnotationView(MutableSequence):
+    """
+    A list-like view of the annotations of a column-backed Data object.
+    Annotation dicts are only created when they are accessed, and are then kept around so that
+    the same dict is returned every time.
+
+    Changing the sequence itself (e.g., appending or removing annotations) turns the Data into a list
+    of those dicts first, like assigning to Data.annotations would, and the view then works on that list.
+    Use list(data.annotations) where an actual list is needed (e.g., for json).
+    """
+
+    def __init__(self, data):
+        self._data = data
+
+    def __len__(self) -> int:
+        if self._data._annotations is not None:
+            return len(self._data._annotations)
+        return len(self._data._columns)
+
+    def __getitem__(self, idx):
+        if self._data._annotations is not None:
+            return self._data._annotations[idx]
+        if isinstance(idx, slice):
+            return [
+                self._data._annotation(i, keep=True)
+                for i in range(*idx.indices(len(self)))
+            ]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("annotation index out of range")
+        return self._data._annotation(idx, keep=True)
+
+    def __setitem__(self, idx, value):
+        self._data._materialize()[idx] = value
+
+    def __delitem__(self, idx):
+        del self._data._materialize()[idx]
+
+    def insert(self, idx: int, value: dict):
+        self._data._materialize().insert(idx, value)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, _AnnotationView):
+            other = list(other)
+        return list(self) == other
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+# Runs in different threads can share a Data object, so its RLE cache has to be updated under a lock
+_rle_cache_lock = threading.Lock()
+
+
+def _new_image() -> dict:
+    return {"name": None, "width": None, "height": None, "anns": array("q")}
 
 
 class Data:
@@ -11,38 +390,458 @@ class Data:
     Also, don't mix ground truth with predictions. Keep them in separate data objects.
 
     'max_dets' specifies the maximum number of detections the model is allowed to output for a given image.
+
+    Annotations are stored column-wise (see DataArrays) and only turned into dicts when they're
+    accessed through get or annotations. The columns are what evaluation reads the class, score, box,
+    mask and ignore flag of an annotation from, and setting any of those in its dict writes the new value
+    through to them (see _AnnotationDict). The dicts evaluation needs itself aren't kept around.
+
+    Assigning a list of dicts to annotations directly is still supported, in which case those dicts are
+    used as is. They're the only copy of the annotations then, so every evaluation reads them again
+    (see _eval_arrays) and changes made to them between evaluations are picked up.
+
+    Masks are stored the way they were given and only converted to RLEs when a mask evaluation needs
+    them (polygons and uncompressed RLEs need the image's width and height, see add_image). The last
+    'rle_cache_size' converted RLEs are kept around.
+
+    Evaluating doesn't modify the annotations (the runs keep their own state), so the same Data object
+    can be used by any number of evaluations at once, e.g., from a thread pool.
     """
 
+    rle_cache_size = 10000
+
     def __init__(self, name: str, max_dets: int = 100):
         self.name = name
         self.max_dets = max_dets
 
         self.classes = {}  # Maps class ID to class name
-        self.annotations = (
-            []
-        )  # Maps annotation ids to the corresponding annotation / prediction
 
-        # Maps an image id to an image name and a list of annotation ids
-        self.images = defaultdict(lambda: {"name": None, "anns": []})
+        # Column storage for the annotations, and the dicts for them we've handed out so far.
+        # If someone assigns annotations directly, _annotations holds that list instead.
+        self._columns = _AnnotationColumns()
+        self._dicts = {}
+        self._annotations = None
+        self._arrays = None
+        self._rles = OrderedDict()  # LRU cache for _rle
+        self._mask_boxes = {}  # Cache for _mask_box
+
+        # Maps an image id to a bitset (see np.packbits) of the class ids ignored in the whole image
+        self._ignored_classes = {}
+
+        # Maps an image id to an image name, its size (if known) and a list of annotation ids
+        self.images = defaultdict(_new_image)
+
+    @property
+    def annotations(self) -> MutableSequence:
+        """Maps annotation ids to the corresponding annotation / prediction."""
+        if self._annotations is not None:
+            return self._annotations
+        return _AnnotationView(self)
+
+    @annotations.setter
+    def annotations(self, annotations: list):
+        if isinstance(annotations, _AnnotationView):
+            # E.g., data.annotations += [...] assigns the view it changed back to us
+            annotations = (
+                annotations._data._materialize()
+                if annotations._data is self
+                else list(annotations)
+            )
+        self._annotations = annotations
+        self._columns = None
+        self._dicts = {}
+        self._arrays = None
+        self._rles.clear()
+        self._mask_boxes.clear()
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        # The dicts we've handed out pickle as plain dicts (see _AnnotationDict), so make them ours again
+        self._dicts = {
+            idx: _AnnotationDict(self, ann) for idx, ann in self._dicts.items()
+        }
+
+    def _annotation(self, idx: int, keep: bool = False) -> dict:
+        """
+        (For internal use) Returns the annotation dict for that id. If keep is set, the dict is kept so
+        that the same one is returned every time, like for get and annotations. Otherwise, the kept dict is
+        returned if there is one, and a new one that isn't kept is made if not (e.g., for evaluation).
+        """
+        if self._annotations is not None:
+            return self._annotations[idx]
+
+        ann = self._dicts.get(idx)
+        if ann is None:
+            ann = _AnnotationDict(self, self._columns.to_dict(idx))
+            if keep:
+                # If another thread beat us to it, use its dict so that there's only ever one
+                ann = self._dicts.setdefault(idx, ann)
+        return ann
+
+    def _materialize(self) -> list:
+        """
+        (For internal use) Turns the annotations into a list of their dicts, as if it was assigned to
+        annotations, and returns that list.
+        """
+        if self._annotations is None:
+            self.annotations = [
+                self._annotation(idx, keep=True) for idx in range(len(self._columns))
+            ]
+        return self._annotations
+
+    def _set_field(self, idx: int, key: str, value):
+        """(For internal use) Writes a change to the dict of that annotation id through to the columns."""
+        if self._columns is None:
+            # The annotations were replaced with a list of dicts, so this dict isn't ours anymore
+            return
+
+        self._columns.set(idx, key, value)
+        self._arrays = None
+        if key == "mask":
+            with _rle_cache_lock:
+                self._rles.pop(idx, None)
+            self._mask_boxes.pop(idx, None)
+
+    def _mask(self, idx: int):
+        """(For internal use) Returns the mask of that annotation id as it was given, without a dict."""
+        if self._annotations is not None:
+            return self._annotations[idx]["mask"]
+        return self._columns.mask[idx]
+
+    def _rle(self, idx: int):
+        """
+        (For internal use) Returns the mask of that annotation id as an RLE (or None if it has no mask).
+        Polygons and uncompressed RLEs are converted here, and the results are kept in an LRU cache.
+        """
+        mask = self._mask(idx)
+        if mask is None or _is_rle(mask):
+            return mask
+
+        with _rle_cache_lock:
+            rle = self._rles.get(idx)
+            if rle is not None:
+                self._rles.move_to_end(idx)
+                return rle
+
+        rle = f.toRLE(mask, *self._image_size(self._annotation(idx)["image"]))
+        with _rle_cache_lock:
+            self._rles[idx] = rle
+            if len(self._rles) > self.rle_cache_size:
+                self._rles.popitem(last=False)
+        return rle
+
+    def _mask_box(self, idx: int) -> list:
+        """
+        (For internal use) Returns an [x, y, w, h] box that contains the mask of that annotation id
+        (or None if it has no mask). This is the exact bounding box for RLEs, but for polygons it's their
+        bounds padded by a pixel so that we don't have to rasterize them, since rasterizing can spill over
+        by up to half a pixel.
+        """
+        box = self._mask_boxes.get(idx)
+        if box is not None:
+            return box
+
+        mask = self._mask(idx)
+        if mask is None:
+            return None
+
+        if isinstance(mask, list):
+            x, y, w, h = f.polyToBox(mask)
+            box = [x - 1, y - 1, w + 2, h + 2]
+        else:
+            box = f.rleToBox(self._rle(idx))
+
+        self._mask_boxes[idx] = box
+        return box
+
+    def _image_size(self, image_id) -> tuple:
+        width = self.images[image_id].get("width")
+        height = self.images[image_id].get("height")
+        if width is None or height is None:
+            raise ValueError(
+                "The size of image {} is needed to convert its masks to RLEs, "
+                "add it with add_image.".format(image_id)
+            )
+        return width, height
+
+    def _convert_masks(self, num_workers: int = 1, chunk_size: int = 1000):
+        """
+        (For internal use) Converts every mask to an RLE right away instead of when it's evaluated.
+        If num_workers > 1, this is done in that many processes, in chunks of about chunk_size masks
+        where all the masks of an image end up in the same chunk.
+        """
+        if self._columns is None:
+            raise ValueError(
+                "Only objects built with the add functions can be converted"
+            )
+
+        masks = list(self._columns.mask)
+        arrays = self.as_arrays()
+
+        chunks = [[]]
+        chunk_ids = [[]]
+        num_masks = 0
+
+        for image_id in arrays.image_ids:
+            ids = [
+                idx
+                for idx in arrays.anns(image_id).tolist()
+                if masks[idx] is not None and not _is_rle(masks[idx])
+            ]
+            if not ids:
+                continue
+
+            chunks[-1].append(
+                (*self._image_size(image_id), [masks[idx] for idx in ids])
+            )
+            chunk_ids[-1].extend(ids)
+            num_masks += len(ids)
+
+            if num_masks >= chunk_size:
+                chunks.append([])
+                chunk_ids.append([])
+                num_masks = 0
+
+        if num_workers > 1:
+            with ProcessPoolExecutor(num_workers) as pool:
+                results = list(pool.map(_masks_to_rles, chunks))
+        else:
+            results = map(_masks_to_rles, chunks)
+
+        for ids, rles in zip(chunk_ids, results):
+            for idx, rle in zip(ids, (rle for image in rles for rle in image)):
+                masks[idx] = rle
+                if idx in self._dicts:
+                    # The columns get all of the new masks at once below
+                    dict.__setitem__(self._dicts[idx], "mask", rle)
+
+        self._columns.mask = _PackedMasks.pack(masks)
+        self._rles.clear()
+        self._mask_boxes.clear()
+
+    def _pack_masks(self):
+        """(For internal use) Moves the masks into one buffer, which saves a lot of memory for polygons."""
+        if self._columns is not None and not isinstance(
+            self._columns.mask, _PackedMasks
+        ):
+            self._columns.mask = _PackedMasks.pack(self._columns.mask)
+
+    def _owns(self, ann: dict) -> bool:
+        """(For internal use) Whether ann is the dict this object uses for the annotation with its id."""
+        idx = ann["_id"]
+        if self._annotations is not None:
+            return (
+                isinstance(idx, int)
+                and 0 <= idx < len(self._annotations)
+                and self._annotations[idx] is ann
+            )
+        return isinstance(ann, _AnnotationDict) and ann._data is self
+
+    def as_arrays(self) -> DataArrays:
+        """
+        Returns a DataArrays snapshot of this object. The result is cached until more annotations
+        or images are added, or an annotation is changed.
+        """
+        if self._arrays is None:
+            self._arrays = self._build_arrays()
+        return self._arrays
+
+    def _eval_arrays(self) -> DataArrays:
+        """
+        (For internal use) Returns the DataArrays an evaluation should read from. Annotations assigned as
+        a list of dicts can be changed without us knowing, so their snapshot is taken again every time.
+        """
+        if self._annotations is not None:
+            self._arrays = None
+        return self.as_arrays()
+
+    def _build_arrays(self) -> DataArrays:
+        image_ids = list(self.images.keys())
+        lens = [len(self.images[_id]["anns"]) for _id in image_ids]
+        offsets = np.zeros(len(image_ids) + 1, dtype=np.int64)
+        np.cumsum(lens, out=offsets[1:])
+
+        order = np.empty(offsets[-1], dtype=np.int64)
+        for idx, _id in enumerate(image_ids):
+            order[offsets[idx] : offsets[idx + 1]] = self.images[_id]["anns"]
+
+        if self._columns is not None:
+            cols = self._columns
+            image_lookup = {_id: idx for idx, _id in enumerate(image_ids)}
+            remap = np.array(
+                [image_lookup[_id] for _id in cols.image_ids], dtype=np.int64
+            )
+
+            image = remap[np.frombuffer(cols.image, dtype=np.int64)]
+            codes = np.array(
+                [_class_code(_id) for _id in cols.class_ids], dtype=np.int64
+            )
+            cls = codes[np.frombuffer(cols.cls, dtype=np.int64)]
+            score = np.frombuffer(cols.score, dtype=np.float64).copy()
+            bbox = np.frombuffer(cols.bbox, dtype=np.float64).reshape(-1, 4).copy()
+            ignore = np.frombuffer(cols.ignore, dtype=np.int8).astype(bool)
+            has_mask = cols.has_mask()
+        else:
+            # The annotations were given to us as dicts, so the image comes from the image index
+            anns = self._annotations
+            image = np.zeros(len(anns), dtype=np.int64)
+            image[order] = np.repeat(np.arange(len(image_ids)), lens)
+
+            cls = np.array(
+                [_class_code(x["class"]) for x in anns],
+                dtype=np.int64,
+            )
+            score = np.array([x.get("score", 1) for x in anns], dtype=np.float64)
+            bbox = np.array(
+                [[np.nan] * 4 if x["bbox"] is None else x["bbox"] for x in anns],
+                dtype=np.float64,
+            ).reshape(-1, 4)
+            ignore = np.array([bool(x["ignore"]) for x in anns], dtype=bool)
+            has_mask = np.array([x["mask"] is not None for x in anns], dtype=bool)
+
+        return DataArrays(
+            image_ids, offsets, order, image, cls, score, bbox, ignore, has_mask
+        )
+
+    def _save(self, directory: str):
+        """
+        (For internal use) Saves this object as a directory of .npy files (plus some json) that _load can
+        memory-map. Only works for objects built with the add functions that have RLEs or polygons for masks.
+        """
+        if self._columns is None:
+            raise ValueError("Only objects built with the add functions can be saved")
+
+        cols = self._columns
+        masks = (
+            cols.mask
+            if isinstance(cols.mask, _PackedMasks)
+            else _PackedMasks.pack(cols.mask)
+        )
+        image_ids = list(self.images.keys())
+        image_anns = [np.asarray(self.images[_id]["anns"]) for _id in image_ids]
+        ignored = [
+            self._ignored_classes.get(_id, np.zeros(0, dtype=np.uint8))
+            for _id in image_ids
+        ]
+
+        arrays = {
+            "image": cols.image,
+            "cls": cols.cls,
+            "score": cols.score,
+            "bbox": cols.bbox,
+            "ignore": cols.ignore,
+            "mask_kind": masks.kind,
+            "mask_size": masks.size,
+            "mask_offsets": masks.offsets,
+            "mask_counts": masks.counts,
+            "anns": np.concatenate([np.zeros(0, dtype=np.int64)] + image_anns),
+            "anns_lens": np.array([len(x) for x in image_anns], dtype=np.int64),
+            "ignored_bits": np.concatenate([np.zeros(0, dtype=np.uint8)] + ignored),
+            "ignored_lens": np.array([len(x) for x in ignored], dtype=np.int64),
+        }
+        meta = {
+            "max_dets": self.max_dets,
+            "classes": list(self.classes.items()),
+            "images": [
+                [
+                    _id,
+                    self.images[_id]["name"],
+                    self.images[_id]["width"],
+                    self.images[_id]["height"],
+                ]
+                for _id in image_ids
+            ],
+            "column_image_ids": cols.image_ids,
+            "column_class_ids": cols.class_ids,
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        for key, value in arrays.items():
+            np.save(os.path.join(directory, key + ".npy"), np.asarray(value))
+        with open(os.path.join(directory, "meta.json"), "w") as meta_file:
+            json.dump(meta, meta_file)
+
+    @classmethod
+    def _load(cls, directory: str, name: str, mmap: bool = True) -> "Data":
+        """(For internal use) Loads an object saved with _save, memory-mapping the arrays if mmap is set."""
+        with open(os.path.join(directory, "meta.json"), "r") as meta_file:
+            meta = json.load(meta_file)
+
+        def load(key: str) -> np.ndarray:
+            return np.load(
+                os.path.join(directory, key + ".npy"), mmap_mode="r" if mmap else None
+            )
+
+        data = cls(name, max_dets=meta["max_dets"])
+        data.classes = dict((_id, x) for _id, x in meta["classes"])
+
+        cols = data._columns
+        cols.image = load("image")
+        cols.cls = load("cls")
+        cols.score = load("score")
+        cols.bbox = load("bbox")
+        cols.ignore = load("ignore")
+        cols.mask = _PackedMasks(
+            load("mask_kind"),
+            load("mask_size"),
+            load("mask_offsets"),
+            load("mask_counts"),
+        )
+        cols.image_ids = meta["column_image_ids"]
+        cols.image_lookup = {_id: idx for idx, _id in enumerate(cols.image_ids)}
+        cols.class_ids = meta["column_class_ids"]
+        cols.class_lookup = {_id: idx for idx, _id in enumerate(cols.class_ids)}
+
+        anns = np.load(os.path.join(directory, "anns.npy"))
+        offsets = np.cumsum(load("anns_lens"))
+        for (_id, image_name, width, height), ids in zip(
+            meta["images"], np.split(anns, offsets[:-1])
+        ):
+            data.images[_id]["name"] = image_name
+            data.images[_id]["width"] = width
+            data.images[_id]["height"] = height
+            data.images[_id]["anns"] = array("q", ids.tobytes())
+
+        ignored_bits = np.load(os.path.join(directory, "ignored_bits.npy"))
+        offsets = np.cumsum(load("ignored_lens"))
+        for (_id, *_), bits in zip(
+            meta["images"], np.split(ignored_bits, offsets[:-1])
+        ):
+            if len(bits) > 0:
+                data._ignored_classes[_id] = bits
+
+        return data
 
     def _get_ignored_classes(self, image_id: int) -> set:
-        anns = self.get(image_id)
-
-        classes_in_image = set()
-        ignored_classes = set()
-
-        for ann in anns:
-            if ann["ignore"]:
-                if (
-                    ann["class"] is not None
-                    and ann["bbox"] is None
-                    and ann["mask"] is None
-                ):
-                    ignored_classes.add(ann["class"])
-            else:
-                classes_in_image.add(ann["class"])
+        """
+        (For internal use) The classes ignored in the whole image that aren't in its ground truth,
+        as their _class_code like in DataArrays.
+        """
+        arrays = self.as_arrays()
+        anns = arrays.anns(image_id)
 
-        return ignored_classes.difference(classes_in_image)
+        ignore = arrays.ignore[anns]
+        cls = arrays.cls[anns]
+
+        # Ignore annotations with a class but no box or mask ignore that class for the whole image
+        whole_image = (
+            ignore
+            & (cls != NO_CLASS)
+            & np.isnan(arrays.bbox[anns, 0])
+            & ~arrays.has_mask[anns]
+        )
+
+        ignored = np.concatenate(
+            [cls[whole_image], self._image_ignored_classes(image_id)]
+        )
+        return set(np.setdiff1d(ignored, cls[~ignore]).tolist())
+
+    def _image_ignored_classes(self, image_id: int) -> np.ndarray:
+        """(For internal use) The sorted class ids added with add_ignored_classes for that image."""
+        bits = self._ignored_classes.get(image_id)
+        if bits is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(np.unpackbits(bits))
 
     def _make_default_class(self, id: int):
         """(For internal use) Initializes a class id with a generated name."""
@@ -72,21 +871,29 @@ class Data:
         """Add a data object to this collection. You should use one of the below functions instead."""
         self._make_default_class(class_id)
         self._make_default_image(image_id)
-        new_id = len(self.annotations)
-
-        self.annotations.append(
-            {
-                "_id": new_id,
-                "score": score,
-                "image": image_id,
-                "class": class_id,
-                "bbox": self._prepare_box(box),
-                "mask": self._prepare_mask(mask),
-                "ignore": ignore,
-            }
-        )
+
+        box = self._prepare_box(box)
+        mask = self._prepare_mask(mask)
+
+        if self._annotations is not None:
+            new_id = len(self._annotations)
+            self._annotations.append(
+                {
+                    "_id": new_id,
+                    "score": score,
+                    "image": image_id,
+                    "class": class_id,
+                    "bbox": box,
+                    "mask": mask,
+                    "ignore": ignore,
+                }
+            )
+        else:
+            new_id = len(self._columns)
+            self._columns.append(image_id, class_id, box, mask, score, ignore)
 
         self.images[image_id]["anns"].append(new_id)
+        self._arrays = None
 
     def add_ground_truth(
         self, image_id: int, class_id: int, box: object = None, mask: object = None
@@ -121,16 +928,48 @@ class Data:
         """
         self._add(image_id, class_id, box, mask, ignore=True)
 
+    def add_ignored_classes(self, image_id: int, class_ids: Iterable):
+        """
+        Ignore the predictions of these classes in that image that don't match a ground truth. This does
+        the same as adding an ignore region without a box or mask for each class, but is a lot cheaper
+        when there are many of them (e.g., for LVIS). Class ids have to be non-negative integers.
+        """
+        class_ids = np.fromiter(class_ids, dtype=np.int64)
+        if (class_ids < 0).any():
+            raise ValueError("Ignored class ids have to be non-negative integers")
+
+        flags = np.unpackbits(
+            self._ignored_classes.get(image_id, np.zeros(0, dtype=np.uint8))
+        )
+        if len(class_ids) > 0 and class_ids.max() >= len(flags):
+            flags = np.concatenate(
+                [flags, np.zeros(class_ids.max() + 1 - len(flags), dtype=np.uint8)]
+            )
+        flags[class_ids] = 1
+
+        self._make_default_image(image_id)
+        self._ignored_classes[image_id] = np.packbits(flags)
+        self._arrays = None
+
     def add_class(self, id: int, name: str):
         """Register a class name to that class ID."""
         self.classes[id] = name
 
-    def add_image(self, id: int, name: str):
-        """Register an image name/path with an image ID."""
+    def add_image(self, id: int, name: str, width: int = None, height: int = None):
+        """
+        Register an image name/path with an image ID. The width and height are needed to evaluate
+        masks that aren't RLEs.
+        """
         self.images[id]["name"] = name
+        if width is not None:
+            self.images[id]["width"] = width
+        if height is not None:
+            self.images[id]["height"] = height
+        self._arrays = None
 
     def get(self, image_id: int):
         """Collects all the annotations / detections for that particular image."""
         return [
-            self.annotations[x] for x in self.images.get(image_id, {}).get("anns", [])
+            self._annotation(x, keep=True)
+            for x in self.images.get(image_id, {}).get("anns", [])
         ]
@@ -1,6 +1,10 @@
+import gzip
+import hashlib
 import json
 import os
+import re
 import shutil
+import sys
 import urllib.request
 import zipfile
 from collections import defaultdict
@@ -62,18 +66,127 @@ def download_annotations(name: str, url: str, force_download: bool = False) -> s
         return candidate_path
 
 
+# Bump this whenever a loader changes what it puts in the Data, so that old caches aren't used
+CACHE_VERSION = 4
+
+
+def get_cache_path() -> str:
+    """The directory the parsed annotations are cached in when use_cache is set (see COCO)."""
+    return os.path.join(get_tide_path(), "cache")
+
+
+def clear_cache():
+    """Deletes everything cached with use_cache (see COCO)."""
+    shutil.rmtree(get_cache_path(), ignore_errors=True)
+
+
+def _file_hash(path: str) -> str:
+    """
+    Returns a sha256 of the contents of the file. The hashes are remembered by path, size and mtime
+    in the cache directory, so a file is only read again once one of those changes.
+    """
+    stat = os.stat(path)
+    path = os.path.abspath(path)
+    index_path = os.path.join(get_cache_path(), "hashes.json")
+
+    try:
+        with open(index_path, "r") as json_file:
+            index = json.load(json_file)
+    except (OSError, ValueError):
+        index = {}
+
+    size, mtime, digest = index.get(path, (None, None, None))
+    if size == stat.st_size and mtime == stat.st_mtime_ns:
+        return digest
+
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            file_hash.update(chunk)
+    digest = file_hash.hexdigest()
+
+    index[path] = (stat.st_size, stat.st_mtime_ns, digest)
+    tmp_path = "{}.{}.tmp".format(index_path, os.getpid())
+    try:
+        os.makedirs(get_cache_path(), exist_ok=True)
+        with open(tmp_path, "w") as json_file:
+            json.dump(index, json_file)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+
+    return digest
+
+
+def _cached_load(loader, path: str, name: str, use_cache: bool) -> Data:
+    """
+    Calls loader(path, name), unless the result for a file with the same contents is in the cache.
+    The cache lives in get_cache_path() and holds each Data in a format that can be memory-mapped,
+    so loading it is fast and the pages are shared between processes. Nothing is ever evicted from
+    it, so use clear_cache to delete it.
+    """
+    if not use_cache:
+        return loader(path, name)
+
+    # The masks are stored with marshal, whose format can change between Python versions
+    key = "{}-v{}-py{}{}-{}".format(
+        loader.__name__.strip("_"),
+        CACHE_VERSION,
+        *sys.version_info[:2],
+        _file_hash(path)
+    )
+    cache_path = os.path.join(get_cache_path(), key)
+
+    if os.path.exists(cache_path):
+        try:
+            return Data._load(cache_path, name)
+        except (OSError, ValueError, KeyError):
+            # If the cache is broken somehow, just make it again
+            shutil.rmtree(cache_path, ignore_errors=True)
+
+    data = loader(path, name)
+
+    # Write to a temporary directory first so that nobody reads a half written cache
+    tmp_path = "{}.{}.tmp".format(cache_path, os.getpid())
+    try:
+        data._save(tmp_path)
+        os.rename(tmp_path, cache_path)
+    except (OSError, ValueError):
+        # E.g., someone else wrote the same cache first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+    return data
+
+
+def _convert_masks(data: Data, num_workers: int) -> Data:
+    if num_workers is not None:
+        data._convert_masks(num_workers)
+    return data
+
+
 def COCO(
     path: str = None,
     name: str = None,
     year: int = 2017,
     ann_set: str = "val",
     force_download: bool = False,
+    use_cache: bool = False,
+    mask_workers: int = None,
 ) -> Data:
     """
     Loads ground truth from a COCO-style annotation file.
 
     If path is not specified, this will download the COCO annotations for the year and ann_set specified.
     Valid years are 2014, 2017 and valid ann_sets are 'val' and 'train'.
+
+    If use_cache is set, the parsed annotations are cached on disk (see get_cache_path) and reused
+    the next time a file with the same contents is loaded. The cache keeps a full copy of every file
+    loaded this way until it's deleted with clear_cache.
+
+    Masks are converted to RLEs when they're first evaluated, so the "mask" of each annotation is the
+    segmentation as it is in the file (a polygon or an RLE). If you know you'll evaluate masks, set
+    mask_workers to convert all of them while loading instead, using that many processes. Then the
+    "mask" of each annotation is its RLE.
     """
     if path is None:
         path = download_annotations(
@@ -91,6 +204,10 @@ def COCO(
     if name is None:
         name = default_name(path)
 
+    return _convert_masks(_cached_load(_load_coco, path, name, use_cache), mask_workers)
+
+
+def _load_coco(path: str, name: str) -> Data:
     with open(path, "r") as json_file:
         cocojson = json.load(json_file)
 
@@ -101,11 +218,10 @@ def COCO(
     # Add everything from the coco json into our data structure
     data = Data(name, max_dets=100)
 
-    image_lookup = {}
-
-    for idx, image in enumerate(images):
-        image_lookup[image["id"]] = image
-        data.add_image(image["id"], image["file_name"])
+    for image in images:
+        data.add_image(
+            image["id"], image["file_name"], image.get("width"), image.get("height")
+        )
 
     if cats is not None:
         for cat in cats:
@@ -115,38 +231,109 @@ def COCO(
         image = ann["image_id"]
         _class = ann["category_id"]
         box = ann["bbox"]
-        mask = f.toRLE(
-            ann["segmentation"],
-            image_lookup[image]["width"],
-            image_lookup[image]["height"],
-        )
+        # The masks are only converted to RLEs if they're evaluated (see Data._rle)
+        mask = ann["segmentation"]
 
         if ann["iscrowd"]:
             data.add_ignore_region(image, _class, box, mask)
         else:
             data.add_ground_truth(image, _class, box, mask)
 
+    data._pack_masks()
     return data
 
 
+def _open_json(path: str):
+    """Opens a json file as text, decompressing it on the fly if it's gzipped."""
+    with open(path, "rb") as fp:
+        is_gzip = fp.read(2) == b"\x1f\x8b"
+
+    if is_gzip:
+        return gzip.open(path, "rt")
+    return open(path, "r")
+
+
+def _iter_json_array(json_file, chunk_size: int = 1 << 20):
+    """
+    Parses a file that holds a json array one element at a time, so that the whole file never has to
+    be in memory at once (only about chunk_size characters of it).
+    """
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"[ \t\n\r]*")
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        # Reads more of the file, dropping whatever we've already parsed
+        nonlocal buffer, pos, eof
+        chunk = json_file.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def next_char() -> str:
+        # Skips whitespace and returns the next character ("" at the end of the file)
+        nonlocal pos
+        while True:
+            pos = whitespace.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return buffer[pos : pos + 1]
+            fill()
+
+    if next_char() != "[":
+        raise json.JSONDecodeError("Expecting '['", buffer, pos)
+    pos += 1
+
+    if next_char() == "]":
+        return
+
+    while True:
+        next_char()
+
+        # Read more until we have the whole element and the ',' or ']' after it. Until we see that,
+        # the element might not be complete even if it decodes (e.g., "1.5" cut off at "1.").
+        while True:
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+                after = whitespace.match(buffer, end).end()
+                if eof or buffer[after : after + 1] in (",", "]"):
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+        yield element
+
+        pos = after
+        separator = buffer[pos : pos + 1]
+        if separator == "]":
+            return
+        if separator != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+        pos += 1
+
+
 def COCOResult(path: str, name: str = None) -> Data:
-    """Loads predictions from a COCO-style results file."""
+    """
+    Loads predictions from a COCO-style results file, which may be gzipped.
+    The file is parsed one detection at a time, so only the resulting Data has to fit in memory.
+    """
     if name is None:
         name = default_name(path)
 
-    with open(path, "r") as json_file:
-        dets = json.load(json_file)
-
     data = Data(name)
 
-    for det in dets:
-        image = det["image_id"]
-        _cls = det["category_id"]
-        score = det["score"]
-        box = det["bbox"] if "bbox" in det else None
-        mask = det["segmentation"] if "segmentation" in det else None
+    with _open_json(path) as json_file:
+        for det in _iter_json_array(json_file):
+            image = det["image_id"]
+            _cls = det["category_id"]
+            score = det["score"]
+            box = det["bbox"] if "bbox" in det else None
+            mask = det["segmentation"] if "segmentation" in det else None
 
-        data.add_detection(image, _cls, score, box, mask)
+            data.add_detection(image, _cls, score, box, mask)
 
     return data
 
@@ -156,19 +343,23 @@ def LVIS(
     name: str = None,
     version_str: str = "v1",
     force_download: bool = False,
+    use_cache: bool = False,
+    mask_workers: int = None,
 ) -> Data:
     """
     Load an LVIS-style dataset.
     The version string is used for downloading the dataset and should be one of the versions of LVIS (e.g., v0.5, v1).
 
-    Note that LVIS evaulation is special, but we can emulate it by adding ignore regions.
+    Note that LVIS evaulation is special, but we can emulate it by ignoring classes.
     The detector isn't punished for predicted class that LVIS annotators haven't guarenteed are in
     the image (i.e., the sum of GT annotated classes in the image and those marked explicitly not
-    in the image.) In order to emulate this behavior, add ignore region labels for every class not
-    found to be in the image. This is not that inefficient because ignore regions are separate out
-    during mAP calculation and error processing, so adding a bunch of them doesn't hurt.
+    in the image.) In order to emulate this behavior, every class not found to be in the image is
+    ignored for that image (see Data.add_ignored_classes), which works like an ignore region for
+    each of those classes but is stored as a small bitset per image.
 
     The LVIS AP numbers are slightly lower than what the LVIS API reports because of these workarounds.
+
+    See COCO for use_cache and mask_workers.
     """
     if path is None:
         path = download_annotations(
@@ -184,6 +375,10 @@ def LVIS(
     if name is None:
         name = default_name(path)
 
+    return _convert_masks(_cached_load(_load_lvis, path, name, use_cache), mask_workers)
+
+
+def _load_lvis(path: str, name: str) -> Data:
     with open(path, "r") as json_file:
         lvisjson = json.load(json_file)
 
@@ -192,13 +387,11 @@ def LVIS(
     cats = lvisjson["categories"] if "categories" in lvisjson else None
 
     data = Data(name, max_dets=300)
-    image_lookup = {}
     classes_in_img = defaultdict(lambda: set())
 
     for image in images:
-        image_lookup[image["id"]] = image
         data.add_image(
-            image["id"], image["coco_url"]
+            image["id"], image["coco_url"], image.get("width"), image.get("height")
         )  # LVIS has no image names, only coco urls
 
         # Negative categories are guarenteed by the annotators to not be in the image.
@@ -214,11 +407,8 @@ def LVIS(
         image = ann["image_id"]
         _class = ann["category_id"]
         box = ann["bbox"]
-        mask = f.toRLE(
-            ann["segmentation"],
-            image_lookup[image]["width"],
-            image_lookup[image]["height"],
-        )
+        # The masks are only converted to RLEs if they're evaluated (see Data._rle)
+        mask = ann["segmentation"]
 
         data.add_ground_truth(image, _class, box, mask)
 
@@ -228,17 +418,18 @@ def LVIS(
     all_classes = set(data.classes.keys())
 
     # LVIS doesn't penalize the detector for detecting classes that the annotators haven't guarenteed to be in/out of
-    # the image. Here we simulate that property by adding ignore regions for all such classes.
+    # the image. Here we simulate that property by ignoring all such classes in the image.
     for image in images:
         ignored_classes = all_classes.difference(classes_in_img[image["id"]])
 
         # LVIS doesn't penalize the detector for mistakes made on classes explicitly marked as not exhaustively annoted
-        # We can emulate this by adding ignore regions for every category listed, so add them to the ignored classes.
+        # We can emulate this by ignoring every category listed too, so add them to the ignored classes.
         ignored_classes.update(set(image["not_exhaustive_category_ids"]))
 
-        for _cls in ignored_classes:
-            data.add_ignore_region(image["id"], _cls)
+        # This is the same as an ignore region for each class, but doesn't need ~1200 annotations per image
+        data.add_ignored_classes(image["id"], ignored_classes)
 
+    data._pack_masks()
     return data
 
 
@@ -253,11 +444,13 @@ def Pascal(
     year: int = 2007,
     ann_set: str = "val",
     force_download: bool = False,
+    use_cache: bool = False,
 ) -> Data:
     """
     Loads the Pascal VOC 2007 or 2012 data from a COCO json.
 
     Valid years are 2007 and 2012, and valid ann_sets are 'train' and 'val'.
+    See COCO for use_cache.
     """
     if path is None:
         path = download_annotations(
@@ -270,7 +463,7 @@ def Pascal(
             path, "PASCAL_VOC", "pascal_{}{}.json".format(ann_set, year)
         )
 
-    return COCO(path, name)
+    return COCO(path, name, use_cache=use_cache)
 
 
 def Cityscapes(path: str, name: str = None):
@@ -281,6 +474,7 @@ def Cityscapes(path: str, name: str = None):
     You can get cityscapes here: https://www.cityscapes-dataset.com/
 
     Path should be to gtFine/<ann_set>. E.g., <path_to_cityscapes>/gtFine/val.
+    The masks are kept as polygons until they're evaluated (see COCO).
     """
     if name is None:
         name = default_name(path)
@@ -313,7 +507,7 @@ def Cityscapes(path: str, name: str = None):
         objs = ann_json["objects"]
 
         data.add_image(
-            image_id, image_id
+            image_id, image_id, ann_json["imgWidth"], ann_json["imgHeight"]
         )  # The id in this case is just the name of the image
 
         # Caravan and Trailer should be ignored from all evaluation
@@ -350,4 +544,5 @@ def Cityscapes(path: str, name: str = None):
             else:
                 data.add_ground_truth(image_id, class_id, box, poly)
 
+    data._pack_masks()
     return data
@@ -19,13 +19,13 @@ class Error:
 
         if hasattr(self, "pred"):
             # If an ignored instance is an error, it's not in the data point list, so there's no "unfixed" entry
-            if self.pred["used"] is None:
+            if self.info["used"] is None:
                 return None
             else:
                 return self.pred["class"], (
                     self.pred["score"],
                     False,
-                    self.pred["info"],
+                    self.info,
                 )
         else:
             return None
@@ -81,29 +81,26 @@ class BestGTMatch:
     To address this, this class finds the prediction with the hiighest
     score and then uses that as the error to fix, while suppressing all
     other errors caused by the same GT.
+
+    The best prediction for each GT is kept in best_preds, which maps a GT id to the
+    (score, id) of that prediction and belongs to the run (so the annotations aren't touched).
+    If it isn't given, this match only competes with itself.
     """
 
-    def __init__(self, pred, gt):
+    def __init__(self, pred: dict, gt: dict, info: dict, best_preds: dict = None):
         self.pred = pred
         self.gt = gt
+        self.info = info
+        self.best_preds = {} if best_preds is None else best_preds
 
-        if self.gt["used"]:
-            self.suppress = True
-        else:
-            self.suppress = False
-            self.gt["usable"] = True
-
-            score = self.pred["score"]
-
-            if not "best_score" in self.gt:
-                self.gt["best_score"] = -1
+        score = self.pred["score"]
+        best = self.best_preds.get(self.gt["_id"])
 
-            if self.gt["best_score"] < score:
-                self.gt["best_score"] = score
-                self.gt["best_id"] = self.pred["_id"]
+        if best is None or best[0] < score:
+            self.best_preds[self.gt["_id"]] = (score, self.pred["_id"])
 
     def fix(self):
-        if self.suppress or self.gt["best_id"] != self.pred["_id"]:
+        if self.best_preds[self.gt["_id"]][1] != self.pred["_id"]:
             return None
         else:
-            return (self.pred["score"], True, self.pred["info"])
+            return (self.pred["score"], True, self.info)
@@ -9,11 +9,13 @@ class ClassError(Error):
     )
     short_name = "Cls"
 
-    def __init__(self, pred: dict, gt: dict):
+    def __init__(self, pred: dict, gt: dict, info: dict, match: BestGTMatch):
         self.pred = pred
         self.gt = gt
+        self.info = info
 
-        self.match = BestGTMatch(pred, gt) if not self.gt["used"] else None
+        # This is None if the GT was already used, since then there's nothing to fix
+        self.match = match
 
     def fix(self):
         if self.match is None:
@@ -26,11 +28,13 @@ class BoxError(Error):
     description = "Error caused when a prediction would have been marked positive if it was localized better."
     short_name = "Loc"
 
-    def __init__(self, pred: dict, gt: dict):
+    def __init__(self, pred: dict, gt: dict, info: dict, match: BestGTMatch):
         self.pred = pred
         self.gt = gt
+        self.info = info
 
-        self.match = BestGTMatch(pred, gt) if not self.gt["used"] else None
+        # This is None if the GT was already used, since then there's nothing to fix
+        self.match = match
 
     def fix(self):
         if self.match is None:
@@ -46,10 +50,11 @@ class DuplicateError(Error):
     )
     short_name = "Dupe"
 
-    def __init__(self, pred: dict, gt: dict, suppressor: dict):
+    def __init__(self, pred: dict, gt: dict, suppressor: dict, info: dict):
         self.pred = pred
         self.gt = gt
         self.suppressor = suppressor
+        self.info = info
 
     def fix(self):
         return None
@@ -60,8 +65,9 @@ class BackgroundError(Error):
     description = "Error caused when this detection should have been classified as background (IoU < 0.1)."
     short_name = "Bkg"
 
-    def __init__(self, pred: dict):
+    def __init__(self, pred: dict, info: dict):
         self.pred = pred
+        self.info = info
 
     def fix(self):
         return None
@@ -75,9 +81,10 @@ class ClassBoxError(Error):
     )
     short_name = "ClsLoc"
 
-    def __init__(self, pred: dict, gt: dict):
+    def __init__(self, pred: dict, gt: dict, info: dict):
         self.pred = pred
         self.gt = gt
+        self.info = info
 
     def fix(self):
         return None
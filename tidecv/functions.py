@@ -115,13 +115,263 @@ def polyToBox(poly: list):
     ymax = -1e10
 
     for poly_comp in poly:
-        for i in range(len(poly_comp) // 2):
-            x = poly_comp[2 * i + 0]
-            y = poly_comp[2 * i + 1]
+        xs = poly_comp[0 : len(poly_comp) // 2 * 2 : 2]
+        ys = poly_comp[1 : len(poly_comp) // 2 * 2 : 2]
 
-            xmin = min(x, xmin)
-            xmax = max(x, xmax)
-            ymin = min(y, ymin)
-            ymax = max(y, ymax)
+        if len(xs) > 0:
+            xmin = min(min(xs), xmin)
+            xmax = max(max(xs), xmax)
+            ymin = min(min(ys), ymin)
+            ymax = max(max(ys), ymax)
 
     return [xmin, ymin, (xmax - xmin), (ymax - ymin)]
+
+
+def rleToBox(rle: dict):
+    """Returns the bounding box in [x, y, w, h] of the pixels set in a (compressed) RLE."""
+    import pycocotools.mask as maskUtils
+
+    return maskUtils.toBbox(rle).tolist()
+
+
+# grouped_box_iou only looks for overlapping pairs when there are more pairs than this per box
+_SPARSE_IOU_RATIO = 8
+
+
+def _box_iou(boxes: np.ndarray, gt: np.ndarray, iscrowd: np.ndarray) -> np.ndarray:
+    """Elementwise box IoU between broadcastable [..., 4] arrays of [x, y, w, h] boxes."""
+
+    # Same order of operations as bbIou in pycocotools so the results are bit-for-bit identical
+    wh = np.minimum(boxes[..., 2:] + boxes[..., :2], gt[..., 2:] + gt[..., :2])
+    wh -= np.maximum(boxes[..., :2], gt[..., :2])
+    inter = wh[..., 0] * wh[..., 1]
+
+    area = boxes[..., 2] * boxes[..., 3]
+    union = area + gt[..., 2] * gt[..., 3] - inter
+    if iscrowd is not None:
+        union = np.where(iscrowd, area, union)
+
+    overlaps = np.minimum(wh[..., 0], wh[..., 1]) > 0
+    return np.divide(inter, union, out=np.zeros_like(inter), where=overlaps)
+
+
+def box_iou(boxes: np.ndarray, gt: np.ndarray, iscrowd: list = None) -> np.ndarray:
+    """
+    Computes the [len(boxes), len(gt)] IoU matrix between two sets of [x, y, w, h] boxes.
+    This gives the same numbers as pycocotools.mask.iou on boxes.
+
+    Like in pycocotools, if iscrowd[j] is True then gt[j] is a crowd region and the union used for
+    it is just the area of the box.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 1, 4)
+    gt = np.asarray(gt, dtype=np.float64).reshape(1, -1, 4)
+    if iscrowd is not None:
+        iscrowd = np.asarray(iscrowd, dtype=bool).reshape(1, -1)
+
+    return _box_iou(boxes, gt, iscrowd)
+
+
+def top_k(scores: np.ndarray, k: int = None) -> np.ndarray:
+    """
+    Returns the indices of the k highest scores (all of them if k is None) from highest to lowest, with
+    ties going to the lower index. This is the same as a stable sort by descending score, but only the
+    top k get sorted.
+    """
+    neg_scores = -np.asarray(scores, dtype=np.float64)
+    if k is None or k >= len(neg_scores):
+        return np.argsort(neg_scores, kind="stable")
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Everything better than the k-th best score makes it, plus as many of the ties with it as fit
+    kth = np.partition(neg_scores, k - 1)[k - 1]
+    better = np.flatnonzero(neg_scores < kth)
+    ties = np.flatnonzero(neg_scores == kth)[: k - len(better)]
+
+    top = np.concatenate([better, ties])
+    return top[np.argsort(neg_scores[top], kind="stable")]
+
+
+def greedy_match(iou: np.ndarray, thresh: float) -> tuple:
+    """
+    Goes through the rows of iou (e.g., the predictions sorted by score) in order and matches each to
+    the column (e.g., a gt) it has the highest IoU with, as long as that IoU is at least thresh. Matched
+    columns get an IoU of 0 for the rows after that, and ties go to the first column.
+
+    Returns (row_match, col_match, row_max), where row_match / col_match are the column / row each row /
+    column got matched to (-1 if it wasn't) and row_max is the max IoU of each row before matching.
+    """
+    iou = np.asarray(iou)
+    num_rows, num_cols = iou.shape
+
+    row_match = np.full(num_rows, -1, dtype=np.int64)
+    col_match = np.full(num_cols, -1, dtype=np.int64)
+    if num_cols == 0:
+        return row_match, col_match, np.zeros(num_rows)
+    row_max = iou.max(axis=1)
+
+    # Matching only ever lowers IoUs, so rows that start below the threshold can't match anything
+    candidates = np.flatnonzero(row_max >= thresh)
+    buffer = iou[candidates]
+
+    for idx, row in enumerate(candidates.tolist()):
+        col = buffer[idx].argmax()
+
+        if buffer[idx, col] >= thresh:
+            row_match[row] = col
+            col_match[col] = row
+
+            # Make sure this column can't be used again
+            buffer[idx + 1 :, col] = 0
+
+    return row_match, col_match, row_max
+
+
+def greedy_match_thresholds(iou: np.ndarray, thresholds: list) -> tuple:
+    """
+    Does greedy_match for every threshold in thresholds at once, going through the rows a single time
+    (like COCOeval does) instead of once per threshold. Each threshold keeps its own matched columns.
+
+    Returns (row_match, col_match, row_max), where row_match / col_match are [num_thresholds, num_rows] /
+    [num_thresholds, num_cols] and row_max is the same as for greedy_match.
+    """
+    iou = np.asarray(iou)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    num_rows, num_cols = iou.shape
+    num_thresholds = len(thresholds)
+
+    row_match = np.full((num_thresholds, num_rows), -1, dtype=np.int64)
+    col_match = np.full((num_thresholds, num_cols), -1, dtype=np.int64)
+    if num_cols == 0:
+        return row_match, col_match, np.zeros(num_rows)
+    row_max = iou.max(axis=1)
+    if num_thresholds == 0:
+        return row_match, col_match, row_max
+
+    # Rows that start below every threshold can't match anything
+    candidates = np.flatnonzero(row_max >= thresholds.min())
+    # Whether each column is still free for each threshold (used ones count as an IoU of 0)
+    free = np.ones((num_thresholds, num_cols), dtype=bool)
+    threshold_idx = np.arange(num_thresholds)
+
+    for row in candidates.tolist():
+        row_iou = np.where(free, iou[row], 0)
+        cols = row_iou.argmax(axis=1)
+        matched = row_iou[threshold_idx, cols] >= thresholds
+
+        matched_idx = threshold_idx[matched]
+        matched_cols = cols[matched]
+        row_match[matched_idx, row] = matched_cols
+        col_match[matched_idx, matched_cols] = row
+        free[matched_idx, matched_cols] = False
+
+    return row_match, col_match, row_max
+
+
+def _overlapping_pairs(
+    boxes: np.ndarray, gt: np.ndarray, box_counts: np.ndarray, gt_counts: np.ndarray
+) -> tuple:
+    """
+    Finds the (box, gt) pairs within each group of grouped_box_iou whose boxes can overlap along x, by
+    sorting the gt of each group by x1 and binary searching each box's range in it. Returns the row and
+    column indices of those pairs. Every pair with a nonzero IoU is included (plus some that aren't).
+    """
+    num_groups = len(box_counts)
+    box_group = np.repeat(np.arange(num_groups), box_counts)
+    gt_group = np.repeat(np.arange(num_groups), gt_counts)
+    gt_starts = np.cumsum(gt_counts) - gt_counts
+
+    # A gt that overlaps a box starts at most (the widest gt in its group) to the left of the box
+    max_w = np.zeros(num_groups)
+    nonempty = gt_counts > 0
+    max_w[nonempty] = np.maximum.reduceat(np.nan_to_num(gt[:, 2]), gt_starts[nonempty])
+
+    lo = boxes[:, 0] - max_w[box_group]
+    hi = boxes[:, 0] + boxes[:, 2]
+    # Widen the range a little so rounding can't drop a pair that barely overlaps
+    slack = 1e-6 * (np.abs(lo) + np.abs(hi) + 1)
+    lo, hi = lo - slack, hi + slack
+
+    # Rank all the coordinates together so (group, x) can be packed into a single exact integer key
+    _, ranks = np.unique(np.concatenate([gt[:, 0], lo, hi]), return_inverse=True)
+    ranks = ranks.reshape(-1)
+    num_ranks = len(ranks) + 1
+    gt_key = gt_group * num_ranks + ranks[: len(gt)]
+    lo_key = box_group * num_ranks + ranks[len(gt) : len(gt) + len(boxes)]
+    hi_key = box_group * num_ranks + ranks[len(gt) + len(boxes) :]
+
+    gt_order = np.argsort(gt_key, kind="stable")
+    sorted_keys = gt_key[gt_order]
+    start = np.searchsorted(sorted_keys, lo_key, "left")
+    lengths = np.maximum(np.searchsorted(sorted_keys, hi_key, "right") - start, 0)
+
+    rows = np.repeat(np.arange(len(boxes)), lengths)
+    pos = np.arange(len(rows)) - np.repeat(
+        np.cumsum(lengths) - lengths - start, lengths
+    )
+    return rows, gt_order[pos]
+
+
+def grouped_box_iou(
+    boxes: np.ndarray,
+    gt: np.ndarray,
+    box_counts: np.ndarray,
+    gt_counts: np.ndarray,
+    iscrowd: np.ndarray = None,
+) -> list:
+    """
+    Computes box_iou for many small groups of boxes (e.g., one group per image) in a single vectorized
+    call, since for small groups the per-call overhead dominates the actual arithmetic.
+
+    Group i is made up of the next box_counts[i] rows of boxes and the next gt_counts[i] rows of gt
+    (and iscrowd). Returns a list with the [box_counts[i], gt_counts[i]] IoU matrix of each group.
+
+    When the groups are big, the IoU is only computed for the pairs that can overlap and the rest of
+    each matrix is left at 0, which is what _box_iou would give them anyway.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    gt = np.asarray(gt, dtype=np.float64).reshape(-1, 4)
+    box_counts = np.asarray(box_counts, dtype=np.int64)
+    gt_counts = np.asarray(gt_counts, dtype=np.int64)
+
+    pair_counts = box_counts * gt_counts
+    num_pairs = pair_counts.sum()
+    sparse = num_pairs > _SPARSE_IOU_RATIO * (len(boxes) + len(gt))
+
+    if sparse:
+        rows, cols = _overlapping_pairs(boxes, gt, box_counts, gt_counts)
+    else:
+        # Pair every box with each gt in its group, in row-major order within the group
+        gt_starts = np.cumsum(gt_counts) - gt_counts
+        pairs_per_box = np.repeat(gt_counts, box_counts)
+        first_pair = np.cumsum(pairs_per_box) - pairs_per_box
+
+        rows = np.repeat(np.arange(len(boxes)), pairs_per_box)
+        cols = np.arange(len(rows)) - np.repeat(
+            first_pair - np.repeat(gt_starts, box_counts), pairs_per_box
+        )
+
+    if iscrowd is not None:
+        iscrowd = np.asarray(iscrowd, dtype=bool)[cols]
+    ious = _box_iou(boxes[rows], gt[cols], iscrowd)
+
+    if sparse:
+        # Scatter the pairs into their spots in the flattened matrices
+        box_starts = np.cumsum(box_counts) - box_counts
+        gt_starts = np.cumsum(gt_counts) - gt_counts
+        group = np.repeat(np.arange(len(box_counts)), box_counts)[rows]
+
+        flat_idx = np.cumsum(pair_counts)[group] - pair_counts[group]
+        flat_idx += (
+            (rows - box_starts[group]) * gt_counts[group] + cols - gt_starts[group]
+        )
+
+        dense = np.zeros(num_pairs)
+        dense[flat_idx] = ious
+        ious = dense
+
+    splits = np.cumsum(pair_counts)[:-1]
+    return [
+        x.reshape(n, m)
+        for x, n, m in zip(np.split(ious, splits), box_counts, gt_counts)
+    ]
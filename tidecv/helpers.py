@@ -1,10 +1,11 @@
 import json
 from collections import defaultdict
 from copy import copy
-from typing import List, Tuple
+from typing import List, Tuple, Union
 
 from tidecv.data import Data
 from tidecv.errors.error import Error
+from tidecv.quantify import TIDERun
 
 
 def json_to_Data(json_path: str) -> Tuple[Data, Data]:
@@ -99,8 +100,12 @@ def create_filtered_Data(
             if "info" in ann and ann["info"].get("matched_with"):
                 # The id could be missing from the dict if we don't have
                 # all links and the gts is not kept.
-                ann["info"]["matched_with"] = reamapping_old_to_new_ids.get(
-                    ann["info"]["matched_with"]
+                # The info is copied too, since it's shared with the previous one.
+                ann["info"] = dict(
+                    ann["info"],
+                    matched_with=reamapping_old_to_new_ids.get(
+                        ann["info"]["matched_with"]
+                    ),
                 )
 
     data_filtered.annotations = annotations
@@ -121,7 +126,12 @@ def create_filtered_Data(
 
 
 def enlarge_dataset_to_respect_TIDE(
-    gts: Data, preds: Data, gts_keep: set, preds_keep: set, errors: List[Error]
+    gts: Data,
+    preds: Data,
+    gts_keep: set,
+    preds_keep: set,
+    run: Union[TIDERun, List[Error]] = None,
+    errors: List[Error] = None,
 ) -> Tuple[Data, Data, dict, dict]:
     """
     Enlarge completely to respect TIDE, i.e., add all the possible links since
@@ -134,16 +144,34 @@ def enlarge_dataset_to_respect_TIDE(
     dataset with only 1-links.
 
     input:
-    - gts, preds: the Data instance for gts and preds. The preds instance is
-        also used to extract the links pred TP -> gt TP
+    - gts, preds: the Data instance for gts and preds
     - gts_keep, preds_keep: set of ids to keep in the filtered dataset
-    - errors: list of errors that is used to extract the links pred -> gt for
-        when pred is not a TP
+    - run: the TIDERun of preds on gts. Its errors are used to extract the
+        links pred -> gt for when pred is not a TP, and its pred_info the
+        links pred TP -> gt TP
+    - errors: the errors to use instead of the ones of the run. run.errors
+        can also be passed in place of the run, like before, since it knows
+        the run it belongs to
 
     return:
     - a tuple of Data instances (gts_enlarged, preds_enlarged)
     """
 
+    # The errors of the run used to be passed in its place
+    if errors is None and not isinstance(run, TIDERun):
+        run, errors = None, run
+    if run is None:
+        # Only run.errors knows its run, the links pred TP -> gt TP can't be found without it
+        run = getattr(errors, "run", None)
+        if run is None:
+            raise TypeError(
+                "enlarge_dataset_to_respect_TIDE needs the TIDERun (or run.errors), "
+                "since the links from true positives to their GT are in run.pred_info."
+            )
+    if errors is None:
+        errors = run.errors
+    pred_info = run.pred_info
+
     # Extract a mapping pred error id -> gt assoc id
     pred_id_to_gt_id = {}
     for error in errors:
@@ -152,9 +180,9 @@ def enlarge_dataset_to_respect_TIDE(
     # Add mappings pred TP id -> gt assoc TP id
     pred_id_to_gt_id.update(
         {
-            pred["_id"]: pred["info"]["matched_with"]
-            for pred in preds.annotations
-            if "matched_with" in pred.get("info", {})
+            pred_id: info["matched_with"]
+            for pred_id, info in pred_info.items()
+            if "matched_with" in info
         }
     )
 
@@ -1,4 +1,8 @@
+import hashlib
+import io
+import pickle
 from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
 
 import numpy as np
@@ -6,8 +10,8 @@ from pycocotools import mask as mask_utils
 
 from . import functions as f
 from . import plotting as P
-from .ap import ClassedAPDataObject
-from .data import Data
+from .ap import APDataArrays, ClassedAPDataArrays, ClassedAPDataObject
+from .data import Data, DataArrays
 from .errors.main_errors import *
 from .errors.qualifiers import Qualifier
 
@@ -23,7 +27,24 @@ class TIDEExample:
         mode: str,
         max_dets: int,
         run_errors: bool = True,
+        numpy_box_iou: bool = True,
+        gt_iou: np.ndarray = None,
+        ignore_iou: np.ndarray = None,
+        gt_cls_matching: np.ndarray = None,
+        ignored_classes: np.ndarray = None,
     ):
+        """
+        If they've already been computed, the IoU of preds with the non-ignore gt, the crowd IoU of
+        preds with the ignore regions and whether each pred has the same class as each gt can be passed
+        in as gt_iou, ignore_iou and gt_cls_matching (in the order given).
+        Otherwise, they're computed here (with f.box_iou in box mode if numpy_box_iou is set).
+
+        Unmatched predictions with a class in ignored_classes are ignored, as if there was an ignore
+        region without a box or mask for each of those classes (see Data.add_ignored_classes).
+
+        The annotations aren't modified. The results are in pred_used, pred_match, pred_iou and
+        gt_match instead, where the predictions are in self.preds order (sorted by score).
+        """
         self.preds = preds
         self.gt = [x for x in gt if not x["ignore"]]
         self.ignore_regions = [x for x in gt if x["ignore"]]
@@ -32,104 +53,147 @@ class TIDEExample:
         self.pos_thresh = pos_thresh
         self.max_dets = max_dets
         self.run_errors = run_errors
+        self.numpy_box_iou = numpy_box_iou and mode == TIDE.BOX
+
+        self.gt_iou = gt_iou
+        self.ignore_iou = ignore_iou
+        self.gt_cls_matching = gt_cls_matching
+        self.ignored_classes = ignored_classes
 
         self._run()
 
-    def _run(self):
+    def _iou(self, preds: list, gt: list, iscrowd: bool) -> np.ndarray:
+        det_type = "bbox" if self.mode == TIDE.BOX else "mask"
+        iscrowd = [iscrowd] * len(gt)
+
+        if self.numpy_box_iou:
+            return f.box_iou(
+                [x[det_type] for x in preds], [x[det_type] for x in gt], iscrowd
+            )
+        return mask_utils.iou(
+            [x[det_type] for x in preds], [x[det_type] for x in gt], iscrowd
+        )
+
+    def _in_ignore_region(self, preds: list, ignore: list) -> np.ndarray:
+        """
+        Returns whether each prediction is inside an ignore region of the same class (or of class -1),
+        including the classes in ignored_classes. Whether the prediction was matched isn't checked here.
+        """
+        return self._ignore_region_iou(preds, ignore) > self.pos_thresh
+
+    def _ignore_region_iou(self, preds: list, ignore: list) -> np.ndarray:
+        """
+        Returns the highest crowd IoU of each prediction with an ignore region of the same class (or of
+        class -1), including the classes in ignored_classes, or -inf if there's no such region.
+        """
+        det_type = "bbox" if self.mode == TIDE.BOX else "mask"
+        pred_cls = np.array([x["class"] for x in preds])
+        region_iou = np.full(len(preds), -np.inf)
+
+        whole_image = []
+        regions = []
+        for region_idx, region in enumerate(ignore):
+            if region["mask"] is None and region["bbox"] is None:
+                whole_image.append(region["class"])
+            elif region[det_type] is not None:
+                # Regions without a det_type annotation are skipped
+                regions.append(region_idx)
+
+        # A region spanning the whole image has an IoU of 1 with everything, so it comes down to the class
+        if self.ignored_classes is not None:
+            whole_image.extend(self.ignored_classes.tolist())
+        if len(whole_image) > 0:
+            if -1 in whole_image:
+                region_iou[:] = 1
+            else:
+                region_iou[np.isin(pred_cls, whole_image)] = 1
+
+        # Otherwise, use the crowd IoU between the detections and all of the regions at once
+        if len(regions) > 0:
+            if self.ignore_iou is None:
+                ignore_iou = self._iou(preds, [ignore[idx] for idx in regions], True)
+            else:
+                ignore_iou = self.ignore_iou[:, regions]
+
+            region_cls = np.array([ignore[idx]["class"] for idx in regions])
+            cls_match = (pred_cls[:, None] == region_cls[None, :]) | (region_cls == -1)[
+                None, :
+            ]
+            region_iou = np.maximum(
+                region_iou, np.where(cls_match, ignore_iou, -np.inf).max(axis=1)
+            )
+
+        return region_iou
+
+    def _sort_preds(self):
+        """
+        Sorts the predictions descending by score, keeping only the top max_dets, and gets the IoU
+        (and class matching) matrices in that order.
+        """
         preds = self.preds
         gt = self.gt
-        ignore = self.ignore_regions
-        det_type = "bbox" if self.mode == TIDE.BOX else "mask"
-        max_dets = self.max_dets
 
         if len(preds) == 0:
             raise RuntimeError("Example has no predictions!")
 
-        # Sort descending by score
-        preds.sort(key=lambda pred: -pred["score"])
-        preds = preds[:max_dets]
+        order = f.top_k([pred["score"] for pred in preds], self.max_dets).tolist()
+        preds = [preds[idx] for idx in order]
         self.preds = preds  # Update internally so TIDERun can update itself if :max_dets takes effect
-        detections = [x[det_type] for x in preds]
-
-        # IoU is [len(detections), len(gt)]
-        self.gt_iou = mask_utils.iou(
-            detections, [x[det_type] for x in gt], [False] * len(gt)
-        )
 
-        # Store whether a prediction / gt got used in their data list
-        # Note: this is set to None if ignored, keep that in mind
-        for idx, pred in enumerate(preds):
-            pred["used"] = False
-            pred["_idx"] = idx
-            pred["iou"] = 0
-        for idx, truth in enumerate(gt):
-            truth["used"] = False
-            truth["usable"] = False
-            truth["_idx"] = idx
+        # IoU is [len(preds), len(gt)]
+        if self.gt_iou is None:
+            self.gt_iou = self._iou(preds, gt, False)
+        else:
+            self.gt_iou = self.gt_iou[order]
 
-        pred_cls = np.array([x["class"] for x in preds])
-        gt_cls = np.array([x["class"] for x in gt])
+        if self.ignore_iou is not None:
+            self.ignore_iou = self.ignore_iou[order]
+        if self.gt_cls_matching is not None:
+            self.gt_cls_matching = self.gt_cls_matching[order]
 
         if len(gt) > 0:
-            # A[i,j] is true iff the prediction i is of the same class as gt j
-            self.gt_cls_matching = pred_cls[:, None] == gt_cls[None, :]
-            self.gt_cls_iou = self.gt_iou * self.gt_cls_matching
-
-            # This will be changed in the matching calculation, so make a copy
-            iou_buffer = self.gt_cls_iou.copy()
+            if self.gt_cls_matching is None:
+                pred_cls = np.array([x["class"] for x in preds])
+                gt_cls = np.array([x["class"] for x in gt])
 
-            for pred_idx, pred_elem in enumerate(preds):
-                # Find the max iou ground truth for this prediction
-                gt_idx = np.argmax(iou_buffer[pred_idx, :])
-                iou = iou_buffer[pred_idx, gt_idx]
+                # A[i,j] is true iff the prediction i is of the same class as gt j
+                self.gt_cls_matching = pred_cls[:, None] == gt_cls[None, :]
+            self.gt_cls_iou = self.gt_iou * self.gt_cls_matching
 
-                pred_elem["iou"] = np.max(self.gt_cls_iou[pred_idx, :])
+    def _run(self):
+        self._sort_preds()
+        preds = self.preds
+        gt = self.gt
+        ignore = self.ignore_regions
 
-                if iou >= self.pos_thresh:
-                    gt_elem = gt[gt_idx]
+        # Which gt each prediction got matched with and vice versa (-1 if none), and the best IoU each
+        # prediction has with a gt of its class. These are kept here rather than in the annotations, so
+        # that the same Data can be used by any number of runs at once.
+        self.pred_match = np.full(len(preds), -1, dtype=np.int64)
+        self.gt_match = np.full(len(gt), -1, dtype=np.int64)
+        self.pred_iou = np.zeros(len(preds))
 
-                    pred_elem["used"] = True
-                    gt_elem["used"] = True
-                    pred_elem["matched_with"] = gt_elem["_id"]
-                    gt_elem["matched_with"] = pred_elem["_id"]
+        if len(gt) > 0:
+            # Match each prediction (in order of score) with the best gt of its class that's left
+            self.pred_match, self.gt_match, self.pred_iou = f.greedy_match(
+                self.gt_cls_iou, self.pos_thresh
+            )
 
-                    # Make sure this gt can't be used again
-                    iou_buffer[:, gt_idx] = 0
+        # Whether each prediction is a positive (True), a negative (False) or ignored (None)
+        self.pred_used = (self.pred_match >= 0).tolist()
 
         # Ignore regions annotations allow us to ignore predictions that fall within
-        if len(ignore) > 0:
-            # Because ignore regions have extra parameters, it's more efficient to use a for loop here
-            for ignore_region in ignore:
-                if ignore_region["mask"] is None and ignore_region["bbox"] is None:
-                    # The region should span the whole image
-                    ignore_iou = [1] * len(preds)
-                else:
-                    if ignore_region[det_type] is None:
-                        # There is no det_type annotation for this specific region so skip it
-                        continue
-                    # Otherwise, compute the crowd IoU between the detections and this region
-                    ignore_iou = mask_utils.iou(
-                        detections, [ignore_region[det_type]], [True]
-                    )
-
-                for pred_idx, pred_elem in enumerate(preds):
-                    if (
-                        not pred_elem["used"]
-                        and (ignore_iou[pred_idx] > self.pos_thresh)
-                        and (
-                            ignore_region["class"] == pred_elem["class"]
-                            or ignore_region["class"] == -1
-                        )
-                    ):
-                        # Set the prediction to be ignored
-                        pred_elem["used"] = None
+        for pred_idx in np.flatnonzero(self._in_ignore_region(preds, ignore)).tolist():
+            if not self.pred_used[pred_idx]:
+                # Set the prediction to be ignored
+                self.pred_used[pred_idx] = None
 
         if len(gt) == 0:
             return
 
         # Some matrices used just for error calculation
         if self.run_errors:
-            self.gt_used = np.array([x["used"] == True for x in gt])[None, :]
+            self.gt_used = (self.gt_match >= 0)[None, :]
             self.gt_unused = ~self.gt_used
 
             self.gt_unused_iou = self.gt_unused * self.gt_iou
@@ -142,11 +206,87 @@ class TIDEExample:
             self.gt_used_cls = self.gt_used_iou * self.gt_cls_matching
 
 
+class ThresholdExample(TIDEExample):
+    """
+    Matches a set of predictions with the gt of a single image at several positive thresholds at once,
+    going through the predictions a single time like COCOeval does. This is all the runs that don't
+    compute errors need (see TIDERun._eval_images).
+    """
+
+    def __init__(
+        self,
+        preds: list,
+        gt: list,
+        thresholds: list,
+        mode: str,
+        max_dets: int,
+        numpy_box_iou: bool = True,
+        gt_iou: np.ndarray = None,
+        ignore_iou: np.ndarray = None,
+        gt_cls_matching: np.ndarray = None,
+        ignored_classes: np.ndarray = None,
+    ):
+        """
+        The arguments are the same as for TIDEExample. The results are the [num_thresholds, len(preds)]
+        matrices tp (whether each prediction is a true positive), ignored (whether it's ignored instead
+        of a false positive) and pred_match, the [num_thresholds, len(gt)] matrix gt_match and the
+        pred_iou shared by every threshold, with the predictions in self.preds order.
+        """
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+
+        super().__init__(
+            preds,
+            gt,
+            None,
+            mode,
+            max_dets,
+            run_errors=False,
+            numpy_box_iou=numpy_box_iou,
+            gt_iou=gt_iou,
+            ignore_iou=ignore_iou,
+            gt_cls_matching=gt_cls_matching,
+            ignored_classes=ignored_classes,
+        )
+
+    def _run(self):
+        self._sort_preds()
+        num_thresholds = len(self.thresholds)
+
+        self.pred_match = np.full((num_thresholds, len(self.preds)), -1, dtype=np.int64)
+        self.gt_match = np.full((num_thresholds, len(self.gt)), -1, dtype=np.int64)
+        self.pred_iou = np.zeros(len(self.preds))
+
+        if len(self.gt) > 0:
+            self.pred_match, self.gt_match, self.pred_iou = f.greedy_match_thresholds(
+                self.gt_cls_iou, self.thresholds
+            )
+
+        self.tp = self.pred_match >= 0
+        # The crowd IoU with the ignore regions doesn't depend on the threshold, so only compare it
+        region_iou = self._ignore_region_iou(self.preds, self.ignore_regions)
+        self.ignored = ~self.tp & (region_iou[None, :] > self.thresholds[:, None])
+
+
+class _RunErrors(list):
+    """
+    The list of errors of a TIDERun (run.errors), which also points back to the run, so that code that
+    only gets the errors can still find the rest of the results (e.g., run.pred_info). Copies and
+    pickles of it are plain lists, so the run isn't sent along with its errors.
+    """
+
+    def __init__(self, run: "TIDERun", errors: list = ()):
+        super().__init__(errors)
+        self.run = run
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
 class TIDERun:
     """Holds the data for a single run of TIDE."""
 
-    # Temporary variables stored in ground truth that we need to clear after a run
-    _temp_vars = ["best_score", "best_id", "used", "matched_with", "_idx", "usable"]
+    # Box IoUs are computed for roughly this many (prediction, gt) pairs at a time
+    _iou_batch_size = 2**20
 
     def __init__(
         self,
@@ -157,11 +297,29 @@ class TIDERun:
         mode: str,
         max_dets: int,
         run_errors: bool = True,
+        numpy_box_iou: bool = True,
+        num_workers: int = 1,
+        keep_images: bool = False,
+        _run: bool = True,
+        _gt_images: "_GTImages" = None,
+        _arrays: tuple = None,
     ):
+        """
+        If num_workers > 1, the images are split into shards that are evaluated in that many worker
+        processes and then merged back together (in order, so the result is the same).
+
+        If keep_images is set, the results of every image are also kept apart, along with a hash of its
+        predictions, so that from_previous only has to evaluate the images whose predictions changed.
+        """
         self.gt = gt
         self.preds = preds
+        # The snapshots of gt and preds (see Data._eval_arrays) the evaluation reads from. Runs that are
+        # evaluated together pass in the ones of the first run as _arrays.
+        self.gt_arrays, self.preds_arrays = (
+            (gt._eval_arrays(), preds._eval_arrays()) if _arrays is None else _arrays
+        )
 
-        self.errors = []
+        self.errors = _RunErrors(self)
         self.error_dict = {_type: [] for _type in TIDE._error_types}
 
         self.ap_data = ClassedAPDataObject()
@@ -170,53 +328,710 @@ class TIDERun:
         # A list of false negatives per class
         self.false_negatives = {_id: [] for _id in self.gt.classes}
 
+        # Everything we know about a prediction after matching (its IoU, whether it was used and what
+        # it matched with), by prediction id. This is the info stored with each AP data point.
+        self.pred_info = {}
+        # Maps a gt id to the (score, id) of the best prediction that could fix it (see BestGTMatch)
+        self._best_preds = {}
+
         self.pos_thresh = pos_thresh
         self.bg_thresh = bg_thresh
         self.mode = mode
         self.max_dets = max_dets
         self.run_errors = run_errors
+        self.numpy_box_iou = numpy_box_iou
+        self.num_workers = num_workers
+        self.keep_images = keep_images
+
+        # If this is set to a dict, the results of every image are kept apart in it by image id
+        # instead of being added up (see _take_results)
+        self._image_results = None
+        # Maps an image id to a hash of its predictions, if keep_images is set (see _image_hash)
+        self._image_hashes = {}
+        # The work on the gt of every image that doesn't depend on the predictions, which can be
+        # shared with other runs on the same gt (see TIDE.evaluate_many)
+        self._gt_images = _gt_images
+
+        if _run:
+            self._run()
+
+    @classmethod
+    def evaluate_thresholds(
+        cls,
+        gt: Data,
+        preds: Data,
+        thresholds: list,
+        bg_thresh: float,
+        mode: str,
+        max_dets: int,
+        error_thresh: float = None,
+        numpy_box_iou: bool = True,
+        num_workers: int = 1,
+    ) -> list:
+        """
+        Creates a TIDERun for every positive threshold in thresholds. The IoUs and class matches of each
+        image are computed once and shared by all of them instead of once per threshold, and the runs
+        without errors are matched at all of their thresholds in a single pass (see ThresholdExample).
+        Only the run whose threshold is error_thresh (if any) computes errors.
+        """
+        runs = []
 
-        self._run()
+        for thresh in thresholds:
+            # Set the run up without running it, so that we can run them all at once
+            run = cls(
+                gt,
+                preds,
+                thresh,
+                bg_thresh,
+                mode,
+                max_dets,
+                run_errors=(thresh == error_thresh),
+                numpy_box_iou=numpy_box_iou,
+                num_workers=num_workers,
+                _run=False,
+                _arrays=(runs[0].gt_arrays, runs[0].preds_arrays) if runs else None,
+            )
+            runs.append(run)
+
+        cls._run_together(runs)
+        return runs
+
+    @classmethod
+    def from_partials(cls, partials: list) -> "TIDERun":
+        """
+        Merges PartialRuns of disjoint shards of the images into one run. The images are added in the same
+        order a run over all of them would use, so the AP and errors come out exactly the same.
+
+        The gt and preds of the merged run are empty (apart from the classes), since the shards only keep
+        the annotations their errors need (see PartialRun).
+        """
+        settings = partials[0].settings
+        for partial in partials:
+            if partial.settings != settings:
+                raise ValueError(
+                    "Can't merge shards evaluated with different settings: {} vs. {}".format(
+                        settings, partial.settings
+                    )
+                )
+
+        classes = {}
+        for partial in partials:
+            classes.update(partial.classes)
+
+        # Give the annotations of every shard their own range of ids
+        images = {}
+        gt_offset = pred_offset = 0
+        for partial in partials:
+            for image in partial.images:
+                if image in images:
+                    raise ValueError(
+                        "Image {} is in more than one shard.".format(image)
+                    )
+                images[image] = (partial, gt_offset, pred_offset)
+
+            gt_offset += partial.num_gt
+            pred_offset += partial.num_preds
+
+        return cls._from_images(settings, partials[0].names, classes, images)
+
+    @classmethod
+    def _from_images(
+        cls, settings: dict, names: tuple, classes: dict, images: dict
+    ) -> "TIDERun":
+        """
+        Builds a run out of the results of images in PartialRuns. images maps an image id to the
+        (partial, gt_offset, pred_offset) to unpack it with (see PartialRun._unpack).
+        """
+        gt = Data(names[0], max_dets=settings["max_dets"])
+        preds = Data(names[1], max_dets=settings["max_dets"])
+        gt.classes.update(classes)
+        preds.classes.update(classes)
+
+        run = cls(gt, preds, **settings, _run=False)
+
+        # The AP data of the images is concatenated all at once at the end, instead of an image at a time
+        states = []
+        for image in cls._image_order(images):
+            partial, gt_offset, pred_offset = images[image]
+            arrays, *results = partial._unpack(image, gt_offset, pred_offset)
+            states.append(arrays)
+            run._merge(ClassedAPDataObject(), *results)
+
+        run.ap_data = ClassedAPDataObject.from_arrays(
+            ClassedAPDataArrays.concatenate(states), run.pred_info
+        )
+        run.ap = run.ap_data.get_mAP()
+        return run
+
+    @classmethod
+    def from_previous(
+        cls, previous: "TIDERun", preds: Data, num_workers: int = 1
+    ) -> "TIDERun":
+        """
+        Evaluates new predictions against the gt of a run made with keep_images, with the same settings.
+        Only the images whose predictions changed are evaluated again. The results of the rest are taken
+        from the previous run, so this gives the same run as evaluating everything from scratch.
+        """
+        if not previous.keep_images:
+            raise ValueError("The previous run has to be made with keep_images set.")
+
+        run = cls(
+            previous.gt,
+            preds,
+            previous.pos_thresh,
+            previous.bg_thresh,
+            previous.mode,
+            previous.max_dets,
+            previous.run_errors,
+            numpy_box_iou=previous.numpy_box_iou,
+            num_workers=num_workers,
+            keep_images=True,
+            _run=False,
+        )
+
+        images = cls._image_order(set(run.gt.images).union(preds.images))
+        run._image_hashes = {image: run._image_hash(image) for image in images}
+        changed = [
+            image
+            for image in images
+            if previous._image_hashes.get(image) != run._image_hashes[image]
+        ]
+
+        run._image_results = {}
+        if num_workers > 1 and len(changed) > 1:
+            cls._eval_images_parallel([run], changed)
+        else:
+            cls._eval_images([run], changed)
+
+        # The predictions of the other images are the same (in the same order), but can have new ids
+        for image in images:
+            if image not in run._image_results:
+                pred_ids = dict(
+                    zip(
+                        previous.preds_arrays.anns(image).tolist(),
+                        run.preds_arrays.anns(image).tolist(),
+                    )
+                )
+                run._image_results[image] = run._remap_results(
+                    *previous._image_results[image], pred_ids
+                )
+
+        run._add_image_results()
+        run.ap = run.ap_data.get_mAP()
+        return run
 
     def _run(self):
         """And awaaay we go"""
+        self._run_together([self])
 
-        for image in set(self.gt.images).union(self.preds.images):
-            x = self.preds.get(image)
-            y = self.gt.get(image)
+    @staticmethod
+    def _run_together(runs: list):
+        """
+        Evaluates every image for all of the given runs, which have to share the same gt, preds, mode
+        and max_dets. The IoUs and class matches of an image only depend on those, so they're computed
+        once per image for all of the runs.
+        """
+        first = runs[0]
+        images = TIDERun._image_order(set(first.gt.images).union(first.preds.images))
+
+        for run in runs:
+            if run.keep_images:
+                run._image_results = {}
+                run._image_hashes = {image: run._image_hash(image) for image in images}
+
+        if first.num_workers > 1 and len(images) > 1:
+            TIDERun._eval_images_parallel(runs, images)
+        else:
+            TIDERun._eval_images(runs, images)
+
+        for run in runs:
+            if run.keep_images:
+                run._add_image_results()
+            run.ap = run.ap_data.get_mAP()
+
+    @staticmethod
+    def _image_order(images: set) -> list:
+        """
+        The order to evaluate images in. The results only depend on this order (e.g., for ties in score),
+        so it's fixed to make runs over the same images in different pieces come out the same.
+        """
+        try:
+            return sorted(images)
+        except TypeError:
+            # Image ids of different types can't be compared, so fall back to something that can
+            return sorted(images, key=lambda x: (type(x).__name__, repr(x)))
+
+    @staticmethod
+    def _eval_images(runs: list, images: list):
+        """Evaluates the given images for all of the runs (see _run_together)."""
+        first = runs[0]
+        if first._gt_images is None:
+            first._gt_images = _GTImages(first.gt, first.gt_arrays)
+        gt_images = first._gt_images
+
+        # The runs without errors only differ in their thresholds, so they're matched all at once
+        error_runs = [run for run in runs if run.run_errors]
+        thresh_runs = [run for run in runs if not run.run_errors]
+
+        for batch in first._image_batches(images):
+            for (image, pred_ids, gt_ids), matrices in zip(
+                batch, first._batch_matrices(batch)
+            ):
+                x = [first.preds._annotation(idx) for idx in pred_ids.tolist()]
+                y = gt_images.anns(image)
+                ignored_classes = gt_images.image_ignored_classes(image)
 
-            # These classes are ignored for the whole image and not in the ground truth, so
-            # we can safely just remove these detections from the predictions at the start.
-            # However, since ignored detections are still used for error calculations, we have to keep them.
-            if not self.run_errors:
-                ignored_classes = self.gt._get_ignored_classes(image)
-                x = [pred for pred in x if pred["class"] not in ignored_classes]
+                for run in error_runs:
+                    num_errors = len(run.errors)
+                    run._eval_image(x, y, *matrices, ignored_classes)
 
-            self._eval_image(x, y)
+                    # Store a fixed version of the errors for this image while the matches they
+                    # depend on are final
+                    run._store_fixed_errors(run.errors[num_errors:])
 
-        # Store a fixed version of all the errors for testing purposes
-        for error in self.errors:
+                    if run._image_results is not None:
+                        run._image_results[image] = run._take_results()
+
+                if len(thresh_runs) == 0:
+                    continue
+
+                # These classes are ignored for the whole image and not in the ground truth, so
+                # we can safely just remove these detections from the predictions at the start.
+                # However, since ignored detections are still used for error calculations, we have to keep them.
+                pred_cls = first.preds_arrays.cls[pred_ids]
+                keep = ~np.isin(pred_cls, gt_images.ignored_classes(image))
+                kept = [pred for pred, kept in zip(x, keep) if kept]
+
+                ex = None
+                if len(kept) > 0:
+                    ex = ThresholdExample(
+                        kept,
+                        y,
+                        [run.pos_thresh for run in thresh_runs],
+                        first.mode,
+                        first.max_dets,
+                        numpy_box_iou=first.numpy_box_iou,
+                        gt_iou=(
+                            matrices[0] if matrices[0] is None else matrices[0][keep]
+                        ),
+                        ignore_iou=(
+                            matrices[1] if matrices[1] is None else matrices[1][keep]
+                        ),
+                        gt_cls_matching=(
+                            matrices[2] if matrices[2] is None else matrices[2][keep]
+                        ),
+                        ignored_classes=ignored_classes,
+                    )
+
+                for thresh_idx, run in enumerate(thresh_runs):
+                    run._eval_image_matches(y, ex, thresh_idx)
+
+                    if run._image_results is not None:
+                        run._image_results[image] = run._take_results()
+
+    @staticmethod
+    def _eval_images_parallel(runs: list, images: list):
+        """
+        Splits the images into contiguous shards, evaluates those in a process pool, and merges the
+        results back into the runs in order, so everything ends up exactly as if we ran serially.
+        """
+        first = runs[0]
+
+        # Use a few shards per worker so that a slow shard doesn't hold everything up
+        num_shards = min(len(images), first.num_workers * 4)
+        shards = [
+            images[i * len(images) // num_shards : (i + 1) * len(images) // num_shards]
+            for i in range(num_shards)
+        ]
+        run_kwargs = [
+            {
+                "pos_thresh": run.pos_thresh,
+                "bg_thresh": run.bg_thresh,
+                "mode": run.mode,
+                "max_dets": run.max_dets,
+                "run_errors": run.run_errors,
+                "numpy_box_iou": run.numpy_box_iou,
+                "keep_images": run.keep_images,
+            }
+            for run in runs
+        ]
+
+        with ProcessPoolExecutor(
+            first.num_workers,
+            initializer=_init_worker,
+            initargs=(first.gt, first.preds, run_kwargs),
+        ) as pool:
+            for payload in pool.map(_eval_shard, shards):
+                shard_runs = _AnnotationUnpickler(
+                    io.BytesIO(payload), first.gt, first.preds
+                ).load()
+
+                for run, (*results, image_results) in zip(runs, shard_runs):
+                    run._merge(*results)
+                    if image_results is not None:
+                        run._image_results.update(image_results)
+
+    def _merge(
+        self,
+        ap_data: ClassedAPDataObject,
+        errors: list,
+        false_negatives: dict,
+        pred_info: dict,
+        best_preds: dict,
+    ):
+        """Adds the results of another run over different images to this one."""
+        for _cls, obj in ap_data.objs.items():
+            self.ap_data.extend(_cls, obj)
+
+        for error in errors:
+            self._add_error(error)
+
+        for _cls, truths in false_negatives.items():
+            self.false_negatives.setdefault(_cls, []).extend(truths)
+
+        self.pred_info.update(pred_info)
+        self._best_preds.update(best_preds)
+
+    def _add_image_results(self):
+        """Adds up the results kept for every image (see _image_results), in the order of the images."""
+        self._take_results()
+        self.false_negatives = {_id: [] for _id in self.gt.classes}
+
+        for image in self._image_order(self._image_results):
+            self._merge(*self._image_results[image])
+
+    def _image_hash(self, image) -> bytes:
+        """A hash of the classes, scores, boxes and (in mask mode) masks of the predictions of an image, in order."""
+        arrays = self.preds_arrays
+        ids = arrays.anns(image)
+
+        digest = hashlib.blake2b(digest_size=16)
+        for column in [arrays.cls[ids], arrays.score[ids], arrays.bbox[ids]]:
+            digest.update(np.ascontiguousarray(column).tobytes())
+        if self.mode == TIDE.MASK:
+            masks = [self.preds._annotation(idx)["mask"] for idx in ids.tolist()]
+            digest.update(pickle.dumps(masks, protocol=pickle.HIGHEST_PROTOCOL))
+
+        return digest.digest()
+
+    def _remap_results(
+        self,
+        ap_data: ClassedAPDataObject,
+        errors: list,
+        false_negatives: dict,
+        pred_info: dict,
+        best_preds: dict,
+        pred_ids: dict,
+    ) -> tuple:
+        """
+        Copies the results of an image in another run (in the form _merge takes) over to this one, where
+        its predictions are the same but have the ids in pred_ids. The gt has to be the same too.
+        """
+        new_ap_data = ClassedAPDataObject()
+        for _cls, obj in ap_data.objs.items():
+            new_obj = new_ap_data.objs[_cls]
+            new_obj.data_points = {
+                pred_ids[_id]: data_point for _id, data_point in obj.data_points.items()
+            }
+            new_obj.false_negatives = set(obj.false_negatives)
+            new_obj.num_gt_positives = obj.num_gt_positives
+
+        # The errors keep their fixed versions (which don't depend on the ids), but point to our predictions
+        new_errors = []
+        for error in errors:
+            new_error = object.__new__(type(error))
+            new_error.__dict__.update(error.__dict__)
+            if error.is_pred():
+                new_error.pred = self.preds._annotation(pred_ids[error.pred["_id"]])
+            if isinstance(error, DuplicateError):
+                new_error.suppressor = self.preds._annotation(
+                    pred_ids[error.suppressor["_id"]]
+                )
+            new_errors.append(new_error)
+
+        return (
+            new_ap_data,
+            new_errors,
+            {_cls: list(truths) for _cls, truths in false_negatives.items()},
+            {pred_ids[_id]: info for _id, info in pred_info.items()},
+            {_id: (score, pred_ids[best]) for _id, (score, best) in best_preds.items()},
+        )
+
+    def _take_results(self) -> tuple:
+        """Returns everything this run has added up so far, in the form _merge takes, and starts over."""
+        results = (
+            self.ap_data,
+            self.errors,
+            self.false_negatives,
+            self.pred_info,
+            self._best_preds,
+        )
+
+        self.errors = _RunErrors(self)
+        self.error_dict = {_type: [] for _type in TIDE._error_types}
+        self.ap_data = ClassedAPDataObject()
+        self.false_negatives = defaultdict(list)
+        self.pred_info = {}
+        self._best_preds = {}
+
+        return results
+
+    @staticmethod
+    def _store_fixed_errors(errors: list):
+        """Store a fixed version of the errors for testing purposes."""
+        for error in errors:
             error.original = f.nonepack(error.unfix())
             error.fixed = f.nonepack(error.fix())
             error.disabled = False
 
-        self.ap = self.ap_data.get_mAP()
+    def _image_batches(self, images: set):
+        """
+        Collects the prediction and gt ids of every image, and groups the images into batches
+        with about _iou_batch_size (prediction, gt) pairs each.
+        """
+        batch = []
+        num_pairs = 0
 
-        # Now that we've stored the fixed errors, we can clear the gt info
-        self._clear()
+        for image in images:
+            pred_ids = self._top_pred_ids(image)
+            gt_ids = self.gt_arrays.anns(image)
 
-    def _clear(self):
-        """Clears the ground truth so that it's ready for another run."""
-        for gt in self.gt.annotations:
-            for var in self._temp_vars:
-                if var in gt:
-                    del gt[var]
+            batch.append((image, pred_ids, gt_ids))
+            num_pairs += len(pred_ids) * len(gt_ids)
+
+            if num_pairs >= self._iou_batch_size:
+                yield batch
+                batch = []
+                num_pairs = 0
+
+        if batch:
+            yield batch
+
+    def _top_pred_ids(self, image) -> np.ndarray:
+        """
+        Returns the ids of the predictions of the image that can make it into the top max_dets of a
+        TIDEExample, in their original order. Dense detectors can output thousands per image, and
+        everything past that doesn't need IoUs or even annotation dicts.
+        """
+        pred_ids = self.preds_arrays.anns(image)
+        if self.max_dets is None or len(pred_ids) <= self.max_dets:
+            return pred_ids
+
+        # Runs without errors drop the predictions of classes ignored in the whole image before taking
+        # the top max_dets, so the ones after those can still make it
+        ignored_classes = self._gt_images.ignored_classes(image)
+        num_dropped = np.isin(self.preds_arrays.cls[pred_ids], ignored_classes).sum()
+
+        top = f.top_k(self.preds_arrays.score[pred_ids], self.max_dets + num_dropped)
+        return pred_ids[np.sort(top)]
+
+    def _batch_matrices(self, batch: list) -> list:
+        """
+        Computes everything about the images in the batch that TIDEExample needs and that doesn't
+        depend on the thresholds. Returns a (gt_iou, ignore_iou, gt_cls_matching) tuple for each image,
+        where the rows are the predictions of that image in order.
+        """
+        gt_ids, ignore_ids = zip(*[self._gt_images.ids(x[0]) for x in batch])
+
+        if self.mode == TIDE.BOX and self.numpy_box_iou:
+            ious = self._batched_box_iou(batch, gt_ids, ignore_ids)
+        elif self.mode == TIDE.MASK:
+            ious = self._batched_mask_iou(batch, gt_ids, ignore_ids)
+        else:
+            ious = [
+                self._image_iou(pred_ids, _gt_ids, _ignore_ids)
+                for (_, pred_ids, _), _gt_ids, _ignore_ids in zip(
+                    batch, gt_ids, ignore_ids
+                )
+            ]
+
+        # A[i,j] is true iff the prediction i is of the same class as gt j
+        return [
+            (
+                gt_iou,
+                ignore_iou,
+                self.preds_arrays.cls[pred_ids][:, None]
+                == self.gt_arrays.cls[_gt_ids][None, :],
+            )
+            for (_, pred_ids, _), _gt_ids, (gt_iou, ignore_iou) in zip(
+                batch, gt_ids, ious
+            )
+        ]
+
+    def _batched_box_iou(self, batch: list, gt_ids: list, ignore_ids: list) -> list:
+        """Computes the box IoUs for every image in the batch at once."""
+        pred_ids = [x[1] for x in batch]
+        pred_boxes = self.preds_arrays.bbox[np.concatenate(pred_ids)]
+        pred_counts = [len(x) for x in pred_ids]
+
+        gt_iou = f.grouped_box_iou(
+            pred_boxes,
+            self.gt_arrays.bbox[np.concatenate(gt_ids)],
+            pred_counts,
+            [len(x) for x in gt_ids],
+        )
+        # Ignore regions without a box just end up with an IoU of 0, but TIDEExample doesn't use those
+        ignore_iou = f.grouped_box_iou(
+            pred_boxes,
+            self.gt_arrays.bbox[np.concatenate(ignore_ids)],
+            pred_counts,
+            [len(x) for x in ignore_ids],
+            np.ones(sum(len(x) for x in ignore_ids), dtype=bool),
+        )
+
+        return list(zip(gt_iou, ignore_iou))
+
+    def _batched_mask_iou(self, batch: list, gt_ids: list, ignore_ids: list) -> list:
+        """
+        Computes the mask IoUs for every image in the batch. Masks can only overlap if their bounding
+        boxes do, so we first find those pairs for the whole batch at once and then only hand them to
+        pycocotools, leaving the rest at 0. This way masks that don't overlap anything are never even
+        converted to RLEs.
+        """
+
+        def mask_boxes(data: Data, ids: list) -> np.ndarray:
+            ids = np.concatenate(ids).tolist()
+            boxes = np.full((len(ids), 4), np.nan)
+            for row, idx in enumerate(ids):
+                box = data._mask_box(idx)
+                if box is not None:
+                    boxes[row] = box
+            return boxes
+
+        pred_ids = [x[1] for x in batch]
+        pred_boxes = mask_boxes(self.preds, pred_ids)
+        pred_counts = [len(x) for x in pred_ids]
+
+        # Ignore regions without a mask get a NaN box, and so never overlap anything
+        gt_overlaps = f.grouped_box_iou(
+            pred_boxes,
+            mask_boxes(self.gt, gt_ids),
+            pred_counts,
+            [len(x) for x in gt_ids],
+        )
+        ignore_overlaps = f.grouped_box_iou(
+            pred_boxes,
+            mask_boxes(self.gt, ignore_ids),
+            pred_counts,
+            [len(x) for x in ignore_ids],
+        )
+
+        return [
+            self._image_mask_iou(*args)
+            for args in zip(pred_ids, gt_ids, ignore_ids, gt_overlaps, ignore_overlaps)
+        ]
+
+    def _image_mask_iou(
+        self,
+        pred_ids: np.ndarray,
+        gt_ids: np.ndarray,
+        ignore_ids: np.ndarray,
+        gt_overlaps: np.ndarray,
+        ignore_overlaps: np.ndarray,
+    ) -> tuple:
+        """Computes the mask IoUs for a single image, only for the pairs whose boxes overlap."""
+        rles = {}  # Maps a prediction's row to its RLE
+
+        def iou(ids: np.ndarray, overlaps: np.ndarray, iscrowd: bool) -> np.ndarray:
+            overlaps = overlaps > 0
+            rows = np.flatnonzero(overlaps.any(axis=1)).tolist()
+            cols = np.flatnonzero(overlaps.any(axis=0)).tolist()
+
+            ious = np.zeros(overlaps.shape)
+            if len(rows) > 0:
+                for row in rows:
+                    if row not in rles:
+                        rles[row] = self.preds._rle(pred_ids[row])
+
+                ious[np.ix_(rows, cols)] = mask_utils.iou(
+                    [rles[row] for row in rows],
+                    [self._gt_images.rle(ids[col]) for col in cols],
+                    [iscrowd] * len(cols),
+                )
+            return ious
+
+        return iou(gt_ids, gt_overlaps, False), iou(ignore_ids, ignore_overlaps, True)
+
+    def _image_iou(
+        self, pred_ids: np.ndarray, gt_ids: np.ndarray, ignore_ids: np.ndarray
+    ) -> tuple:
+        """Computes the box IoUs for a single image with pycocotools."""
+        preds = [self.preds._annotation(idx)["bbox"] for idx in pred_ids.tolist()]
+        gt = [self.gt._annotation(idx)["bbox"] for idx in gt_ids.tolist()]
+        ignore = [self.gt._annotation(idx)["bbox"] for idx in ignore_ids.tolist()]
+
+        gt_iou = np.zeros((len(preds), len(gt)))
+        ignore_iou = np.zeros((len(preds), len(ignore)))
+
+        if len(preds) > 0 and len(gt) > 0:
+            gt_iou[:] = mask_utils.iou(preds, gt, [False] * len(gt))
+
+        # Ignore regions without a det_type annotation aren't used by TIDEExample
+        regions = [idx for idx, region in enumerate(ignore) if region is not None]
+        if len(preds) > 0 and len(regions) > 0:
+            ignore_iou[:, regions] = mask_utils.iou(
+                preds, [ignore[idx] for idx in regions], [True] * len(regions)
+            )
+
+        return gt_iou, ignore_iou
 
     def _add_error(self, error):
         self.errors.append(error)
         self.error_dict[type(error)].append(error)
 
-    def _eval_image(self, preds: list, gt: list):
+    # The kinds of errors _classify_errors can find, in the order they're tested for
+    _BOX, _CLS, _DUPE, _BKG, _CLS_BOX = range(5)
+
+    def _classify_errors(self, ex: TIDEExample) -> tuple:
+        """
+        Works out which error every prediction in the example would be if it's a negative, all at once.
+        Returns arrays with the error type (see above), the index of the gt in ex.gt that caused it and
+        the IoU with that gt for each prediction. Only used when the example has some gt.
+        """
+        rows = np.arange(len(ex.preds))
+
+        # The gt each prediction overlaps with the most for each of the tests below
+        best_gt = [
+            iou.argmax(axis=1)
+            for iou in [ex.gt_cls_iou, ex.gt_noncls_iou, ex.gt_used_cls, ex.gt_iou]
+        ]
+        box_iou, cls_iou, dupe_iou, bkg_iou = best_iou = [
+            iou[rows, idx]
+            for iou, idx in zip(
+                [ex.gt_cls_iou, ex.gt_noncls_iou, ex.gt_used_cls, ex.gt_iou], best_gt
+            )
+        ]
+
+        # Go through the tests backwards so that the first one that passes wins. Otherwise, it's
+        # both the wrong class and localized badly (with the gt it overlaps with the most).
+        error_types = np.full(len(rows), self._CLS_BOX)
+        # Background: it doesn't overlap with any gt
+        error_types[bkg_iou <= self.bg_thresh] = self._BKG
+        # Duplicate: it would have been positive but the gt was already used
+        error_types[dupe_iou >= self.pos_thresh] = self._DUPE
+        # Class: it would have been positive if it was the class of the gt it overlaps with
+        error_types[cls_iou >= self.pos_thresh] = self._CLS
+        # Box: it would have been positive with a higher IoU with the gt of its class
+        error_types[(self.bg_thresh <= box_iou) & (box_iou <= self.pos_thresh)] = (
+            self._BOX
+        )
+
+        # Background and class + box errors both use the gt from the last test
+        test = np.minimum(error_types, self._BKG)
+        error_gt = np.choose(test, best_gt)
+        error_iou = np.choose(test, best_iou)
+
+        return error_types.tolist(), error_gt.tolist(), error_iou
+
+    def _eval_image(
+        self,
+        preds: list,
+        gt: list,
+        gt_iou: np.ndarray = None,
+        ignore_iou: np.ndarray = None,
+        gt_cls_matching: np.ndarray = None,
+        ignored_classes: np.ndarray = None,
+    ):
 
         for truth in gt:
             if not truth["ignore"]:
@@ -234,90 +1049,139 @@ class TIDERun:
             return
 
         ex = TIDEExample(
-            preds, gt, self.pos_thresh, self.mode, self.max_dets, self.run_errors
+            preds,
+            gt,
+            self.pos_thresh,
+            self.mode,
+            self.max_dets,
+            self.run_errors,
+            numpy_box_iou=self.numpy_box_iou,
+            gt_iou=gt_iou,
+            ignore_iou=ignore_iou,
+            gt_cls_matching=gt_cls_matching,
+            ignored_classes=ignored_classes,
         )
         preds = ex.preds  # In case the number of predictions was restricted to the max
+        pred_used = ex.pred_used
+        error_types = None
 
         for pred_idx, pred in enumerate(preds):
+            used = pred_used[pred_idx]
 
-            pred["info"] = {"iou": pred["iou"], "used": pred["used"]}
-            if pred["used"]:
-                pred["info"]["matched_with"] = pred["matched_with"]
+            info = {"iou": ex.pred_iou[pred_idx], "used": used}
+            if used:
+                info["matched_with"] = ex.gt[ex.pred_match[pred_idx]]["_id"]
+            self.pred_info[pred["_id"]] = info
 
-            if pred["used"] is not None:
+            if used is not None:
                 self.ap_data.push(
                     pred["class"],
                     pred["_id"],
                     pred["score"],
-                    pred["used"],
-                    pred["info"],
+                    used,
+                    info,
                 )
 
             # ----- ERROR DETECTION ------ #
             # This prediction is a negative (or ignored), let's find out why
-            if self.run_errors and (pred["used"] == False or pred["used"] == None):
+            if self.run_errors and not used:
                 # Test for BackgroundError
                 if (
                     len(ex.gt) == 0
                 ):  # Note this is ex.gt because it doesn't include ignore annotations
                     # There is no ground truth for this image, so just mark everything as BackgroundError
-                    self._add_error(BackgroundError(pred))
+                    self._add_error(BackgroundError(pred, info))
                     continue
 
-                # Test for BoxError
-                idx = ex.gt_cls_iou[pred_idx, :].argmax()
-                if self.bg_thresh <= ex.gt_cls_iou[pred_idx, idx] <= self.pos_thresh:
-                    # This detection would have been positive if it had higher IoU with this GT
-                    self._add_error(BoxError(pred, ex.gt[idx]))
-                    pred["info"]["iou"] = ex.gt_cls_iou[pred_idx, idx]
-                    continue
+                if error_types is None:
+                    error_types, error_gt, error_iou = self._classify_errors(ex)
 
-                # Test for ClassError
-                idx = ex.gt_noncls_iou[pred_idx, :].argmax()
-                iou = ex.gt_noncls_iou[pred_idx, idx]
-                if iou >= self.pos_thresh:
-                    # This detection would have been a positive if it was the correct class
-                    self._add_error(ClassError(pred, ex.gt[idx]))
-                    pred["info"]["iou"] = iou
-                    continue
+                error_type = error_types[pred_idx]
+                gt_idx = error_gt[pred_idx]
+                truth = ex.gt[gt_idx]
+                iou = error_iou[pred_idx]
 
-                # Test for DuplicateError
-                idx = ex.gt_used_cls[pred_idx, :].argmax()
-                iou = ex.gt_used_cls[pred_idx, idx]
-                if iou >= self.pos_thresh:
+                if error_type == self._BOX:
+                    # This detection would have been positive if it had higher IoU with this GT
+                    match = self._best_gt_match(ex, pred_idx, gt_idx, info)
+                    self._add_error(BoxError(pred, truth, info, match))
+                elif error_type == self._CLS:
+                    # This detection would have been a positive if it was the correct class
+                    match = self._best_gt_match(ex, pred_idx, gt_idx, info)
+                    self._add_error(ClassError(pred, truth, info, match))
+                elif error_type == self._DUPE:
                     # The detection would have been marked positive but the GT was already in use
-                    suppressor = self.preds.annotations[ex.gt[idx]["matched_with"]]
-                    self._add_error(DuplicateError(pred, ex.gt[idx], suppressor))
-                    pred["info"]["iou"] = iou
-                    continue
-
-                # Test for BackgroundError
-                idx = ex.gt_iou[pred_idx, :].argmax()
-                iou = ex.gt_iou[pred_idx, idx]
-                if iou <= self.bg_thresh:
+                    suppressor = ex.preds[ex.gt_match[gt_idx]]
+                    self._add_error(DuplicateError(pred, truth, suppressor, info))
+                elif error_type == self._BKG:
                     # This should have been marked as background
-                    self._add_error(BackgroundError(pred))
+                    self._add_error(BackgroundError(pred, info))
                     continue
+                else:
+                    # A base case to catch uncaught errors
+                    self._add_error(ClassBoxError(pred, truth, info))
+                info["iou"] = iou
 
-                # A base case to catch uncaught errors
-                # self._add_error(OtherError(pred))
-                # idx is already representing the gt box with highest overlap
-                self._add_error(ClassBoxError(pred, ex.gt[idx]))
-                pred["info"]["iou"] = iou
-
-        for truth in gt:
+        for gt_idx, truth in enumerate(ex.gt):
             # If the GT wasn't used in matching, meaning it's some kind of false negative
-            if not truth["ignore"] and not truth["used"]:
+            if ex.gt_match[gt_idx] < 0:
                 self.ap_data.push_false_negative(truth["class"], truth["_id"])
 
                 if self.run_errors:
                     self.false_negatives[truth["class"]].append(truth)
 
                     # The GT was completely missed, no error can correct it
-                    # Note: 'usable' is set in error.py
-                    if not truth["usable"]:
+                    if truth["_id"] not in self._best_preds:
                         self._add_error(MissedError(truth))
 
+    def _eval_image_matches(self, gt: list, ex: ThresholdExample, thresh_idx: int):
+        """
+        Evaluates an image for a run without errors, like _eval_image does, using the matches at one of
+        the thresholds of a ThresholdExample (None if the image has no predictions).
+        """
+        for truth in gt:
+            if not truth["ignore"]:
+                self.ap_data.add_gt_positives(truth["class"], 1)
+
+        if ex is None:
+            # There are no predictions for this image so add all gt as missed
+            for truth in gt:
+                if not truth["ignore"]:
+                    self.ap_data.push_false_negative(truth["class"], truth["_id"])
+            return
+
+        pred_match = ex.pred_match[thresh_idx].tolist()
+        ignored = ex.ignored[thresh_idx].tolist()
+        # The data points of each class, pushed all at once (in order, so the result is the same)
+        points = defaultdict(dict)
+
+        for pred_idx, pred in enumerate(ex.preds):
+            match = pred_match[pred_idx]
+            used = None if ignored[pred_idx] else match >= 0
+
+            info = {"iou": ex.pred_iou[pred_idx], "used": used}
+            if used:
+                info["matched_with"] = ex.gt[match]["_id"]
+            self.pred_info[pred["_id"]] = info
+
+            if used is not None:
+                points[pred["class"]][pred["_id"]] = (pred["score"], used, info)
+
+        for _cls, class_points in points.items():
+            self.ap_data.push_many(_cls, class_points)
+
+        for gt_idx in np.flatnonzero(ex.gt_match[thresh_idx] < 0).tolist():
+            truth = ex.gt[gt_idx]
+            self.ap_data.push_false_negative(truth["class"], truth["_id"])
+
+    def _best_gt_match(
+        self, ex: TIDEExample, pred_idx: int, gt_idx: int, info: dict
+    ) -> BestGTMatch:
+        """Returns the BestGTMatch for fixing a prediction with a gt, or None if the gt was already used."""
+        if ex.gt_match[gt_idx] >= 0:
+            return None
+        return BestGTMatch(ex.preds[pred_idx], ex.gt[gt_idx], info, self._best_preds)
+
     def fix_errors(
         self,
         condition=lambda x: False,
@@ -413,24 +1277,19 @@ class TIDERun:
             error_types = TIDE._error_types
 
         errors = {}
+        fixer = _ErrorFixer(self, ap_data, pred_dict, gt_dict)
 
         for error in error_types:
-            _ap_data = self.fix_errors(
-                qual._make_error_func(error),
-                ap_data=ap_data,
-                disable_errors=progressive,
-                pred_dict=pred_dict,
-                gt_dict=gt_dict,
-            )
+            fixed = fixer.fix(fixer.select(error, qual._make_error_func(error)))
 
-            new_ap = _ap_data.get_mAP()
+            new_ap = fixed.get_mAP()
             # If an error is negative that means it's likely due to binning differences, so just
             # Ignore the negative by setting it to 0.
             errors[error] = max(new_ap - last_ap, 0)
 
             if progressive:
                 last_ap = new_ap
-                ap_data = _ap_data
+                fixer.commit(fixed)
 
         if progressive:
             for error in self.errors:
@@ -484,6 +1343,687 @@ class TIDERun:
         return new_ap_data
 
 
+class _GTImages:
+    """
+    Does the work on the gt of an image that doesn't depend on the predictions (when it's first needed),
+    and keeps the results so that any number of runs on the same gt can use them.
+
+    If keep_rles is set, the RLEs of the gt masks are kept here too, so that they're only converted
+    once for all of the runs. Otherwise they're left to the bounded cache of Data._rle.
+    """
+
+    def __init__(self, gt: Data, arrays: DataArrays = None, keep_rles: bool = False):
+        self.gt = gt
+        self.arrays = gt.as_arrays() if arrays is None else arrays
+
+        self._rles = {} if keep_rles else None
+        self._ids = {}
+        self._image_ignored_classes = {}
+        self._ignored_classes = {}
+
+    def ids(self, image) -> tuple:
+        """The ids of the gt and of the ignore regions of the image."""
+        ids = self._ids.get(image)
+        if ids is None:
+            anns = self.arrays.anns(image)
+            ignore = self.arrays.ignore[anns]
+            ids = self._ids[image] = (anns[~ignore], anns[ignore])
+        return ids
+
+    def rle(self, idx: int) -> dict:
+        """The mask of the gt with that id as an RLE (see Data._rle)."""
+        if self._rles is None:
+            return self.gt._rle(idx)
+
+        rle = self._rles.get(idx)
+        if rle is None:
+            rle = self._rles[idx] = self.gt._rle(idx)
+        return rle
+
+    def drop_rles(self):
+        """Stops keeping the RLEs of the gt masks, once all of the runs sharing this are done."""
+        self._rles = None
+
+    def anns(self, image) -> list:
+        """
+        The annotation dicts of the image (in the order of Data.get). These aren't kept, since evaluation
+        only holds on to the ones that end up in errors.
+        """
+        return [self.gt._annotation(idx) for idx in self.arrays.anns(image).tolist()]
+
+    def image_ignored_classes(self, image) -> np.ndarray:
+        """The classes ignored in the image with Data.add_ignored_classes."""
+        classes = self._image_ignored_classes.get(image)
+        if classes is None:
+            classes = self._image_ignored_classes[image] = (
+                self.gt._image_ignored_classes(image)
+            )
+        return classes
+
+    def ignored_classes(self, image) -> list:
+        """All of the classes ignored in the whole image (see Data._get_ignored_classes)."""
+        classes = self._ignored_classes.get(image)
+        if classes is None:
+            classes = self._ignored_classes[image] = list(
+                self.gt._get_ignored_classes(image)
+            )
+        return classes
+
+
+class _FixedAPData:
+    """The per-class data points and gt positive counts _ErrorFixer.fix computed for a set of errors."""
+
+    def __init__(
+        self, fixer, sections: dict, gt_pos: dict, aps: dict, is_fixed: np.ndarray
+    ):
+        self.fixer = fixer
+        self.sections = sections  # Only the classes the fix changed
+        self.gt_pos = gt_pos
+        self.aps = aps  # Only the classes the fix changed, None for empty classes
+        self.is_fixed = is_fixed  # Indexed by error
+
+    def get_mAP(self) -> float:
+        aps = []
+        for _cls in self.fixer._class_order(self.sections, self.gt_pos):
+            ap = self.aps[_cls] if _cls in self.aps else self.fixer._ap(_cls)
+            if ap is not None:
+                aps.append(ap)
+
+        # If there are no objects (no golds, no preds), then it's a perfect run
+        if not aps:
+            return 100.0
+        return sum(aps) / len(aps)
+
+
+class _ErrorFixer:
+    """
+    Computes fix_errors(condition, ap_data=ap_data, ...).get_mAP() for many conditions, without
+    building a new ClassedAPDataObject and recomputing every AP each time.
+
+    The data points fix_errors makes for a class are the (unfixed or fixed) data points of the errors
+    of that class, in the order of run.errors, followed by the correct data points of ap_data. We keep
+    both as an APDataArrays per class (the "sections" use the error indices as their ids) and fixing
+    errors only rebuilds the classes those errors move a data point out of or into, or change the number
+    of gt positives for. The points stay in the same order, so the APs match fix_errors exactly.
+    """
+
+    _empty_section = APDataArrays()
+
+    def __init__(
+        self,
+        run: TIDERun,
+        ap_data: ClassedAPDataObject,
+        pred_dict: dict = None,
+        gt_dict: dict = None,
+    ):
+        if gt_dict:
+            gt_ids = set.union(*gt_dict.values())
+
+        # The errors fix_errors would look at, and which of those haven't been fixed by commit
+        self.errors = []
+        for error in run.errors:
+            _cls, data_point = error.original
+            if error.disabled or (
+                pred_dict
+                and gt_dict
+                and not error.is_contained_in(pred_dict.get(_cls, {}), gt_ids)
+            ):
+                continue
+            self.errors.append(error)
+        self.active = np.ones(len(self.errors), dtype=bool)
+
+        self.error_types = defaultdict(list)
+        for idx, error in enumerate(self.errors):
+            self.error_types[type(error)].append(idx)
+
+        points = defaultdict(list)
+        for idx, error in enumerate(self.errors):
+            _cls, data_point = error.original
+            if data_point is not None:
+                points[_cls].append((idx, data_point[0], data_point[1]))
+        self.sections = {_cls: self._make_section(x) for _cls, x in points.items()}
+
+        arrays = ap_data.as_arrays()
+        self.gt_pos = arrays.get_gt_positives()
+        self.correct = {
+            _cls: obj._restrict(obj.is_true, None, 0)
+            for _cls, obj in arrays.objs.items()
+        }
+
+        self.aps = {}
+
+    @staticmethod
+    def _make_section(points: list) -> APDataArrays:
+        points.sort(key=lambda x: x[0])
+        return APDataArrays(
+            ids=np.array([x[0] for x in points], dtype=np.int64),
+            scores=np.array([x[1] for x in points], dtype=np.float64),
+            is_true=np.array([bool(x[2]) for x in points], dtype=bool),
+        )
+
+    def select(self, error_type: type, condition) -> list:
+        """The indices of the errors of error_type that haven't been fixed yet and condition is true for."""
+        return sorted(
+            idx
+            for _type, idxs in self.error_types.items()
+            if issubclass(_type, error_type)
+            for idx in idxs
+            if self.active[idx] and condition(self.errors[idx])
+        )
+
+    def fix(self, selected: list) -> _FixedAPData:
+        """Fixes the errors with the given indices, leaving this object as is."""
+        gt_pos = dict(self.gt_pos)
+        is_fixed = np.zeros(len(self.errors), dtype=bool)
+        is_fixed[selected] = True
+        changed = set()
+        added = defaultdict(list)
+
+        for idx in selected:
+            error = self.errors[idx]
+
+            _cls, data_point = error.original
+            if data_point is not None:
+                changed.add(_cls)
+
+            _cls, data_point = error.fixed
+            # Specific for MissingError (or anything else that affects #GT)
+            if isinstance(data_point, int):
+                gt_pos[_cls] += data_point
+                changed.add(_cls)
+            elif data_point is not None:
+                added[_cls].append((idx, data_point[0], data_point[1]))
+
+        changed.update(added)
+
+        sections = {}
+        aps = {}
+        for _cls in changed:
+            section = self.sections.get(_cls, self._empty_section)
+            merged = APDataArrays.concatenate(
+                [
+                    section._restrict(~is_fixed[section.ids], None, 0),
+                    self._make_section(added[_cls]),
+                ]
+            )
+            sections[_cls] = merged._restrict(
+                np.argsort(merged.ids, kind="stable"), None, 0
+            )
+            aps[_cls] = self._compute_ap(_cls, sections[_cls], gt_pos.get(_cls, 0))
+
+        return _FixedAPData(self, sections, gt_pos, aps, is_fixed)
+
+    def commit(self, fixed: _FixedAPData):
+        """
+        Makes the result of fix the new starting point, the way progressive fix_main_errors passes the
+        result of fix_errors into the next call (with the fixed errors disabled).
+        """
+        order = self._class_order(fixed.sections, fixed.gt_pos)
+
+        self.active &= ~fixed.is_fixed
+
+        for _cls, section in fixed.sections.items():
+            # The data points of the fixed errors are correct data points from now on
+            is_fixed = fixed.is_fixed[section.ids]
+            self.sections[_cls] = section._restrict(~is_fixed, None, 0)
+            self.correct[_cls] = APDataArrays.concatenate(
+                [section._restrict(is_fixed, None, 0), self._correct(_cls)]
+            )
+            self.aps.pop(_cls, None)
+
+        self.gt_pos = {_cls: fixed.gt_pos.get(_cls, 0) for _cls in order}
+
+    def _class_order(self, sections: dict, gt_pos: dict) -> list:
+        """The order fix_errors would add the classes to its ClassedAPDataObject in."""
+        first = {}
+        for _cls, section in self.sections.items():
+            if _cls not in sections and len(section) > 0:
+                first[_cls] = section.ids[0]
+        for _cls, section in sections.items():
+            if len(section) > 0:
+                first[_cls] = section.ids[0]
+
+        # First come the classes of the errors, then the classes with correct data points,
+        # then the rest of the classes
+        rest = [_cls for _cls in gt_pos if _cls not in first]
+        return (
+            sorted(first, key=first.get)
+            + [_cls for _cls in rest if len(self._correct(_cls)) > 0]
+            + [_cls for _cls in rest if len(self._correct(_cls)) == 0]
+        )
+
+    def _correct(self, _cls) -> APDataArrays:
+        return self.correct.get(_cls, self._empty_section)
+
+    def _ap(self, _cls) -> float:
+        """The AP of a class before any fixes (or None if that class is empty)."""
+        if _cls not in self.aps:
+            self.aps[_cls] = self._compute_ap(
+                _cls,
+                self.sections.get(_cls, self._empty_section),
+                self.gt_pos.get(_cls, 0),
+            )
+        return self.aps[_cls]
+
+    def _compute_ap(self, _cls, section: APDataArrays, num_gt_positives: int) -> float:
+        points = APDataArrays.concatenate([section, self._correct(_cls)])
+        if len(points) == 0 and num_gt_positives == 0:
+            return None
+
+        return APDataArrays(
+            points.ids, points.scores, points.is_true, num_gt_positives=num_gt_positives
+        ).get_ap()
+
+
+class PartialRun:
+    """
+    The results of evaluating one shard of the images (see TIDE.evaluate_shard), kept apart by image.
+    Any number of these for disjoint shards can be merged into a TIDERun with TIDE.merge_shards, which
+    gives the same AP and errors as evaluating all of the images at once.
+
+    Only what's needed to rebuild the AP data and errors is kept, and annotations are stored without
+    their masks, so this is a lot smaller than the data it came from. Use save and load to send it around.
+    """
+
+    def __init__(
+        self,
+        settings: dict,
+        names: tuple,
+        classes: dict,
+        num_gt: int,
+        num_preds: int,
+        images: dict,
+    ):
+        # The pos_thresh, bg_thresh, mode and max_dets of the run
+        self.settings = settings
+        # The names of the gt and preds
+        self.names = names
+        self.classes = classes
+        # The number of gt and predictions in the shard, to make their ids unique when merging
+        self.num_gt = num_gt
+        self.num_preds = num_preds
+        # Maps an image id to the results of that image (see _pack)
+        self.images = images
+
+    @classmethod
+    def from_run(cls, run: TIDERun) -> "PartialRun":
+        """Makes a PartialRun out of a run that kept the results of every image apart (see TIDERun._image_results)."""
+        return cls(
+            {
+                "pos_thresh": run.pos_thresh,
+                "bg_thresh": run.bg_thresh,
+                "mode": run.mode,
+                "max_dets": run.max_dets,
+            },
+            (run.gt.name, run.preds.name),
+            dict(run.gt.classes),
+            len(run.gt.annotations),
+            len(run.preds.annotations),
+            {
+                image: cls._pack(*results)
+                for image, results in run._image_results.items()
+            },
+        )
+
+    def save(self, path: str):
+        with open(path, "wb") as out_file:
+            pickle.dump(self, out_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str) -> "PartialRun":
+        with open(path, "rb") as in_file:
+            return pickle.load(in_file)
+
+    @staticmethod
+    def _pack(
+        ap_data: ClassedAPDataObject,
+        errors: list,
+        false_negatives: dict,
+        pred_info: dict,
+        best_preds: dict,
+    ) -> tuple:
+        """
+        Packs the results of an image (in the form TIDERun._merge takes) into plain tuples and lists, with
+        the AP data as a ClassedAPDataArrays.
+        """
+        preds = {}
+        gt = {}
+
+        def pack_ann(anns: dict, ann: dict) -> int:
+            anns[ann["_id"]] = (
+                ann.get("score"),
+                ann["class"],
+                ann["bbox"],
+                ann.get("ignore", False),
+            )
+            return ann["_id"]
+
+        packed_errors = []
+        for error in errors:
+            packed_errors.append(
+                (
+                    TIDE._error_types.index(type(error)),
+                    pack_ann(preds, error.pred) if error.is_pred() else None,
+                    pack_ann(gt, error.gt) if error.is_gt() else None,
+                    (
+                        pack_ann(preds, error.suppressor)
+                        if isinstance(error, DuplicateError)
+                        else None
+                    ),
+                    getattr(error, "match", None) is not None,
+                )
+            )
+
+        return (
+            ap_data.as_arrays(),
+            packed_errors,
+            [
+                pack_ann(gt, truth)
+                for truths in false_negatives.values()
+                for truth in truths
+            ],
+            [
+                (_id, float(info["iou"]), info["used"], info.get("matched_with"))
+                for _id, info in pred_info.items()
+            ],
+            [(_id, score, pred_id) for _id, (score, pred_id) in best_preds.items()],
+            preds,
+            gt,
+        )
+
+    def _unpack(self, image, gt_offset: int, pred_offset: int) -> tuple:
+        """
+        Unpacks the results of an image into the form TIDERun._merge takes (but with the AP data as a
+        ClassedAPDataArrays), adding the offsets to the gt and prediction ids. The errors come with their
+        fixed versions (see TIDERun._store_fixed_errors).
+        """
+        ap_data, errors, false_negatives, pred_info, best_preds, preds, gt = (
+            self.images[image]
+        )
+
+        def unpack_ann(_id: int, packed: tuple) -> dict:
+            score, _cls, bbox, ignore = packed
+            return {
+                "_id": _id,
+                "score": score,
+                "image": image,
+                "class": _cls,
+                "bbox": bbox,
+                "mask": None,
+                "ignore": ignore,
+            }
+
+        preds = {_id: unpack_ann(_id + pred_offset, x) for _id, x in preds.items()}
+        gt = {_id: unpack_ann(_id + gt_offset, x) for _id, x in gt.items()}
+
+        infos = {}
+        for _id, iou, used, matched_with in pred_info:
+            info = {"iou": np.float64(iou), "used": used}
+            if matched_with is not None:
+                info["matched_with"] = matched_with + gt_offset
+            infos[_id] = info
+
+        best = {
+            _id + gt_offset: (score, pred_id + pred_offset)
+            for _id, score, pred_id in best_preds
+        }
+
+        unpacked_errors = []
+        for type_idx, pred_id, gt_id, suppressor_id, has_match in errors:
+            _type = TIDE._error_types[type_idx]
+            pred = preds.get(pred_id)
+            truth = gt.get(gt_id)
+            info = infos.get(pred_id)
+
+            if _type is MissedError:
+                error = MissedError(truth)
+            elif _type is BackgroundError:
+                error = BackgroundError(pred, info)
+            elif _type is DuplicateError:
+                error = DuplicateError(pred, truth, preds[suppressor_id], info)
+            elif _type is ClassBoxError:
+                error = ClassBoxError(pred, truth, info)
+            else:
+                # The best predictions are already in best, so this doesn't change it
+                match = BestGTMatch(pred, truth, info, best) if has_match else None
+                error = _type(pred, truth, info, match)
+
+            unpacked_errors.append(error)
+
+        fn_dict = defaultdict(list)
+        for _id in false_negatives:
+            fn_dict[gt[_id]["class"]].append(gt[_id])
+
+        TIDERun._store_fixed_errors(unpacked_errors)
+
+        return (
+            ap_data.shift_ids(pred_offset, gt_offset),
+            unpacked_errors,
+            fn_dict,
+            {_id + pred_offset: info for _id, info in infos.items()},
+            best,
+        )
+
+
+class IncrementalRun:
+    """
+    Evaluates predictions against gt one image at a time, as soon as they come in (e.g., from the
+    validation loop of a training run), so that the predictions don't all have to be kept around until
+    the end. Create one with TIDE.evaluate_incremental.
+
+    Only what every image added to the run is kept (like in a PartialRun), and compute gives the same
+    AP and errors as evaluating all of the images updated so far with TIDE.evaluate.
+    """
+
+    def __init__(
+        self,
+        gt: Data,
+        pos_thresh: float,
+        bg_thresh: float,
+        mode: str,
+        max_dets: int,
+        numpy_box_iou: bool = True,
+        name: str = "preds",
+    ):
+        self.gt = gt
+        self.name = name
+
+        # What every image is evaluated with, in a run of its own
+        self._run_kwargs = {
+            "pos_thresh": pos_thresh,
+            "bg_thresh": bg_thresh,
+            "mode": mode,
+            "max_dets": max_dets,
+            "numpy_box_iou": numpy_box_iou,
+        }
+        self._gt_images = _GTImages(gt)
+
+        self._partial = PartialRun(
+            {
+                "pos_thresh": pos_thresh,
+                "bg_thresh": bg_thresh,
+                "mode": mode,
+                "max_dets": max_dets,
+            },
+            (gt.name, name),
+            gt.classes,
+            len(gt.annotations),
+            0,
+            {},
+        )
+        # The predictions of every image get their own range of ids, starting here
+        self._pred_offsets = {}
+        self._num_preds = 0
+
+        self._merged = None  # The result of get_run, until the next update
+
+    def update(self, image_id, preds: list):
+        """
+        Evaluates the predictions for an image, given as dicts with a class, score, and bbox and / or
+        mask (like the arguments of Data.add_detection). Images without predictions still have to be
+        updated (with an empty list) for their gt to count.
+        """
+        if image_id in self._pred_offsets:
+            raise ValueError("Image {} was already updated.".format(image_id))
+
+        data = Data(self.name, max_dets=self._run_kwargs["max_dets"])
+        if image_id in self.gt.images:
+            image = self.gt.images[image_id]
+            data.add_image(image_id, image["name"], image["width"], image["height"])
+        for pred in preds:
+            data.add_detection(
+                image_id,
+                pred["class"],
+                pred["score"],
+                pred.get("bbox"),
+                pred.get("mask"),
+            )
+
+        run = TIDERun(
+            self.gt, data, _run=False, _gt_images=self._gt_images, **self._run_kwargs
+        )
+        TIDERun._eval_images([run], [image_id])
+
+        self._partial.images[image_id] = PartialRun._pack(*run._take_results())
+        self._pred_offsets[image_id] = self._num_preds
+        self._num_preds += len(preds)
+        self._merged = None
+
+    def get_run(self) -> TIDERun:
+        """Returns a TIDERun with the results of all of the images updated so far."""
+        if self._merged is None:
+            self._merged = TIDERun._from_images(
+                self._partial.settings,
+                self._partial.names,
+                self._partial.classes,
+                {
+                    image: (self._partial, 0, offset)
+                    for image, offset in self._pred_offsets.items()
+                },
+            )
+        return self._merged
+
+    def compute(self) -> dict:
+        """
+        Computes the mAP and errors of the images updated so far. Returns {
+                'ap'     : float,
+                'main'   : { error_name: float },
+                'special': { error_name: float },
+        }
+        """
+        run = self.get_run()
+        return {
+            "ap": run.ap,
+            "main": {
+                error.short_name: value
+                for error, value in run.fix_main_errors().items()
+            },
+            "special": {
+                error.short_name: value
+                for error, value in run.fix_special_errors().items()
+            },
+        }
+
+
+class _AnnotationPickler(pickle.Pickler):
+    """Pickles the annotation dicts of gt and preds as references (by id) instead of as copies."""
+
+    def __init__(self, file, gt: Data, preds: Data):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.gt = gt
+        self.preds = preds
+
+    def reducer_override(self, obj):
+        # IoUs are NumPy floats, which are a lot faster to unpickle from a Python float
+        if type(obj) is np.float64:
+            return np.float64, (float(obj),)
+        return NotImplemented
+
+    def persistent_id(self, obj):
+        if isinstance(obj, dict) and "_id" in obj:
+            if self.preds._owns(obj):
+                return "preds", obj["_id"]
+            if self.gt._owns(obj):
+                return "gt", obj["_id"]
+        return None
+
+
+class _AnnotationUnpickler(pickle.Unpickler):
+    """Unpickles what _AnnotationPickler pickled, resolving annotation references with gt and preds."""
+
+    def __init__(self, file, gt: Data, preds: Data):
+        super().__init__(file)
+        self.gt = gt
+        self.preds = preds
+
+    def persistent_load(self, pid):
+        kind, idx = pid
+        return (self.preds if kind == "preds" else self.gt)._annotation(idx)
+
+
+# The gt, preds and run settings of every TIDERun evaluated in a worker process (see _init_worker)
+_worker_state = None
+
+
+def _init_worker(gt: Data, preds: Data, run_kwargs: list):
+    global _worker_state
+    _worker_state = (gt, preds, run_kwargs)
+
+
+def _eval_shard(images: list) -> bytes:
+    """Evaluates a shard of images in a worker process and returns the pickled results."""
+    gt, preds, run_kwargs = _worker_state
+    runs = []
+    for kwargs in run_kwargs:
+        arrays = (runs[0].gt_arrays, runs[0].preds_arrays) if runs else None
+        runs.append(TIDERun(gt, preds, _run=False, _arrays=arrays, **kwargs))
+
+    for run in runs:
+        if run.keep_images:
+            run._image_results = {}
+    TIDERun._eval_images(runs, images)
+
+    buffer = io.BytesIO()
+    _AnnotationPickler(buffer, gt, preds).dump(
+        [
+            (
+                run.ap_data,
+                run.errors,
+                run.false_negatives,
+                run.pred_info,
+                run._best_preds,
+                run._image_results,
+            )
+            for run in runs
+        ]
+    )
+
+    return buffer.getvalue()
+
+
+# The gt, its _GTImages and the run settings shared by every prediction set evaluated in a worker
+# process (see _init_preds_worker)
+_preds_worker_state = None
+
+
+def _init_preds_worker(gt: Data, run_kwargs: dict):
+    global _preds_worker_state
+    _preds_worker_state = (gt, _GTImages(gt, keep_rles=True), run_kwargs)
+
+
+def _eval_preds(preds: Data) -> bytes:
+    """Evaluates a prediction set in a worker process and returns the pickled results."""
+    gt, gt_images, run_kwargs = _preds_worker_state
+    run = TIDERun(gt, preds, _gt_images=gt_images, **run_kwargs)
+
+    buffer = io.BytesIO()
+    _AnnotationPickler(buffer, gt, preds).dump(
+        (run.ap_data, run.errors, run.false_negatives, run.pred_info, run._best_preds)
+    )
+
+    return buffer.getvalue()
+
+
 class TIDE:
     """
     ████████╗██╗██████╗ ███████╗
@@ -518,10 +2058,16 @@ class TIDE:
         pos_threshold: float = 0.5,
         background_threshold: float = 0.1,
         mode: str = BOX,
+        numpy_box_iou: bool = True,
     ):
+        """
+        If numpy_box_iou is set, box IoUs are computed with a vectorized NumPy kernel rather than
+        pycocotools. Both give the same numbers, but the former has a lot less overhead per image.
+        """
         self.pos_thresh = pos_threshold
         self.bg_thresh = background_threshold
         self.mode = mode
+        self.numpy_box_iou = numpy_box_iou
 
         self.pos_thresh_int = int(self.pos_thresh * 100)
 
@@ -541,7 +2087,16 @@ class TIDE:
         mode: str = None,
         name: str = None,
         use_for_errors: bool = True,
+        num_workers: int = 1,
+        keep_images: bool = False,
     ) -> TIDERun:
+        """
+        Evaluates preds against gt and returns the TIDERun. If use_for_errors is set, the run is also
+        stored in self.runs under the given name (or the name of preds) to compute errors with later.
+
+        Set num_workers > 1 to evaluate the images in that many processes. Set keep_images to be able
+        to evaluate changed predictions with reevaluate later.
+        """
         pos_thresh = self.pos_thresh if pos_threshold is None else pos_threshold
         bg_thresh = (
             self.bg_thresh if background_threshold is None else background_threshold
@@ -550,14 +2105,108 @@ class TIDE:
         name = preds.name if name is None else name
 
         run = TIDERun(
-            gt, preds, pos_thresh, bg_thresh, mode, gt.max_dets, use_for_errors
+            gt,
+            preds,
+            pos_thresh,
+            bg_thresh,
+            mode,
+            gt.max_dets,
+            use_for_errors,
+            numpy_box_iou=self.numpy_box_iou,
+            num_workers=num_workers,
+            keep_images=keep_images,
         )
 
         if use_for_errors:
-            self.runs[name] = run
+            self._store_run(name, run)
 
         return run
 
+    def reevaluate(
+        self,
+        previous,
+        preds: Data,
+        name: str = None,
+        use_for_errors: bool = True,
+        num_workers: int = 1,
+    ) -> TIDERun:
+        """
+        Evaluates preds against the gt of a previous run (or the name of one in self.runs) that was made
+        with keep_images, with the same settings. Only the images whose predictions differ from the
+        previous ones are evaluated again, which is a lot faster if only some of them changed (e.g.,
+        after tweaking the post-processing). Otherwise, this works like evaluate.
+        """
+        if isinstance(previous, str):
+            previous = self.runs[previous]
+        name = preds.name if name is None else name
+
+        run = TIDERun.from_previous(previous, preds, num_workers=num_workers)
+
+        if use_for_errors:
+            self._store_run(name, run)
+
+        return run
+
+    def evaluate_many(
+        self,
+        gt: Data,
+        preds_list: list,
+        pos_threshold: float = None,
+        background_threshold: float = None,
+        mode: str = None,
+        names: list = None,
+        num_workers: int = 1,
+    ) -> list:
+        """
+        Evaluates every prediction set in preds_list against the same gt and returns the TIDERuns, which
+        are stored in self.runs under the given names (or the names of the preds) like with evaluate.
+        The work on the gt of each image is only done once and shared by all of them.
+
+        Set num_workers > 1 to evaluate the prediction sets in that many processes.
+        """
+        run_kwargs = {
+            "pos_thresh": self.pos_thresh if pos_threshold is None else pos_threshold,
+            "bg_thresh": (
+                self.bg_thresh if background_threshold is None else background_threshold
+            ),
+            "mode": self.mode if mode is None else mode,
+            "max_dets": gt.max_dets,
+            "numpy_box_iou": self.numpy_box_iou,
+        }
+        if names is None:
+            names = [preds.name for preds in preds_list]
+
+        if num_workers > 1 and len(preds_list) > 1:
+            runs = []
+
+            with ProcessPoolExecutor(
+                min(num_workers, len(preds_list)),
+                initializer=_init_preds_worker,
+                initargs=(gt, run_kwargs),
+            ) as pool:
+                for preds, payload in zip(
+                    preds_list, pool.map(_eval_preds, preds_list)
+                ):
+                    run = TIDERun(gt, preds, _run=False, **run_kwargs)
+                    run._merge(
+                        *_AnnotationUnpickler(io.BytesIO(payload), gt, preds).load()
+                    )
+                    run.ap = run.ap_data.get_mAP()
+                    runs.append(run)
+        else:
+            # Every run needs the same gt masks as RLEs, so they're kept until all of them are done
+            gt_images = _GTImages(gt, keep_rles=True)
+            runs = [
+                TIDERun(gt, preds, _gt_images=gt_images, **run_kwargs)
+                for preds in preds_list
+            ]
+            gt_images.drop_rles()
+
+        for name, run in zip(names, runs):
+            self._store_run(name, run)
+
+        return runs
+
     def evaluate_range(
         self,
         gt: Data,
@@ -567,28 +2216,121 @@ class TIDE:
         background_threshold: float = None,
         mode: str = None,
         name: str = None,
+        num_workers: int = 1,
     ) -> dict:
+        """
+        Evaluates preds against gt at every positive threshold in thresholds, storing the runs in
+        self.run_thresholds. The run at pos_threshold (if any) is used for errors.
+
+        Set num_workers > 1 to evaluate the images in that many processes.
+        """
 
         if pos_threshold is None:
             pos_threshold = self.pos_thresh
+        if background_threshold is None:
+            background_threshold = self.bg_thresh
+        if mode is None:
+            mode = self.mode
         if name is None:
             name = preds.name
 
-        self.run_thresholds[name] = []
+        # Evaluates all thresholds together, so the IoUs for every image only have to be computed once
+        runs = TIDERun.evaluate_thresholds(
+            gt,
+            preds,
+            thresholds,
+            background_threshold,
+            mode,
+            gt.max_dets,
+            error_thresh=pos_threshold,
+            numpy_box_iou=self.numpy_box_iou,
+            num_workers=num_workers,
+        )
 
-        for thresh in thresholds:
+        self.run_thresholds[name] = runs
+        for run in runs:
+            if run.run_errors:
+                self._store_run(name, run)
 
-            run = self.evaluate(
-                gt,
-                preds,
-                pos_threshold=thresh,
-                background_threshold=background_threshold,
-                mode=mode,
-                name=name,
-                use_for_errors=(pos_threshold == thresh),
-            )
+    def evaluate_shard(
+        self,
+        gt: Data,
+        preds: Data,
+        path: str = None,
+        pos_threshold: float = None,
+        background_threshold: float = None,
+        mode: str = None,
+    ) -> PartialRun:
+        """
+        Evaluates the predictions for a shard of the images against the gt for those images, and returns
+        the results as a PartialRun (also saved to path, if given). Merge the PartialRuns of all of the
+        shards with merge_shards to get the same run as evaluating everything at once.
+        """
+        run = TIDERun(
+            gt,
+            preds,
+            self.pos_thresh if pos_threshold is None else pos_threshold,
+            self.bg_thresh if background_threshold is None else background_threshold,
+            self.mode if mode is None else mode,
+            gt.max_dets,
+            numpy_box_iou=self.numpy_box_iou,
+            _run=False,
+        )
+        run._image_results = {}
+        run._run()
+
+        partial = PartialRun.from_run(run)
+        if path is not None:
+            partial.save(path)
+
+        return partial
+
+    def merge_shards(
+        self, shards: list, name: str = None, use_for_errors: bool = True
+    ) -> TIDERun:
+        """
+        Merges the results of evaluate_shard for disjoint shards of the images into a TIDERun. The shards
+        can be given as PartialRuns or paths they were saved to. If use_for_errors is set, the run is
+        stored in self.runs under the given name (or the name of the preds) like with evaluate.
+        """
+        partials = [
+            PartialRun.load(shard) if isinstance(shard, str) else shard
+            for shard in shards
+        ]
+        run = TIDERun.from_partials(partials)
+
+        if use_for_errors:
+            self._store_run(run.preds.name if name is None else name, run)
+
+        return run
+
+    def evaluate_incremental(
+        self,
+        gt: Data,
+        pos_threshold: float = None,
+        background_threshold: float = None,
+        mode: str = None,
+        name: str = "preds",
+    ) -> IncrementalRun:
+        """
+        Returns an IncrementalRun that evaluates predictions against gt an image at a time with update,
+        and gives the mAP and errors for the images so far with compute.
+        """
+        return IncrementalRun(
+            gt,
+            self.pos_thresh if pos_threshold is None else pos_threshold,
+            self.bg_thresh if background_threshold is None else background_threshold,
+            self.mode if mode is None else mode,
+            gt.max_dets,
+            numpy_box_iou=self.numpy_box_iou,
+            name=name,
+        )
 
-            self.run_thresholds[name].append(run)
+    def _store_run(self, name: str, run: TIDERun):
+        """Stores a run to compute errors with, forgetting the errors computed for the old run by that name."""
+        self.runs[name] = run
+        self.run_main_errors.pop(name, None)
+        self.run_special_errors.pop(name, None)
 
     def add_qualifiers(self, *quals):
         """
@@ -775,6 +2517,7 @@ class TIDE:
                     error.short_name: value
                     for error, value in run.fix_special_errors().items()
                 }
+                self.run_special_errors[run_name] = errors[run_name]
 
         return errors
 